@@ -16,6 +16,9 @@ Usage
 Outputs
     - 640x640 videos for player tracking (left and right cameras)
     - 1080p videos for ball tracking
+    - When the recorder closes, proxies are finished; with archive_after_recording enabled in
+      project_config.yaml (off by default, needs ffmpeg) the session is also archived to H.265 in
+      the background
 
 Last Updated: 16 July 2025
 """
@@ -30,10 +33,15 @@ from PIL import Image, ImageTk
 from PIL import Image, ImageTk, ImageOps
 import tkinter as tk
 from tkinter import Label, Button
+import sys
 import time
 import threading
 import yaml
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.proxies import start_background_job, wait_for_background_jobs
+from utils.archive_session import list_clips, start_archive_job
+
 
 # Label | Res (W×H) | A Ratio | FPS    | Notes
 #-----------------------------------------------------
@@ -79,6 +87,7 @@ FRAME_HEIGHT = cfg["frame_height"]
 FPS_LEFT_RIGHT = cfg["player_tracking_fps"]
 FPS_THIRD = cfg["ball_tracking_fps"]           # Default if not in YAML
 GUI_REFRESH_MS = 30
+ARCHIVE_AFTER_RECORDING = cfg.get("archive_after_recording", False)  # Archive the session to H.265 on close
 
 # Visual Settings
 BORDER_COLORS = {"left": "red", "right": "blue", "third": "green"}
@@ -107,6 +116,7 @@ writers = {}
 throw_count = 0
 frame_counters = {"left": 0, "right": 0, "third": 0}
 start_time = None
+recorded_paths = []  # Files written by the current recording
 
 
 # =========================
@@ -180,7 +190,7 @@ def write_frames():
 # =========================
 def get_next_throw_number():
     """
-    Scans all video directories for existing 'freethrow*.avi' files and returns
+    Scans all video directories for existing freethrow clips (raw or archived) and returns
     the next available throw number.
 
     Returns:
@@ -188,7 +198,7 @@ def get_next_throw_number():
     """
     max_count = 0
     for path in video_dirs.values():
-        for file in path.glob("freethrow*.avi"):
+        for file in list_clips(path, "freethrow*"):
             try:
                 num = int(file.stem.replace("freethrow", ""))
                 max_count = max(max_count, num)
@@ -204,17 +214,19 @@ def start_recording(dims):
     Args:
         dims (dict): Dictionary mapping camera names to their frame dimensions.
     """
-    global writers, recording, throw_count, start_time, frame_counters
+    global writers, recording, throw_count, start_time, frame_counters, recorded_paths
     throw_count = get_next_throw_number()
     print(f"🟢 Starting freethrow{throw_count}")
 
     fourcc = cv.VideoWriter_fourcc(*'MJPG')
 
     # Create writers for each camera
+    recorded_paths = []
     for name, size in dims.items():
         filepath = video_dirs[name] / f"freethrow{throw_count}.avi"
         fps = FPS_LEFT_RIGHT if name in ["left", "right"] else FPS_THIRD
         writers[name] = cv.VideoWriter(str(filepath), fourcc, fps, size)
+        recorded_paths.append(filepath)
         print(f"[INFO] Writing {name} to {filepath} @ {fps} FPS")
 
     recording = True
@@ -225,6 +237,7 @@ def start_recording(dims):
 def stop_recording():
     """
     Stops the current recording session, calculates FPS, and releases video writers.
+    Proxy videos and filmstrips for the GUI tools are then built in a background process.
     """
     global writers, recording
     duration = time.time() - start_time
@@ -246,6 +259,9 @@ def stop_recording():
     recording = False
     print("[INFO] Writers closed.")
 
+    start_background_job(list(recorded_paths))
+    print("[INFO] Building proxies and filmstrips in the background...")
+
 
 # =========================
 # GUI App
@@ -348,6 +364,10 @@ class FreeThrowRecorderApp:
         if recording:
             stop_recording()
         self.root.destroy()
+        wait_for_background_jobs()  # Let pending proxies finish writing
+        if ARCHIVE_AFTER_RECORDING:
+            if start_archive_job():  # Detached, so it keeps running after the recorder exits
+                print("[INFO] Archiving the session in the background (utils/archive_session.py)...")
 
 
 # =========================
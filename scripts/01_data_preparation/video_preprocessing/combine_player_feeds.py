@@ -5,6 +5,8 @@ Description:
     This module's purpose is to combine player tracking feeds from two cameras into a single video feed.
     It combines two 640x640 videos into a single 1280x640 video for player tracking. 
     The combined video is saved in a structurured directory. 
+    Left and right frames are decoded concurrently straight into preallocated 1280x640 buffers,
+    encoding runs on its own thread, and several pairs are processed at once.
 
 Inputs:
     - Left and right player tracking videos (each 640x640)
@@ -15,14 +17,25 @@ Usage:
 Outputs
     - 1280x640 videos for player tracking:
         - side by side stereo feeds (each 640x640)
+    - Throughput (frames/s) per pair printed to the terminal
 """
 
+import sys
 import cv2 as cv
 import numpy as np
 from pathlib import Path
+import queue
 import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.avi_reader import AviReader, open_reader, DEFAULT_DECODE_WORKERS
+from utils.archive_session import list_clips, resolve_clip
+
 # =========================
 # Config
 # =========================
@@ -33,6 +46,11 @@ with open(config_path, "r") as f:
 ATHLETE = cfg["athlete"]
 SESSION = cfg["session"]
 
+FEED_SIZE = 640                                             # Each feed is FEED_SIZE x FEED_SIZE
+DECODE_WORKERS = cfg.get("decode_workers") or DEFAULT_DECODE_WORKERS
+PAIR_WORKERS = cfg.get("combine_workers", 2)
+PIPELINE_DEPTH = 8                                          # Frames being decoded ahead of the encoder
+
 # =========================
 # Paths and Directories 
 # =========================
@@ -55,21 +73,149 @@ output_video_dir.mkdir(parents=True, exist_ok=True)
 # =========================
 def get_matching_video_pairs(left_dir, right_dir):
     
-    # Match freethrow files like freethrow1.avi, freethrow2.avi, etc.
-    pattern = re.compile(r"freethrow(\d+)\.avi")
-    left_files = sorted(left_dir.glob("freethrow*.avi"))
+    # Match freethrow clips like freethrow1.avi, freethrow2.avi, etc. (archived .mkv copies stand in for deleted raw clips)
+    pattern = re.compile(r"freethrow\d+")
 
     matches = []
-    for lf in left_files:
-        match = pattern.match(lf.name)
-        if match:
-            num = match.group(1)
-            rf = right_dir / f"freethrow{num}.avi"
+    for lf in list_clips(left_dir, "freethrow*"):
+        if pattern.fullmatch(lf.stem):
+            rf = resolve_clip(right_dir / f"{lf.stem}.avi")
             if rf.exists():
                 matches.append((lf, rf))
     return matches
 
 
+# =========================
+# Combining a Single Pair
+# =========================
+def side_workers(reader):
+    """Decode threads for one side. VideoCapture fallbacks must read in order on one thread."""
+    return max(1, DECODE_WORKERS // 2) if isinstance(reader, AviReader) else 1
+
+
+def fill_half(buffer, reader, frame_idx, x0):
+    """Decode one frame and copy it into its half of the preallocated combined buffer."""
+    np.copyto(buffer[:, x0:x0 + FEED_SIZE], reader.read(frame_idx))
+
+
+def finish_oldest(pending, ready, name):
+    """
+    Wait for the oldest combined frame and queue it for encoding.
+
+    Returns:
+        bool: False if either side could not decode it (the reader overestimated its frame count).
+    """
+    buffer, halves = pending.popleft()
+    try:
+        for half in halves:
+            half.result()
+    except IndexError as e:
+        print(f"[WARNING] {name}: stopping at end of stream ({e})")
+        return False
+    ready.put(buffer)
+    return True
+
+
+def encode_frames(out, ready, free, errors):
+    """
+    Encoder thread: write combined buffers in order and hand them back for reuse.
+
+    A write error is recorded in `errors` and the remaining buffers are still handed back, so the
+    decode loop never blocks waiting for one; combine_pair() raises the error.
+    """
+    while True:
+        buffer = ready.get()
+        if buffer is None:
+            break
+        if not errors:
+            try:
+                out.write(buffer)
+            except Exception as e:
+                errors.append(e)
+        free.put(buffer)
+
+
+def combine_pair(left_path, right_path):
+    """
+    Combine one left/right pair into a 1280x640 video.
+
+    Args:
+        left_path (Path): Left camera clip (640x640).
+        right_path (Path): Right camera clip with the same name (640x640).
+
+    Returns:
+        tuple[str, int, float] | None: (name, frames written, seconds), or None if the pair was skipped.
+    """
+    start_time = time.perf_counter()
+    left_reader = open_reader(left_path)
+    right_reader = open_reader(right_path)
+
+    # Ensure both videos are 640x640
+    for path, reader in ((left_path, left_reader), (right_path, right_reader)):
+        if (reader.width, reader.height) != (FEED_SIZE, FEED_SIZE):
+            print(f"❌ ERROR: {path.name} is {reader.width}x{reader.height}, expected {FEED_SIZE}x{FEED_SIZE}")
+            left_reader.close()
+            right_reader.close()
+            return None
+
+    # If valid, proceed with 1280x640 output
+    combined_width = 2 * FEED_SIZE
+    combined_height = FEED_SIZE
+
+    # Setup output path
+    output_name = f"{left_path.stem}.avi"  # e.g. freethrow1.avi, also for an archived freethrow1.mkv
+    output_path = output_video_dir / output_name
+    fourcc = cv.VideoWriter_fourcc(*'MJPG')
+    fps = left_reader.fps
+    out = cv.VideoWriter(str(output_path), fourcc, fps, (combined_width, combined_height))
+
+    # Preallocated buffers cycle decoder -> encoder -> decoder; no per-frame allocation
+    free, ready, encode_errors = queue.Queue(), queue.Queue(), []
+    for _ in range(PIPELINE_DEPTH + 2):
+        free.put(np.empty((combined_height, combined_width, 3), dtype=np.uint8))
+    encoder = threading.Thread(target=encode_frames, args=(out, ready, free, encode_errors), daemon=True)
+    encoder.start()
+
+    total_frames = min(len(left_reader), len(right_reader))
+    left_pool = ThreadPoolExecutor(max_workers=side_workers(left_reader))
+    right_pool = ThreadPoolExecutor(max_workers=side_workers(right_reader))
+    pending = deque()
+    written = 0
+
+    # Frame counts from VideoCapture can overestimate; stop cleanly at the first unreadable frame
+    try:
+        for frame_idx in range(total_frames):
+            if encode_errors:
+                break
+            buffer = free.get()  # Blocks when the encoder falls behind
+            halves = (
+                left_pool.submit(fill_half, buffer, left_reader, frame_idx, 0),
+                right_pool.submit(fill_half, buffer, right_reader, frame_idx, FEED_SIZE),
+            )
+            pending.append((buffer, halves))
+
+            if len(pending) >= PIPELINE_DEPTH:
+                if not finish_oldest(pending, ready, output_name):
+                    pending.clear()
+                    break
+                written += 1
+
+        while pending and finish_oldest(pending, ready, output_name):
+            written += 1
+    finally:
+        ready.put(None)
+        encoder.join()
+        left_pool.shutdown()
+        right_pool.shutdown()
+        left_reader.close()
+        right_reader.close()
+        out.release()
+
+    if encode_errors:
+        raise encode_errors[0]
+    return output_path.name, written, time.perf_counter() - start_time
+
+
 # =========================
 # Main Combining Logic
 # =========================
@@ -78,71 +224,27 @@ def combine_videos():
     # Match left/right video pairs
     pairs = get_matching_video_pairs(input_video_dirs["left"], input_video_dirs["right"])
     print(f"Found {len(pairs)} matching left/right video pairs.")
-    
-    for left_path, right_path in pairs:
-        print(f"Combining {left_path.name} and {right_path.name}...")
-
-        # Open video readers
-        left_cap = cv.VideoCapture(str(left_path))
-        right_cap = cv.VideoCapture(str(right_path))
-
-        # Get video properties from left
-        fps = left_cap.get(cv.CAP_PROP_FPS)
-
-        left_width = int(left_cap.get(cv.CAP_PROP_FRAME_WIDTH))
-        left_height = int(left_cap.get(cv.CAP_PROP_FRAME_HEIGHT))
-        right_width = int(right_cap.get(cv.CAP_PROP_FRAME_WIDTH))
-        right_height = int(right_cap.get(cv.CAP_PROP_FRAME_HEIGHT))
 
-        # Ensure both videos are 640x640
-        if (left_width, left_height) != (640, 640):
-            print(f"❌ ERROR: {left_path.name} is {left_width}x{left_height}, expected 640x640")
-            left_cap.release()
-            right_cap.release()
-            continue
-
-        if (right_width, right_height) != (640, 640):
-            print(f"❌ ERROR: {right_path.name} is {right_width}x{right_height}, expected 640x640")
-            left_cap.release()
-            right_cap.release()
-            continue
-
-        # If valid, proceed with 1280x640 output
-        combined_width = 1280
-        combined_height = 640
-
-
-        # Setup output path
-        output_name = left_path.name  # e.g. freethrow1.avi
-        output_path = output_video_dir / output_name
-        fourcc = cv.VideoWriter_fourcc(*'MJPG')
-        out = cv.VideoWriter(str(output_path), fourcc, fps, (combined_width, combined_height))
-
-        total_frames = int(left_cap.get(cv.CAP_PROP_FRAME_COUNT))
-        frame_count = 0
-
-        while True:
-            ret_left, frame_left = left_cap.read()
-            ret_right, frame_right = right_cap.read()
-
-            if not ret_left or not ret_right:
-                break
-
-            # Combine side-by-side
-            combined_frame = np.hstack((frame_left, frame_right))
-            out.write(combined_frame)
-
-            # Progress update
-            frame_count += 1
-            if frame_count % 50 == 0 or frame_count == total_frames:
-                progress = (frame_count / total_frames) * 100
-                print(f"   ➤ Progress: {frame_count}/{total_frames} frames ({progress:.1f}%)", end='\r')
-
-
-        left_cap.release()
-        right_cap.release()
-        out.release()
-        print(f"Saved: {output_path}")
+    # Combine several pairs at once; decoding and encoding release the GIL.
+    # A failing pair is reported and the others still finish.
+    failed = []
+    with ThreadPoolExecutor(max_workers=PAIR_WORKERS) as pool:
+        futures = [(pair, pool.submit(combine_pair, *pair)) for pair in pairs]
+        for (left_path, _), future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ ERROR: {left_path.name} failed: {e}")
+                failed.append(left_path.name)
+                continue
+            if result is None:
+                continue
+            name, frames, seconds = result
+            fps = frames / seconds if seconds > 0 else 0
+            print(f"Saved: {output_video_dir / name}  ({frames} frames in {seconds:.1f}s, {fps:.1f} frames/s)")
+
+    if failed:
+        print(f"[WARNING] {len(failed)} pair(s) failed: {', '.join(failed)}")
 
 if __name__ == "__main__":
-    combine_videos()
\ No newline at end of file
+    combine_videos()
@@ -0,0 +1,238 @@
+"""
+Title: detect_flashes.py
+
+Description:
+    This module's purpose is to find the LED sync flashes in every raw recording and to measure how far
+    the left, right and ball cameras are offset from each other.
+    Each clip is decoded once at 1/8 resolution in grayscale and reduced to a mean-luma curve; no frames
+    are kept in memory. Start/stop flashes are the large upward jumps in that curve, and the sub-frame
+    offset between two cameras is the peak of the cross-correlation of their luma curves around the
+    start flash, resampled onto a common time base.
+
+Inputs:
+    - raw left/right player tracking videos (videos/player_tracking/raw/left|right/freethrowN.avi)
+    - raw ball tracking videos (videos/ball_tracking/raw/freethrowN.avi)
+
+Usage:
+    - Run the script after recording; it writes one row per clip and camera to the sync offsets CSV.
+
+Outputs:
+    - metrics/sync_offsets.csv with columns:
+        clip, camera, fps, frames, start_flash, stop_flash, offset_s, offset_stop_s, peak_corr
+      offset_s is the start-flash time on that camera's clock minus the time on the left camera's clock,
+      so a moment at t seconds into the left clip is at t + offset_s seconds into that camera's clip.
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import yaml
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.avi_reader import open_reader
+from utils.archive_session import list_clips, resolve_clip
+
+# ========================================
+# Config
+# ========================================
+config_path = Path(__file__).resolve().parents[3] / "project_config.yaml"
+with open(config_path, "r") as f:
+    cfg = yaml.safe_load(f)
+
+ATHLETE = cfg["athlete"]
+SESSION = cfg["session"]
+
+DECODE_WORKERS = cfg.get("decode_workers")
+LUMA_SCALE = 8                  # Luma is measured on 1/8 resolution grayscale decodes
+MIN_FLASH_JUMP = 8.0            # Minimum mean-luma rise (0-255) counted as a flash
+FLASH_MAD_FACTOR = 10.0         # ... and it must stand this many MADs above the frame-to-frame noise
+MIN_FRAME_SEPARATION = 30       # Minimum frames between start and stop flash
+SYNC_WINDOW_S = 1.0             # Luma curves are correlated within +/- this window around the flash
+RESAMPLE_HZ = 240               # Common time base for the correlation
+MAX_REFINE_S = 0.1              # Refinement may move the coarse (flash frame) offset by at most this
+
+REFERENCE_CAMERA = "left"
+
+# ========================================
+# Paths and Directories
+# ========================================
+base_dir = Path(__file__).resolve().parents[3]
+session_dir = base_dir / "data" / ATHLETE / SESSION
+
+camera_dirs = {
+    "left": session_dir / "videos" / "player_tracking" / "raw" / "left",
+    "right": session_dir / "videos" / "player_tracking" / "raw" / "right",
+    "ball": session_dir / "videos" / "ball_tracking" / "raw",
+}
+output_csv = session_dir / "metrics" / "sync_offsets.csv"
+
+# ========================================
+# Luma Signal
+# ========================================
+
+def luma_signal(video_path, workers=DECODE_WORKERS):
+    """
+    Mean luma of every frame, computed in a single streaming pass.
+
+    Args:
+        video_path (Path): Path to the video.
+        workers (int | None): Decode threads.
+
+    Returns:
+        tuple[np.ndarray, float]: Mean luma per frame (float32) and the clip FPS.
+    """
+    with open_reader(video_path) as reader:
+        luma = [float(frame.mean()) for frame in reader.iter_frames(workers=workers, scale=LUMA_SCALE, gray=True)]
+        fps = reader.fps
+    return np.asarray(luma, dtype=np.float32), fps
+
+# ========================================
+# Flash Detection
+# ========================================
+
+def detect_flashes(luma, min_separation=MIN_FRAME_SEPARATION):
+    """
+    Find the start and stop flash frames (first frame of each large brightness jump).
+
+    The jump threshold adapts to the clip: it is the larger of MIN_FLASH_JUMP and
+    median + FLASH_MAD_FACTOR * MAD of the frame-to-frame luma changes.
+
+    Args:
+        luma (np.ndarray): Mean luma per frame.
+        min_separation (int): Minimum frames between the start and the stop flash.
+
+    Returns:
+        tuple[int | None, int | None]: (start_flash, stop_flash) frame indices.
+    """
+    if len(luma) < 2:
+        return None, None
+    jumps = np.diff(luma)
+    median = np.median(jumps)
+    mad = np.median(np.abs(jumps - median))
+    threshold = max(MIN_FLASH_JUMP, median + FLASH_MAD_FACTOR * mad)
+
+    candidates = np.flatnonzero(jumps > threshold) + 1  # +1 since diff is one shorter
+    if len(candidates) == 0:
+        return None, None
+    start = int(candidates[0])
+    later = candidates[candidates >= start + min_separation]
+    stop = int(later[0]) if len(later) else None
+    return start, stop
+
+# ========================================
+# Sub-frame Offset
+# ========================================
+
+def _window(luma, fps, center_s, window_s=SYNC_WINDOW_S, rate=RESAMPLE_HZ):
+    """Luma resampled at `rate` Hz on [center - window, center + window], zero-mean and unit-variance."""
+    times = (np.arange(len(luma)) + 0.5) / fps  # Frame n is exposed over [n, n + 1) / fps
+    grid = center_s + np.arange(-window_s, window_s, 1.0 / rate)
+    signal = np.interp(grid, times, luma)
+    signal -= signal.mean()
+    std = signal.std()
+    return signal / std if std > 0 else signal
+
+
+def _parabolic_peak(corr, i):
+    """Sub-sample position of the peak at index i from a parabola through its neighbours."""
+    if 0 < i < len(corr) - 1:
+        a, b, c = corr[i - 1], corr[i], corr[i + 1]
+        denom = a - 2 * b + c
+        if denom != 0:
+            return i + 0.5 * (a - c) / denom
+    return float(i)
+
+
+def estimate_offset(ref_luma, ref_fps, ref_flash, luma, fps, flash, rate=RESAMPLE_HZ):
+    """
+    Offset (seconds) of one camera's clock relative to the reference camera around a flash.
+
+    The flash frames give a coarse offset; cross-correlating the two luma curves on a common
+    time base, with a parabolic fit of the correlation peak, refines it below one frame.
+
+    Args:
+        ref_luma, luma (np.ndarray): Mean luma curves of the reference and the other camera.
+        ref_fps, fps (float): Their frame rates.
+        ref_flash, flash (int): Flash frame detected in each curve.
+        rate (float): Resampling rate of the common time base (Hz).
+
+    Returns:
+        tuple[float, float]: (offset_s, peak correlation in [-1, 1]).
+    """
+    ref_t = ref_flash / ref_fps
+    t = flash / fps
+    a = _window(ref_luma, ref_fps, ref_t, rate=rate)
+    b = _window(luma, fps, t, rate=rate)
+
+    # Circular cross-correlation via FFT; zero padding keeps the lags we search for linear
+    n = 2 * len(a)
+    corr = np.fft.irfft(np.fft.rfft(b, n) * np.conj(np.fft.rfft(a, n)), n) / len(a)
+    max_lag = int(MAX_REFINE_S * rate)
+    lags = np.concatenate([corr[-max_lag:], corr[:max_lag + 1]])  # lags -max_lag..max_lag
+    peak = int(np.argmax(lags))
+    lag = (_parabolic_peak(lags, peak) - max_lag) / rate
+
+    # b(tau) matches a(tau - lag): the event sits `lag` seconds later in the other camera's window
+    return (t - ref_t) + lag, float(lags[peak])
+
+# ========================================
+# Main Sync Logic
+# ========================================
+
+def sync_clip(stem):
+    """
+    Detect flashes and offsets for one clip across all cameras.
+
+    Args:
+        stem (str): Clip name (e.g. "freethrow3").
+
+    Returns:
+        list[dict]: One row per camera that has the clip.
+    """
+    signals = {}
+    for camera, video_dir in camera_dirs.items():
+        video_path = resolve_clip(video_dir / f"{stem}.avi")
+        if video_path.exists():
+            luma, fps = luma_signal(video_path)
+            signals[camera] = (luma, fps, *detect_flashes(luma))
+
+    ref = signals.get(REFERENCE_CAMERA)
+    rows = []
+    for camera, (luma, fps, start, stop) in signals.items():
+        row = {"clip": stem, "camera": camera, "fps": fps, "frames": len(luma),
+               "start_flash": start, "stop_flash": stop,
+               "offset_s": np.nan, "offset_stop_s": np.nan, "peak_corr": np.nan}
+
+        if camera == REFERENCE_CAMERA:
+            row.update(offset_s=0.0, offset_stop_s=0.0, peak_corr=1.0)
+        elif ref is not None and ref[2] is not None and start is not None:
+            row["offset_s"], row["peak_corr"] = estimate_offset(ref[0], ref[1], ref[2], luma, fps, start)
+            if ref[3] is not None and stop is not None:
+                row["offset_stop_s"], _ = estimate_offset(ref[0], ref[1], ref[3], luma, fps, stop)
+
+        if start is None:
+            print(f"[ERROR] No start flash found in {camera}/{stem}")
+        elif stop is None:
+            print(f"[WARNING] No stop flash found in {camera}/{stem}")
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    stems = sorted({p.stem for d in camera_dirs.values() for p in list_clips(d, "freethrow*")},
+                   key=lambda s: int(s.replace("freethrow", "") or 0))
+    print(f"Found {len(stems)} clips.")
+
+    rows = []
+    for stem in stems:
+        clip_rows = sync_clip(stem)
+        for row in clip_rows:
+            drift = (row["offset_stop_s"] - row["offset_s"]) * 1000
+            print(f"[INFO] {stem} {row['camera']:>5}: start={row['start_flash']} stop={row['stop_flash']} "
+                  f"offset={row['offset_s'] * 1000:+.1f} ms (drift {drift:+.1f} ms, corr {row['peak_corr']:.2f})")
+        rows.extend(clip_rows)
+
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows).to_csv(output_csv, index=False)
+    print(f"✅ Saved sync offsets: {output_csv}")
@@ -3,12 +3,23 @@ IMPORTANT:This script is currently broken and need to be fixed.
 """
 
 import os
+import sys
+import math
 import cv2
+import pandas as pd
 import tkinter as tk
 from tkinter import filedialog
 from pathlib import Path
 import yaml
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.avi_reader import scale_for_width
+from utils.proxies import open_proxy, filmstrip_path, filmstrip_indices
+from utils.frame_cache import open_frames, session_cache_dir
+from utils.time_base import load_time_base
+from utils.motion_energy import load_motion_energy, propose_trim
+from utils.archive_session import list_clips, resolve_clip
+
 # ========================================
 # Configuration Constants
 # ========================================
@@ -19,11 +30,11 @@ with open(config_path, "r") as f:
 ATHLETE = cfg["athlete"]
 SESSION = cfg["session"]
 
-VIDEO_EXTENSIONS = ['.avi', '.mp4', '.mov', '.hevc']  # Supported formats
 RESIZE_DIMENSIONS = (640, 480)     # Display size in GUI
+MOTION_CURVE_HEIGHT = 60           # Height of the motion-energy strip under the frame
 
-INPUT_SUBDIR = "videos/ball_tracking/raw" 
-OUTPUT_SUBDIR = "videos/ball_tracking/trimmed"
+TRIM_CAMERA = cfg.get("trim_camera", "ball")  # Camera shown first in the GUI; its trim is mapped onto the other two
+DECODE_WORKERS = cfg.get("decode_workers")
 
 # ========================================
 # Paths and Directories
@@ -45,6 +56,74 @@ trimmed_left_dir = session_dir / "videos" / "player_tracking" / "trimmed" / "lef
 trimmed_right_dir = session_dir / "videos" / "player_tracking" / "trimmed" / "right"
 trimmed_ball_dir = session_dir / "videos" / "ball_tracking" / "trimmed"
 
+# (raw, trimmed) directories per camera
+camera_dirs = {
+    "left": (raw_left_dir, trimmed_left_dir),
+    "right": (raw_right_dir, trimmed_right_dir),
+    "ball": (raw_ball_dir, trimmed_ball_dir),
+}
+
+# One row per clip and camera: the frame range cut from each raw stream
+trims_manifest_path = session_dir / "videos" / "trims.csv"
+
+# ========================================
+# Trim Propagation
+# ========================================
+
+def propagate_trim(video_path, start, end, source_camera=TRIM_CAMERA):
+    """
+    Map a trim marked on one camera onto every camera of the same clip.
+
+    Args:
+        video_path (str | Path): Raw clip the trim was marked on.
+        start (int): First frame of the trim on source_camera.
+        end (int): Last frame of the trim on source_camera (inclusive).
+        source_camera (str): Camera the trim was marked on ("left", "right" or "ball").
+
+    Returns:
+        dict[str, tuple[Path, int, int]]: Raw clip and inclusive frame range per camera.
+    """
+    video_path = Path(video_path)
+    time_base = load_time_base(session_dir, video_path.stem, cfg)
+    ranges = {source_camera: (video_path, start, end)}
+
+    for camera, (raw_dir, _) in camera_dirs.items():
+        other_path = resolve_clip(raw_dir / f"{video_path.stem}.avi")
+        if camera == source_camera or not other_path.exists():
+            continue
+        # Widen to whole frames so the other streams cover at least the marked interval
+        other_start = math.floor(time_base.map_frames(start, source_camera, camera))
+        other_end = math.ceil(time_base.map_frames(end, source_camera, camera))
+        ranges[camera] = (other_path, other_start, other_end)
+    return ranges
+
+
+def write_clip(reader, start, end, output_path, fps):
+    """
+    Write frames [start, end] of a reader to an mp4 file.
+
+    Returns:
+        tuple[int, int] | None: The range actually written, or None (nothing written) if the
+            range lies outside the clip.
+    """
+    start, end = max(0, start), min(end, len(reader) - 1)
+    if start > end:
+        return None
+    out = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (reader.width, reader.height))
+    for frame in reader.iter_frames(start, end + 1, workers=DECODE_WORKERS):
+        out.write(frame)
+    out.release()
+    return start, end
+
+
+def update_trims_manifest(rows):
+    """Replace the manifest rows of the trimmed clip with the new ones."""
+    manifest = pd.DataFrame(rows)
+    if trims_manifest_path.exists():
+        old = pd.read_csv(trims_manifest_path)
+        manifest = pd.concat([old[~old["clip"].isin(manifest["clip"])], manifest], ignore_index=True)
+    manifest.to_csv(trims_manifest_path, index=False)
+
 # ========================================
 # Video Trimmer Class
 # ========================================
@@ -55,17 +134,24 @@ class VideoTrimmer:
         self.master.title("Video Trimmer")
 
         # Initialize video tracking variables
-        self.cap = None
+        self.reader = None
+        self.proxy = None  # Low-res proxy used for scrubbing (see utils/proxies.py)
+        self.filmstrip_frames = []
+        self.energy = None    # Motion-energy curve (see utils/motion_energy.py)
+        self.proposal = None  # Proposed (start, end) from the motion-energy curve
         self.current_frame = 0
         self.start_frame = None
         self.end_frame = None
-        self.frames = []
         self.fps = 30
         self.video_files = []
         self.video_index = 0
         self.setting_start = True  # Track whether we are setting start or end
+        self.trim_camera = tk.StringVar(master, value=TRIM_CAMERA)  # Camera the trim is marked on
+        self.loaded_camera = TRIM_CAMERA                             # Camera of self.video_files
 
-        self.load_video_folder()  # Load videos from folder
+        if not self.load_video_folder():  # Load videos from folder
+            self.master.quit()
+            return
 
         # ========================================
         # GUI Layout
@@ -75,6 +161,16 @@ class VideoTrimmer:
         self.canvas = tk.Canvas(master, width=RESIZE_DIMENSIONS[0], height=RESIZE_DIMENSIONS[1])
         self.canvas.pack()
 
+        # Filmstrip of the clip (click a thumbnail to jump to it)
+        self.filmstrip_canvas = tk.Canvas(master, width=RESIZE_DIMENSIONS[0], height=0)
+        self.filmstrip_canvas.pack()
+        self.filmstrip_canvas.bind("<Button-1>", self.on_filmstrip_click)
+
+        # Motion-energy curve with the proposed trim (click to jump to a frame)
+        self.motion_canvas = tk.Canvas(master, width=RESIZE_DIMENSIONS[0], height=MOTION_CURVE_HEIGHT, bg="black")
+        self.motion_canvas.pack()
+        self.motion_canvas.bind("<Button-1>", self.on_motion_click)
+
         # Label to show frame info
         self.info_label = tk.Label(master, text="", font=("Arial", 12))
         self.info_label.pack(pady=5)
@@ -83,6 +179,11 @@ class VideoTrimmer:
         controls = tk.Frame(master)
         controls.pack()
 
+        # Camera to mark the trim on; the other two follow through the cross-camera offsets
+        tk.Label(controls, text="Mark on:").pack(side=tk.LEFT)
+        self.camera_menu = tk.OptionMenu(controls, self.trim_camera, *camera_dirs, command=self.change_camera)
+        self.camera_menu.pack(side=tk.LEFT)
+
         # Button: go to previous frame
         self.prev_btn = tk.Button(controls, text="<< Prev", command=self.prev_frame)
         self.prev_btn.pack(side=tk.LEFT)
@@ -115,6 +216,7 @@ class VideoTrimmer:
         self.master.bind("<End>", self.key_handler)
         self.master.bind("<Next>", self.key_handler)   # PageDown
         self.master.bind("<Prior>", self.key_handler)  # PageUp
+        self.master.bind("<space>", lambda e: self.accept_proposal())
 
         # Shifted arrow keys
         self.master.bind("<Shift-Right>", lambda e: self.jump_frames(10))
@@ -128,28 +230,36 @@ class VideoTrimmer:
     # ========================================
 
     def load_video_folder(self):
-        input_dir = Path(session_dir) / INPUT_SUBDIR
-        output_dir = Path(session_dir) / OUTPUT_SUBDIR
+        """List the raw clips of the selected camera. Returns False if there are none."""
+        input_dir = camera_dirs[self.trim_camera.get()][0]
 
         if not input_dir.exists():
             print(f"Input folder not found: {input_dir}")
-            self.master.quit()
-            return
+            return False
 
-        # Load all valid videos
-        self.video_files = [
-            str(input_dir / f)
-            for f in os.listdir(input_dir)
-            if Path(f).suffix.lower() in VIDEO_EXTENSIONS
-        ]
+        # Raw clips, or their archived copies once the raw recordings were deleted
+        video_files = [str(path) for path in list_clips(input_dir)]
 
-        if not self.video_files:
-            print("No videos found.")
-            self.master.quit()
-            return
+        if not video_files:
+            print(f"No videos found in {input_dir}.")
+            return False
+        self.video_files = video_files
 
-        self.output_dir = output_dir
-        os.makedirs(self.output_dir, exist_ok=True)
+        for _, trimmed_dir in camera_dirs.values():
+            os.makedirs(trimmed_dir, exist_ok=True)
+        return True
+
+    def change_camera(self, camera):
+        """Switch the camera the trim is marked on, staying on the same clip when it exists there."""
+        current = Path(self.video_files[self.video_index]).stem if self.video_index < len(self.video_files) else None
+        if not self.load_video_folder():
+            self.trim_camera.set(self.loaded_camera)  # Stay on the clips already loaded
+            return
+        self.loaded_camera = camera
+        stems = [Path(f).stem for f in self.video_files]
+        self.video_index = stems.index(current) if current in stems else 0
+        print(f"Marking trims on the {camera} camera")
+        self.load_video()
 
 
     def load_video(self):
@@ -159,45 +269,111 @@ class VideoTrimmer:
             self.master.quit()
             return
 
-        # Load video frames into memory
+        # Open an indexed reader; frames are decoded on demand instead of loaded into memory
         video_path = self.video_files[self.video_index]
         print(f"Loading: {video_path}")
-        self.cap = cv2.VideoCapture(video_path)
+        if self.reader:
+            self.reader.close()
+        self.reader = open_frames(video_path, session_cache_dir(session_dir))
 
         # === Automatically detect FPS ===
-        detected_fps = self.cap.get(cv2.CAP_PROP_FPS)
+        detected_fps = self.reader.fps
         self.fps = detected_fps if detected_fps > 0 else 30  # fallback if 0
-        print(f"Detected FPS: {self.fps:.2f}")
+        print(f"Detected FPS: {self.fps:.2f} | Frames: {len(self.reader)}")
 
-        self.frames = []
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-            self.frames.append(frame)
-        self.cap.release()
+        # Decode previews at reduced resolution (e.g. 1080p -> 960x540) before the final resize
+        self.preview_scale = scale_for_width(self.reader.width, RESIZE_DIMENSIONS[0])
 
-        # Reset state for current video
-        self.current_frame = 0
-        self.start_frame = None
-        self.end_frame = None
+        # Scrub on the proxy when one exists; the original is only decoded for marked frames
+        if self.proxy:
+            self.proxy.close()
+        self.proxy = open_proxy(video_path)
+        print(f"Scrubbing on: {'proxy' if self.proxy else 'original'}")
+        self.show_filmstrip(video_path)
+
+        # Propose a trim from the motion-energy curve (cached by the proxies job, else computed now)
+        self.energy = load_motion_energy(video_path, workers=DECODE_WORKERS)
+        self.proposal = propose_trim(self.energy, self.fps)
+
+        # Reset state for current video, opening at the proposed start
+        self.current_frame = self.proposal[0] if self.proposal else 0
+        self.start_frame, self.end_frame = self.proposal if self.proposal else (None, None)
         self.setting_start = True  # Always reset to set start first
+        self.show_motion_curve()
         self.show_frame()
 
     # ========================================
     # Frame Navigation and Display
     # ========================================
 
-    def show_frame(self):
-        # Display the current frame on the canvas
-        if 0 <= self.current_frame < len(self.frames):
-            frame = self.frames[self.current_frame]
+    def show_frame(self, exact=False):
+        # Display the current frame on the canvas (exact=True forces the full-resolution original)
+        if 0 <= self.current_frame < len(self.reader):
+            if self.proxy and not exact:
+                frame = self.proxy.read(self.current_frame)
+            else:
+                frame = self.reader.read(self.current_frame, scale=self.preview_scale)
             frame = cv2.resize(frame, RESIZE_DIMENSIONS)
             rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # Fixed color
             img = tk.PhotoImage(master=self.canvas, data=cv2.imencode(".ppm", rgb)[1].tobytes())
             self.canvas.img = img
             self.canvas.create_image(0, 0, anchor=tk.NW, image=img)
             self.update_info_label()
+            self.draw_motion_cursor()
+
+    def show_filmstrip(self, video_path):
+        strip_path = filmstrip_path(video_path)
+        strip = cv2.imread(str(strip_path)) if strip_path.exists() else None
+        if strip is None:
+            self.filmstrip_frames = []
+            self.filmstrip_canvas.config(height=0)
+            return
+
+        self.filmstrip_frames = filmstrip_indices(len(self.reader))
+        height = max(1, round(strip.shape[0] * RESIZE_DIMENSIONS[0] / strip.shape[1]))
+        strip = cv2.resize(strip, (RESIZE_DIMENSIONS[0], height), interpolation=cv2.INTER_AREA)
+        img = tk.PhotoImage(master=self.filmstrip_canvas, data=cv2.imencode(".ppm", strip)[1].tobytes())
+        self.filmstrip_canvas.img = img
+        self.filmstrip_canvas.config(height=height)
+        self.filmstrip_canvas.create_image(0, 0, anchor=tk.NW, image=img)
+
+    def on_filmstrip_click(self, event):
+        if len(self.filmstrip_frames) == 0:
+            return
+        tile = min(int(event.x * len(self.filmstrip_frames) / RESIZE_DIMENSIONS[0]), len(self.filmstrip_frames) - 1)
+        self.current_frame = int(self.filmstrip_frames[tile])
+        self.show_frame()
+
+    def frame_to_x(self, frame):
+        return frame * (RESIZE_DIMENSIONS[0] - 1) / max(1, len(self.reader) - 1)
+
+    def show_motion_curve(self):
+        self.motion_canvas.delete("all")
+        if self.energy is None or len(self.energy) < 2:
+            return
+
+        # Curve scaled to the strip height
+        peak = max(float(self.energy.max()), 1e-6)
+        points = []
+        for i, e in enumerate(self.energy):
+            points += [self.frame_to_x(i), MOTION_CURVE_HEIGHT - 2 - e / peak * (MOTION_CURVE_HEIGHT - 4)]
+        self.motion_canvas.create_line(*points, fill="white")
+
+        # Proposed trim
+        if self.proposal:
+            for frame, color in zip(self.proposal, ("green", "red")):
+                x = self.frame_to_x(frame)
+                self.motion_canvas.create_line(x, 0, x, MOTION_CURVE_HEIGHT, fill=color, width=2)
+        self.motion_canvas.create_line(0, 0, 0, MOTION_CURVE_HEIGHT, fill="yellow", tags="cursor")
+
+    def draw_motion_cursor(self):
+        x = self.frame_to_x(self.current_frame)
+        self.motion_canvas.coords("cursor", x, 0, x, MOTION_CURVE_HEIGHT)
+
+    def on_motion_click(self, event):
+        frame = round(event.x * (len(self.reader) - 1) / (RESIZE_DIMENSIONS[0] - 1))
+        self.current_frame = max(0, min(frame, len(self.reader) - 1))
+        self.show_frame()
 
     def update_info_label(self):
         info = f"Current Frame: {self.current_frame}"
@@ -205,6 +381,8 @@ class VideoTrimmer:
             info += f" | Start: {self.start_frame}"
         if self.end_frame is not None:
             info += f" | End: {self.end_frame}"
+        if self.proposal:
+            info += f" | Proposed: {self.proposal[0]}-{self.proposal[1]} (Space to accept)"
         self.info_label.config(text=info)
 
     def prev_frame(self):
@@ -213,12 +391,12 @@ class VideoTrimmer:
             self.show_frame()
 
     def next_frame(self):
-        if self.current_frame < len(self.frames) - 1:
+        if self.current_frame < len(self.reader) - 1:
             self.current_frame += 1
             self.show_frame()
     
     def jump_frames(self, amount):
-        self.current_frame = max(0, min(self.current_frame + amount, len(self.frames) - 1))
+        self.current_frame = max(0, min(self.current_frame + amount, len(self.reader) - 1))
         self.show_frame()
 
 
@@ -226,15 +404,23 @@ class VideoTrimmer:
     # Frame Selection
     # ========================================
 
+    def accept_proposal(self):
+        # Save the motion-energy proposal as is (one keystroke per clip when it is right)
+        if not self.proposal:
+            print("No trim proposal for this clip.")
+            return
+        self.start_frame, self.end_frame = self.proposal
+        self.save_trim()
+
     def set_start(self):
         self.start_frame = self.current_frame
         print(f"Start frame set: {self.start_frame}")
-        self.update_info_label()
+        self.show_frame(exact=True)  # Confirm the mark on the original, not the proxy
 
     def set_end(self):
         self.end_frame = self.current_frame
         print(f"End frame set: {self.end_frame}")
-        self.update_info_label()
+        self.show_frame(exact=True)
 
     # ========================================
     # Save Trimmed Video
@@ -249,16 +435,29 @@ class VideoTrimmer:
         end = max(self.start_frame, self.end_frame)
 
         filename = f"freethrow{self.video_index + 1:03d}_trimmed.mp4"
-        output_path = self.output_dir / filename
-
-        height, width = self.frames[0].shape[:2]
-        out = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
-
-        for f in self.frames[start:end+1]:
-            out.write(f)
-        out.release()
-
-        print(f"Saved trimmed video: {output_path}")
+        video_path = Path(self.video_files[self.video_index])
+
+        # One manual trim covers all three streams through the cross-camera offsets
+        source_camera = self.trim_camera.get()
+        rows = []
+        for camera, (raw_path, cam_start, cam_end) in propagate_trim(video_path, start, end, source_camera).items():
+            output_path = camera_dirs[camera][1] / filename
+            if camera == source_camera:
+                written = write_clip(self.reader, cam_start, cam_end, output_path, self.fps)
+            else:
+                with open_frames(raw_path, session_cache_dir(session_dir)) as reader:
+                    fps = reader.fps if reader.fps > 0 else self.fps
+                    written = write_clip(reader, cam_start, cam_end, output_path, fps)
+            if written is None:
+                print(f"[WARNING] {camera}: mapped frames {cam_start}-{cam_end} lie outside {raw_path.name}; not trimmed")
+                continue
+            cam_start, cam_end = written
+            rows.append({"clip": video_path.stem, "camera": camera, "marked_on": source_camera,
+                         "source": raw_path.name, "start_frame": cam_start, "end_frame": cam_end,
+                         "output": output_path.name})
+            print(f"Saved trimmed video ({camera}, frames {cam_start}-{cam_end}): {output_path}")
+
+        update_trims_manifest(rows)
         self.next_video()
 
     def next_video(self):
@@ -284,7 +483,7 @@ class VideoTrimmer:
             self.current_frame = 0
             self.show_frame()
         elif key == 'End':
-            self.current_frame = len(self.frames) - 1
+            self.current_frame = len(self.reader) - 1
             self.show_frame()
         elif key == 'Next':  # PageDown
             self.jump_frames(60)
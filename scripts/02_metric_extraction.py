@@ -8,7 +8,8 @@ Purpose:
 Steps:
     1. Split video phases
     2. Run ball tracking and extract metrics (arc, spin, contact, velocity)
-    3. Detect 2D and 3D player keypoints
+    3. Check clip quality, then detect 2D and 3D player keypoints on usable clips
+       [Optional] Hand landmarks in the release window
     4. [Optional] Visualize player tracking results
     5. Combine shot metrics into summary CSV
     6. Split summary into features and labels
@@ -27,6 +28,7 @@ import subprocess
 RUN_SPLIT_PHASES = True
 RUN_BALL_TRACKING = True
 RUN_PLAYER_TRACKING = True
+RUN_HAND_LANDMARKS = False
 RUN_VISUALIZATIONS = False
 RUN_COMBINE_SUMMARIES = True
 RUN_SPLIT_FEATURES_LABELS = True  
@@ -38,8 +40,10 @@ RUN_SPLIT_FEATURES_LABELS = True
 SCRIPT_PATHS = {
     "split_phases":              "02_metric_extraction/split_phases/split_phases.py",
     "ball_tracking":             "02_metric_extraction/ball_tracking/detect_makes.py",
-    "detect_2d_keypoints":       "02_metric_extraction/player_tracking/detect_2d_keypoints.py",
-    "detect_3d_keypoints":       "02_metric_extraction/player_tracking/detect_3d_keypoints.py",
+    "check_clip_quality":        "02_metric_extraction/player_tracking/check_clip_quality.py",
+    "extract_2d_keypoints":      "02_metric_extraction/player_tracking/extract_2d_keypoints.py",
+    "extract_hand_keypoints":    "02_metric_extraction/player_tracking/extract_hand_keypoints.py",
+    "extract_3d_keypoints":      "02_metric_extraction/player_tracking/extract_3d_keypoints.py",
     "visualize_2d_keypoints":    "02_metric_extraction/player_tracking/visualize_2d_keypoints.py",
     "visualize_3d_keypoints":    "02_metric_extraction/player_tracking/visualize_3d_keypoints.py",
     "combine_summaries":         "02_metric_extraction/summary_builder/combine_release_summaries.py",
@@ -73,8 +77,11 @@ if __name__ == "__main__":
         run_script("Ball Tracking + Metric Extraction", SCRIPT_PATHS["ball_tracking"])
 
     if RUN_PLAYER_TRACKING:
-        run_script("Detect 2D Keypoints", SCRIPT_PATHS["detect_2d_keypoints"])
-        run_script("Detect 3D Keypoints", SCRIPT_PATHS["detect_3d_keypoints"])
+        run_script("Check Clip Quality", SCRIPT_PATHS["check_clip_quality"])
+        run_script("Extract 2D Keypoints", SCRIPT_PATHS["extract_2d_keypoints"])
+        if RUN_HAND_LANDMARKS:
+            run_script("Release Hand Landmarks", SCRIPT_PATHS["extract_hand_keypoints"])
+        run_script("Extract 3D Keypoints", SCRIPT_PATHS["extract_3d_keypoints"])
 
     if RUN_VISUALIZATIONS:
         run_script("Visualize 2D Keypoints", SCRIPT_PATHS["visualize_2d_keypoints"])
@@ -1,3 +1,4 @@
+import sys
 import cv2
 import numpy as np
 import csv
@@ -5,6 +6,9 @@ from pathlib import Path
 import math
 import yaml
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.frame_cache import open_frames, session_cache_dir
+
 # from metrics.release_angle import te_release_anglecompu
 # from metrics.elbow_release_frame import find_release_frame
 
@@ -31,6 +35,9 @@ HSV_UPPER = np.array([5, 255, 255])
 DISPLAY = True
 PRINT_TRAJECTORY = True
 
+# Decode threads for MJPG clips (None -> one per core, capped)
+DECODE_WORKERS = cfg.get("decode_workers")
+
 # =========================
 # Paths 
 # =========================
@@ -38,6 +45,7 @@ PRINT_TRAJECTORY = True
 BASE_DIR = Path(__file__).resolve().parents[3]
 INPUT_FOLDER = BASE_DIR / "data" / ATHLETE / SESSION / "videos" / "ball_tracking" / "synchronized"
 OUTPUT_PATH = BASE_DIR / "data" / ATHLETE / SESSION / "metrics" / "ball_tracking_metrics" / "outcomes" / "freethrow_results.csv"
+FRAME_CACHE_DIR = session_cache_dir(BASE_DIR / "data" / ATHLETE / SESSION)  # Filled by utils/frame_cache.py (optional)
 
 # =========================
 # Global Variables
@@ -144,15 +152,17 @@ def is_make(trajectory, upper_box, lower_box):
 def main():
     results = []
 
+    video_paths = sorted([*INPUT_FOLDER.glob("*.mp4"), *INPUT_FOLDER.glob("*.avi")])
     print(f"Looking for videos in: {INPUT_FOLDER}")
-    print(f"Found videos: {list(INPUT_FOLDER.glob('*.mp4'))}")
+    print(f"Found videos: {video_paths}")
 
 
     # Process each video
-    for video_path in sorted(INPUT_FOLDER.glob("*.mp4")):
+    for video_path in video_paths:
         print(f"\nProcessing {video_path.name}")
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
+        try:
+            reader = open_frames(video_path, FRAME_CACHE_DIR)
+        except ValueError:
             print(f"Failed to open video")
             continue
         
@@ -160,10 +170,10 @@ def main():
         trajectory = []
         frame_idx = 0
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        # MJPG clips are decoded on a thread pool ahead of the detector (or read from the frame cache)
+        for frame in reader.iter_frames(workers=DECODE_WORKERS):
+            if DISPLAY:
+                frame = frame.copy()  # Cached frames are read-only views
 
             # Detect ball center
             ball_center = detect_ball_center(frame, frame_idx)
@@ -191,7 +201,7 @@ def main():
                 if cv2.waitKey(30) & 0xFF == ord('q'):
                     break
 
-        cap.release()
+        reader.close()
         
         if DISPLAY:
             cv2.destroyAllWindows()
@@ -1,12 +1,30 @@
-import mediapipe as mp
+import sys
 import numpy as np
 import cv2
+import yaml
+from pathlib import Path
 
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(static_image_mode=False)
+sys.path.append(str(Path(__file__).resolve().parents[4]))  # project root, for utils/
+from utils.pose_service import connect_backend
+
+# MediaPipe Pose landmark indices (right arm)
+RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST = 12, 14, 16
+
+pose = None  # Created on first use: the warm pose service if running, else a local MediaPipe Pose
 
 elbow_angles = []
 
+
+def get_pose():
+    """Pose backend, connected on first use so importing this module stays cheap."""
+    global pose
+    if pose is None:
+        config_path = Path(__file__).resolve().parents[4] / "project_config.yaml"
+        with open(config_path, "r") as f:
+            cfg = yaml.safe_load(f)
+        pose = connect_backend(cfg, spec={"name": "mediapipe"})
+    return pose
+
 def calculate_angle(a, b, c):
     """ Returns the angle at point b (in degrees) between points a and c. """
     a = np.array(a)
@@ -23,18 +41,13 @@ def find_release_frame(frame, frame_idx, _):
     global elbow_angles
 
     image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(image_rgb)
-
-    if results.pose_landmarks:
-        landmarks = results.pose_landmarks.landmark
+    landmarks = get_pose().process(image_rgb)
 
+    if landmarks is not None:
         # Use right arm (you can flip this if left-handed)
-        shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x,
-                    landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-        elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x,
-                 landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-        wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x,
-                 landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
+        shoulder = landmarks[RIGHT_SHOULDER, :2]
+        elbow = landmarks[RIGHT_ELBOW, :2]
+        wrist = landmarks[RIGHT_WRIST, :2]
 
         angle = calculate_angle(shoulder, elbow, wrist)
         elbow_angles.append((frame_idx, angle))
@@ -1,12 +1,22 @@
 import math
 
-def compute_release_angle(trajectory, release_frame, window=10):
+def compute_release_angle(trajectory, release_frame, window=10, time_base=None, release_camera="left"):
     """
     Compute angle from first point after release_frame to a second point 'window' frames later.
+
+    trajectory holds (ball-camera frame index, (x, y)) pairs. If release_frame was found on a player
+    camera, pass the clip's time base so it is mapped to the ball camera first:
+        time_base = load_time_base(session_dir, clip, cfg)     # utils/time_base.py
+    Both frame indices must count from the start of the raw recordings, the origin the time base
+    uses. No stage computes release angles yet (detect_makes.py keeps ball centres without frame
+    indices), so nothing passes a time base so far.
     """
     if release_frame is None:
         raise ValueError("Invalid release frame")
 
+    if time_base is not None:
+        release_frame = time_base.map_frames(release_frame, release_camera, "ball")
+
     # Find pt1: first valid point where idx >= release_frame
     pt1 = None
     idx1 = None
@@ -1,9 +1,13 @@
+import sys
 import cv2
 import numpy as np
 import tkinter as tk
 from tkinter import ttk
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.avi_reader import open_reader, scale_for_width
+
 # -------------------------------
 # Config: Load Frame from Project
 # -------------------------------
@@ -14,15 +18,17 @@ SCRIPT_DIR = Path(__file__).resolve().parent
 BASE_DIR = SCRIPT_DIR.parents[2]  # go up to project root
 VIDEO_PATH = BASE_DIR / "data" / SESSION / "angled" / "trimmed" / VIDEO_FILE
 
-cap = cv2.VideoCapture(str(VIDEO_PATH))
-ret, frame = cap.read()
-cap.release()
+DISPLAY_SIZE = (960, 540)
 
-if not ret:
+# Decode at reduced resolution when the video is larger than the tuning window
+try:
+    with open_reader(VIDEO_PATH) as reader:
+        frame = reader.read(0, scale=scale_for_width(reader.width, DISPLAY_SIZE[0]))
+except (ValueError, IndexError):
     print(f"❌ Could not load frame from: {VIDEO_PATH}")
     exit()
 
-frame_resized = cv2.resize(frame, (960, 540))
+frame_resized = cv2.resize(frame, DISPLAY_SIZE)
 hsv = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2HSV)
 
 # -------------------------------
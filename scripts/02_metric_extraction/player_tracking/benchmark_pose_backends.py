@@ -0,0 +1,208 @@
+"""
+Title: benchmark_pose_backends.py
+
+Description:
+    Benchmarks the pose backends of utils/pose_backends.py on the same clips, so the faster model
+    can be chosen per deployment (pose_backend in project_config.yaml). Each view is decoded in
+    chunks of BENCH_CHUNK frames and every chunk is fed to all backends before the next one is
+    decoded, so memory stays at one chunk and only inference is timed. Every backend is compared
+    against the reference backend (MediaPipe) landmark by landmark. A backend that fails to load
+    (missing package, bad model file) is reported and skipped.
+
+Inputs:
+    - Raw left/right player tracking videos (or synchronized videos), as in extract_2d_keypoints.py
+    - pose_onnx_model / pose_batch_size from project_config.yaml for the onnx backend
+
+Usage:
+    - Run the benchmark on the first BENCH_CLIPS clips of the session:
+        python benchmark_pose_backends.py
+
+Outputs:
+    - metrics/pose_backend_benchmark.csv: backend, config, frames, load_s, seconds, frames_per_s, detection_rate
+    - metrics/pose_backend_agreement.csv: backend, landmark, frames, mean_error_px, pck (share of
+      frames within PCK_THRESHOLD of the frame width of the reference)
+"""
+
+import sys
+import time
+import json
+import itertools
+import cv2
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import yaml
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.video_views import stereo_clips, open_side
+from utils.keypoint_store import POSE_LANDMARKS
+from utils.pose_backends import backend_options, create_backend
+
+# ========================================
+# Config
+# ========================================
+
+config_path = Path(__file__).resolve().parents[3] / "project_config.yaml"
+with open(config_path, "r") as f:
+    cfg = yaml.safe_load(f)
+
+ATHLETE = cfg["athlete"]
+SESSION = cfg["session"]
+
+BACKENDS = ["mediapipe", "onnx"]    # The first backend is the reference for agreement
+BENCH_CLIPS = 2                     # Clips benchmarked (both views of each)
+BENCH_MAX_FRAMES = 300              # Frames per view
+BENCH_CHUNK = 32                    # Frames decoded at a time and fed to every backend
+PCK_THRESHOLD = 0.05                # Agreement radius as a fraction of the frame width
+
+# ========================================
+# Paths and Directories
+# ========================================
+base_dir = Path(__file__).resolve().parents[3]
+session_dir = base_dir / "data" / ATHLETE / SESSION
+
+raw_left_dir = session_dir / "videos" / "player_tracking" / "raw" / "left"
+raw_right_dir = session_dir / "videos" / "player_tracking" / "raw" / "right"
+input_video_dir = session_dir / "videos" / "player_tracking" / "synchronized"
+metrics_dir = session_dir / "metrics"
+
+# ========================================
+# Benchmark
+# ========================================
+def bench_sources():
+    """Sources of both views of the first BENCH_CLIPS clips."""
+    sources = []
+    for i, (stem, *clip_sources) in enumerate(stereo_clips(raw_left_dir, raw_right_dir, input_video_dir)):
+        if i == BENCH_CLIPS:
+            break
+        sources += clip_sources
+    return sources
+
+
+def load_backends():
+    """
+    Create every benchmarked backend; one that fails to load is reported and skipped.
+
+    Returns:
+        dict[str, tuple[PoseBackend, float]]: Backend and load seconds per backend name.
+    """
+    backends = {}
+    for name in BACKENDS:
+        start = time.perf_counter()
+        try:
+            backend_name, options = backend_options(cfg, name, base_dir)
+            backend = create_backend(backend_name, **options)
+        except Exception as e:  # Missing package, or e.g. onnxruntime failing on a bad pose_onnx_model
+            print(f"[WARNING] Skipping {name}: {type(e).__name__}: {e}")
+            continue
+        backends[name] = (backend, time.perf_counter() - start)
+    return backends
+
+
+def run_view(backends, source):
+    """
+    Stream one view through every backend, BENCH_CHUNK decoded frames at a time.
+
+    Returns:
+        tuple[dict, dict, tuple[int, int]]: (frames, 33, 3) keypoints (NaN = missing) and inference
+            seconds per backend name, and the (width, height) of the view.
+    """
+    for backend, _ in backends.values():
+        backend.reset()
+    points = {name: [] for name in backends}
+    seconds = dict.fromkeys(backends, 0.0)
+
+    with open_side(source) as view:
+        size = (view.width, view.height)
+        frames = view.iter_frames(0, min(len(view), BENCH_MAX_FRAMES))
+        while chunk := [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in itertools.islice(frames, BENCH_CHUNK)]:
+            for name, (backend, _) in backends.items():
+                start = time.perf_counter()
+                if backend.batch_size > 1:
+                    points[name] += backend.process_batch(chunk)
+                else:
+                    points[name] += [backend.process(rgb) for rgb in chunk]
+                seconds[name] += time.perf_counter() - start
+
+    empty = np.full((len(POSE_LANDMARKS), 3), np.nan, np.float32)
+    keypoints = {name: np.stack([empty if pts is None else pts for pts in out] or [empty])[:len(out)]
+                 for name, out in points.items()}
+    return keypoints, seconds, size
+
+
+def benchmark_row(name, backend, load_s, results, seconds):
+    """Throughput row of one backend over every view."""
+    n_frames = sum(len(kp) for kp in results)
+    detected = sum(int((~np.isnan(kp[:, :, 0])).any(axis=1).sum()) for kp in results)
+    return {
+        "backend": name, "config": json.dumps(backend.config), "frames": n_frames, "load_s": round(load_s, 3),
+        "seconds": round(seconds, 3), "frames_per_s": round(n_frames / seconds, 1) if seconds > 0 else 0,
+        "detection_rate": round(detected / n_frames, 3) if n_frames else 0,
+    }
+
+
+def agreement(name, results, reference, sizes):
+    """Per-landmark pixel error and PCK of a backend against the reference backend."""
+    err, width = [], []
+    for kp, ref, (w, h) in zip(results, reference, sizes):
+        err.append(np.hypot((kp[..., 0] - ref[..., 0]) * w, (kp[..., 1] - ref[..., 1]) * h))
+        width.append(np.full(len(kp), w))
+    err, width = np.concatenate(err), np.concatenate(width)
+
+    rows = []
+    for j, landmark in enumerate(POSE_LANDMARKS):
+        valid = ~np.isnan(err[:, j])
+        if not valid.any():
+            continue  # Not provided by one of the backends
+        e = err[valid, j]
+        rows.append({
+            "backend": name, "landmark": landmark, "frames": int(valid.sum()),
+            "mean_error_px": round(float(e.mean()), 2),
+            "pck": round(float((e <= PCK_THRESHOLD * width[valid]).mean()), 3),
+        })
+    return rows
+
+# ========================================
+# Main Pipeline
+# ========================================
+if __name__ == "__main__":
+    sources = bench_sources()
+    if not sources:
+        sys.exit("❌ No player tracking clips found")
+    backends = load_backends()
+    if not backends:
+        sys.exit("❌ No pose backend could be loaded")
+    print(f"[INFO] Benchmarking {', '.join(backends)} on {len(sources)} views")
+
+    results = {name: [] for name in backends}
+    seconds = dict.fromkeys(backends, 0.0)
+    sizes = []
+    for source in sources:
+        keypoints, view_seconds, size = run_view(backends, source)
+        for name in backends:
+            results[name].append(keypoints[name])
+            seconds[name] += view_seconds[name]
+        sizes.append(size)
+
+    bench_rows, agreement_rows, reference = [], [], None
+    for name, (backend, load_s) in backends.items():
+        row = benchmark_row(name, backend, load_s, results[name], seconds[name])
+        backend.close()
+        bench_rows.append(row)
+        print(f"[INFO] {name}: {row['frames_per_s']} frames/s (load {row['load_s']}s, "
+              f"pose in {row['detection_rate']:.0%} of frames)")
+        if reference is None:
+            reference = results[name]
+        else:
+            agreement_rows += agreement(name, results[name], reference, sizes)
+
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(bench_rows).to_csv(metrics_dir / "pose_backend_benchmark.csv", index=False)
+    print(f"✅ Saved throughput: {metrics_dir / 'pose_backend_benchmark.csv'}")
+    if agreement_rows:
+        df = pd.DataFrame(agreement_rows)
+        df.to_csv(metrics_dir / "pose_backend_agreement.csv", index=False)
+        for name, group in df.groupby("backend"):
+            print(f"[INFO] {name} vs {BACKENDS[0]}: mean PCK@{PCK_THRESHOLD} {group['pck'].mean():.3f}, "
+                  f"mean error {group['mean_error_px'].mean():.1f}px over {len(group)} landmarks")
+        print(f"✅ Saved agreement: {metrics_dir / 'pose_backend_agreement.csv'}")
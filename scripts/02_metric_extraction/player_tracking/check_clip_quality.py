@@ -0,0 +1,168 @@
+"""
+Title: check_clip_quality.py
+
+Description:
+    Fast quality pass over a session's stereo clips before full keypoint extraction. Pose runs on a
+    sparse, evenly spaced sample of frames from each view; clips where the athlete is rarely
+    detected, or detected with low visibility of the shooting-relevant joints, are marked unusable
+    in the session manifest (utils/session_manifest.py). extract_2d_keypoints.py,
+    extract_3d_keypoints.py and visualize_2d_keypoints.py skip those clips.
+    The extraction time a skipped clip saves is estimated by timing the configured tracking backend
+    (the one extract_2d_keypoints.py uses) on a short run of consecutive frames of the clip;
+    single-image detection on the sparse samples is slower per frame and would overstate it.
+
+Inputs:
+    - Raw left/right player tracking videos (or synchronized videos), as in extract_2d_keypoints.py
+
+Usage:
+    - Check every clip of the session in project_config.yaml:
+        python check_clip_quality.py
+
+Outputs:
+    - metrics/session_manifest.csv (clip, usable, reason, detection_rate, mean_visibility, ...)
+    - Per-clip results, the time the pass took and the extraction time it saved, printed to the terminal
+"""
+
+import sys
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+import yaml
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.frame_cache import session_cache_dir
+from utils.video_views import stereo_clips, open_side
+from utils.pose_service import connect_backend
+from utils.session_manifest import manifest_path, update_manifest
+
+# ========================================
+# Config
+# ========================================
+
+config_path = Path(__file__).resolve().parents[3] / "project_config.yaml"
+with open(config_path, "r") as f:
+    cfg = yaml.safe_load(f)
+
+ATHLETE = cfg["athlete"]
+SESSION = cfg["session"]
+
+QUALITY_SAMPLES = cfg.get("quality_samples", 24)                # Frames sampled per view
+QUALITY_MIN_DETECTION = cfg.get("quality_min_detection", 0.6)   # Share of sampled frames with a pose
+QUALITY_MIN_VISIBILITY = cfg.get("quality_min_visibility", 0.5) # Mean visibility of the key joints when detected
+QUALITY_TIMING_FRAMES = cfg.get("quality_timing_frames", 16)    # Consecutive frames timed with the tracking backend
+KEY_JOINTS = [11, 12, 13, 14, 15, 16, 23, 24]                   # Shoulders, elbows, wrists, hips
+
+# ========================================
+# Paths and Directories
+# ========================================
+base_dir = Path(__file__).resolve().parents[3]
+session_dir = base_dir / "data" / ATHLETE / SESSION
+
+raw_left_dir = session_dir / "videos" / "player_tracking" / "raw" / "left"
+raw_right_dir = session_dir / "videos" / "player_tracking" / "raw" / "right"
+input_video_dir = session_dir / "videos" / "player_tracking" / "synchronized"
+frame_cache_dir = session_cache_dir(session_dir)  # Filled by utils/frame_cache.py (optional)
+
+# ========================================
+# Quality Check
+# ========================================
+def sample_view(detector, view, n_samples=QUALITY_SAMPLES):
+    """
+    Run single-image pose on evenly spaced frames of a view.
+
+    Returns:
+        tuple[float, float, int, float]: (detection rate, mean key-joint visibility over detected
+            frames, frames sampled, inference seconds).
+    """
+    indices = np.unique(np.linspace(0, len(view) - 1, min(n_samples, len(view))).round().astype(int))
+    frames = [cv2.cvtColor(view.read(int(n)), cv2.COLOR_BGR2RGB) for n in indices]
+
+    start = time.perf_counter()
+    results = detector.process_batch(frames)
+    seconds = time.perf_counter() - start
+
+    detected = [pts for pts in results if pts is not None]
+    visibility = float(np.nanmean([pts[KEY_JOINTS, 2] for pts in detected])) if detected else 0.0
+    return len(detected) / max(1, len(indices)), visibility, len(indices), seconds
+
+
+def time_tracking(tracker, view, n_frames=QUALITY_TIMING_FRAMES):
+    """
+    Per-frame time of the tracking backend on consecutive frames from the middle of a view.
+
+    Returns:
+        float: Seconds per frame, as full extraction would spend them.
+    """
+    first = max(0, (len(view) - n_frames) // 2)
+    frames = [cv2.cvtColor(view.read(n), cv2.COLOR_BGR2RGB) for n in range(first, min(len(view), first + n_frames))]
+
+    tracker.reset_tracking()
+    start = time.perf_counter()
+    tracker.process_batch(frames)
+    seconds = time.perf_counter() - start
+    tracker.reset_tracking()
+    return seconds / max(1, len(frames))
+
+
+def check_clip(detector, tracker, stem, sources):
+    """Quality-check both views of a clip and return its manifest row."""
+    start = time.perf_counter()
+    reasons, frames, rates, vis = [], 0, [], []
+    sampled, frame_s = 0, None
+    for view_name, source in zip(("left", "right"), sources):
+        with open_side(source, frame_cache_dir) as view:
+            if len(view) == 0:
+                reasons.append(f"{view_name}: empty")
+                continue
+            rate, visibility, n, _ = sample_view(detector, view)
+            if frame_s is None:
+                frame_s = time_tracking(tracker, view)
+            frames = max(frames, len(view))
+        rates.append(rate)
+        vis.append(visibility)
+        sampled += n
+        if rate < QUALITY_MIN_DETECTION:
+            reasons.append(f"{view_name}: pose in {rate:.0%} of samples")
+        elif visibility < QUALITY_MIN_VISIBILITY:
+            reasons.append(f"{view_name}: key joint visibility {visibility:.2f}")
+
+    return {
+        "clip": stem, "usable": not reasons, "reason": "; ".join(reasons),
+        "detection_rate": round(min(rates), 3) if rates else 0.0,
+        "mean_visibility": round(min(vis), 3) if vis else 0.0,
+        "sampled_frames": sampled, "frames": frames,
+        "check_s": round(time.perf_counter() - start, 2),
+        # Full extraction tracks every frame of both views
+        "est_extract_s": round(2 * frames * frame_s, 1) if frame_s is not None else 0.0,
+    }
+
+# ========================================
+# Main Pipeline
+# ========================================
+if __name__ == "__main__":
+    # Sparse samples: single-image detection, no tracking between frames
+    static = {"name": "mediapipe", "options": {"static_image_mode": True}}
+    detector = connect_backend(cfg, spec=static if cfg.get("pose_backend", "mediapipe") == "mediapipe" else None)
+    tracker = connect_backend(cfg)  # The backend extract_2d_keypoints.py runs, for the time estimate
+
+    rows = []
+    for stem, left_source, right_source in stereo_clips(raw_left_dir, raw_right_dir, input_video_dir):
+        row = check_clip(detector, tracker, stem, (left_source, right_source))
+        status = "✅" if row["usable"] else f"❌ unusable ({row['reason']})"
+        print(f"{status} {stem}: pose in {row['detection_rate']:.0%} of samples, "
+              f"visibility {row['mean_visibility']:.2f} ({row['check_s']:.1f}s)")
+        rows.append(row)
+
+    detector.close()
+    tracker.close()
+    if not rows:
+        sys.exit("❌ No player tracking clips found")
+    update_manifest(session_dir, rows)
+
+    unusable = [r for r in rows if not r["usable"]]
+    check_s = sum(r["check_s"] for r in rows)
+    saved_s = sum(r["est_extract_s"] for r in unusable)
+    print(f"[INFO] {len(unusable)}/{len(rows)} clips unusable; quality pass took {check_s:.1f}s, "
+          f"~{saved_s:.0f}s of pose extraction skipped (net ~{saved_s - check_s:.0f}s saved)")
+    print(f"✅ Saved session manifest: {manifest_path(session_dir)}")
@@ -2,24 +2,57 @@
 Title: extract_2d_keypoints.py
 
 Description:
-    This module's purpose is to extract 2D keypoints from player tracking videos using MediaPipe Pose.
-    It processes synchronized player tracking videos, extracts keypoints, and saves them to CSV files.
+    This module's purpose is to extract 2D keypoints from player tracking videos using a CPU pose
+    backend (utils/pose_backends.py: MediaPipe Pose by default, or a batched ONNX Runtime model).
+    It processes stereo player tracking clips, extracts keypoints, and saves them to the binary
+    keypoint store (utils/keypoint_store.py).
 
 Inputs:
-    - synchronized player tracking videos (1280x640, split into left and right halves)
+    - raw left/right player tracking videos (each 640x640), read as a stereo pair through lazy views
+    - synchronized player tracking videos (1280x640, split into left and right halves) for clips without a raw pair
 
 Usage:
-    - Running the script processes the videos, extracts keypoints, and saves them to CSV files
+    - Running the script processes the videos, extracts keypoints, and saves them to the keypoint store
+    - Frames are streamed: a decode thread reads, splits and color-converts frames into a small
+      bounded queue while pose inference runs, so memory stays flat for clips of any length
+    - Clips marked unusable in the session manifest (check_clip_quality.py) are skipped
+    - (clip, view) jobs run on a process pool; each worker keeps a warm pose backend per view
+    - Models come from the warm pose service (utils/pose_service.py) when it is running, so short
+      runs skip model start-up; otherwise each worker loads its own
+    - pose_backend selects the backend; batched backends (pose_batch_size > 1) run whole-frame
+      batches instead of the sequential ROI tracker
+    - With pose_adaptive_stride, quiet stretches (low motion energy, slow wrists) only get pose on
+      keyframes and the frames in between are interpolated; the windup-to-release burst runs at full rate
 
 Outputs:
-    - CSV files containing 2D keypoints for each frame
+    - metrics/2d_keypoints/<clip>_<view>.npy: float32 (frames, 33, [x, y, v]) keypoints, NaN where
+      no pose was detected
+    - metrics/2d_keypoints/<clip>_<view>.json: landmark names, fps, frame size, source video hash
+      and model config
+    - metrics/2d_keypoints/<clip>_<view>.interpolated.npy: bool per frame, True for rows
+      interpolated between keyframes (utils.keypoint_store.load_interpolated)
+    - Throughput (frames/s) per job and overall printed to the terminal
 """
 
+import os
+import sys
+import time
+import queue
+import threading
 import cv2
-import mediapipe as mp
-import pandas as pd
+import numpy as np
 from pathlib import Path
 import yaml
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.frame_cache import session_cache_dir
+from utils.avi_reader import DEFAULT_DECODE_WORKERS
+from utils.video_views import stereo_clips, open_side
+from utils.motion_energy import load_motion_energy
+from utils.keypoint_store import POSE_LANDMARKS, save_interpolated, save_keypoints, source_hash
+from utils.pose_service import connect_backend
+from utils.session_manifest import unusable_clips, report_skipped
 
 # ========================================
 # Config
@@ -32,6 +65,26 @@ with open(config_path, "r") as f:
 ATHLETE = cfg["athlete"]
 SESSION = cfg["session"]
 
+DECODE_WORKERS = cfg.get("decode_workers")  # None -> one thread per core (capped)
+PIPELINE_QUEUE_SIZE = 8                     # Frames decoded ahead of pose inference
+POSE_WORKERS = cfg.get("pose_workers") or os.cpu_count() or 1
+
+# ROI-tracked pose (see PoseExtractor)
+POSE_ROI = cfg.get("pose_roi", False)
+ROI_MARGIN = 0.25           # Margin added on each side of the landmark box, as a fraction of its size
+ROI_MIN_SIZE = 160          # Smallest crop side in pixels
+ROI_SHRINK = 0.6            # Re-crop when the athlete's box shrinks below this fraction of the crop
+ROI_MIN_VISIBILITY = 0.5    # Landmarks below this visibility do not shape the crop
+ROI_REDETECT_EVERY = 60     # Full-frame detection at least this often (frames)
+
+# Phase-adaptive stride (see keyframe_schedule)
+ADAPTIVE_STRIDE = cfg.get("pose_adaptive_stride", False)
+KEYFRAME_STRIDE = 6         # Frames between keyframes in quiet stretches
+ACTIVE_FRACTION = 0.2       # Motion energy above baseline + this fraction of (peak - baseline) is active
+ACTIVE_PAD_S = 0.25         # Active stretches are widened by this much on each side
+WRIST_SPEED_ACTIVE = 0.5    # Wrist speed (frame widths / s) that switches to full rate
+WRIST_INDICES = (15, 16)    # left_wrist, right_wrist
+
 # ========================================
 # Paths and Directories
 # ========================================
@@ -41,114 +94,398 @@ session_dir = base_dir / "data" / ATHLETE / SESSION
 videos_dir = session_dir / "videos"
 metrics_dir = session_dir / "metrics"
 
+raw_left_dir = videos_dir / "player_tracking" / "raw" / "left"
+raw_right_dir = videos_dir / "player_tracking" / "raw" / "right"
 input_video_dir = videos_dir / "player_tracking" / "synchronized"
 output_keypoints_dir = metrics_dir / "2d_keypoints"
+frame_cache_dir = session_cache_dir(session_dir)  # Filled by utils/frame_cache.py (optional)
 
 # Ensure output directory exists
 output_keypoints_dir.mkdir(parents=True, exist_ok=True)
 
 # ========================================
-# Classes
+# Streaming
 # ========================================
-class VideoProcessor:
-    """Handles video reading and splitting into left and right frames."""
-    
-    # VideoProcessor initialization:
-    def __init__(self, video_path):
-        self.cap = cv2.VideoCapture(str(video_path))
-        self.frames = self._read_frames()
-        self.cap.release()
-
-    def _read_frames(self):
-        frames = []
+_END = object()  # Queue sentinel: the producer is done
+
+
+def stream_rgb(frames, queue_size=PIPELINE_QUEUE_SIZE):
+    """
+    Yield RGB copies of BGR frames one at a time.
+
+    Iterating `frames` (decoding, cropping) and the BGR->RGB conversion run on a background thread
+    that stays at most queue_size items ahead, so they overlap with inference in the caller.
+    """
+    items = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in frames:
+                if stop.is_set():
+                    return
+                items.put(cv2.cvtColor(item, cv2.COLOR_BGR2RGB))
+        except Exception as e:
+            items.put(e)  # Re-raised in the consumer
+        finally:
+            items.put(_END)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
         while True:
-            ret, frame = self.cap.read()
-            if not ret:
+            item = items.get()
+            if item is _END:
                 break
-            frames.append(frame)
-        return frames
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Consumer stopped early: unblock the producer and wait for it
+        stop.set()
+        while producer.is_alive():
+            try:
+                items.get(timeout=0.1)
+            except queue.Empty:
+                pass
 
-    def split_frames(self):
-        left, right = [], []
-        for frame in self.frames:
-            h, w, _ = frame.shape
-            mid = w // 2
-            left.append(frame[:, :mid])
-            right.append(frame[:, mid:])
-        return left, right
+# ========================================
+# Classes
+# ========================================
+class PoseExtractor:
+    """
+    Uses a pose backend (MediaPipe Pose by default) to extract keypoints from frames.
 
+    In ROI mode the tracker only sees a square crop around the athlete (the previous landmarks'
+    bounding box plus a margin), which is cheaper per frame and gives small limbs more pixels.
+    The crop only moves when the athlete leaves it or shrinks well inside it, so MediaPipe's own
+    tracking stays valid between frames. A full-frame detection finds the athlete at the start,
+    whenever the crop loses them, and every ROI_REDETECT_EVERY frames as a drift check.
+    Landmarks are always returned in full-frame normalized coordinates.
 
-class PoseExtractor:
-    """Uses MediaPipe Pose to extract keypoints from frames."""
+    Batched backends skip the ROI tracker (each crop depends on the previous frame's result) and
+    process whole frames through process_batch().
+    """
     
     # PoseExtractor initialization:
-    def __init__(self):
-        self.pose = mp.solutions.pose.Pose()
+    def __init__(self, roi=POSE_ROI, backend=None):
+        self.backend = backend or connect_backend(cfg)  # Warm pose service if running, else a local model
+        self.batched = self.backend.batch_size > 1
+        self.use_roi = roi and not self.batched
+        self.detector = None          # Full-frame single-image backend for (re-)detection in ROI mode, created lazily
+        self.roi = None               # (x0, y0, size) in pixels
+        self.frames_since_detect = 0
 
-    def extract(self, frames):
-        """
-        Extract 2D pose keypoints from a list of video frames.
+    def reset(self):
+        """Drop tracking state before a new clip (the model itself stays loaded)."""
+        self.backend.reset()
+        self.roi = None
+        self.frames_since_detect = 0
 
-        Args:
-            frames (list): A list of frames (BGR format) from a video.
+    def reset_tracking(self):
+        # The tracker's previous landmarks are in the old crop's coordinates
+        self.backend.reset_tracking()
+
+    @property
+    def config(self):
+        """Model configuration for the keypoint store metadata."""
+        return {**self.backend.config, "roi": self.use_roi}
+
+    @staticmethod
+    def _landmarks(pts, crop=None, frame_shape=None):
+        """Flatten a backend's (33, 3) result to [x, y, v] * 33 (-1 = not provided), mapping crop coordinates back to the full frame."""
+        if pts is None:
+            return None
+        pts = np.array(pts, dtype=np.float64)
+        if crop is not None:
+            x0, y0, size = crop
+            h, w = frame_shape[:2]
+            pts[:, 0] = (x0 + pts[:, 0] * size) / w
+            pts[:, 1] = (y0 + pts[:, 1] * size) / h
+        return np.nan_to_num(pts, nan=-1).ravel().tolist()
+
+    def _detect(self, rgb):
+        if self.detector is None:
+            self.detector = self.backend.detector()
+        self.frames_since_detect = 0
+        return self._landmarks(self.detector.process(rgb))
+
+    @staticmethod
+    def _visible_pixels(pts, frame_shape):
+        """Pixel x and y of the landmarks visible enough to shape the crop."""
+        h, w = frame_shape[:2]
+        xs = [x * w for x, v in zip(pts[0::3], pts[2::3]) if v >= ROI_MIN_VISIBILITY and x != -1]
+        ys = [y * h for y, v in zip(pts[1::3], pts[2::3]) if v >= ROI_MIN_VISIBILITY and y != -1]
+        return xs, ys
+
+    def _roi_from(self, pts, frame_shape):
+        """Square crop around the visible landmarks plus margin, clamped to the frame."""
+        h, w = frame_shape[:2]
+        xs, ys = self._visible_pixels(pts, frame_shape)
+        if len(xs) < 2:
+            return None
+        box = max(max(xs) - min(xs), max(ys) - min(ys))
+        size = int(min(max(box * (1 + 2 * ROI_MARGIN), ROI_MIN_SIZE), w, h))
+        cx, cy = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+        x0 = int(min(max(cx - size / 2, 0), w - size))
+        y0 = int(min(max(cy - size / 2, 0), h - size))
+        return x0, y0, size
+
+    def _update_roi(self, pts, frame_shape):
+        """Move the crop only when the landmarks leave its inner area or shrink well inside it."""
+        new = self._roi_from(pts, frame_shape)
+        if new is None or self.roi is None:
+            if new != self.roi:
+                self.roi = new
+                self.reset_tracking()
+            return
+        x0, y0, size = self.roi
+        inner = size * ROI_MARGIN / (1 + 2 * ROI_MARGIN) / 2  # Half the margin must stay free
+        xs, ys = self._visible_pixels(pts, frame_shape)
+        inside = (min(xs) >= x0 + inner and max(xs) <= x0 + size - inner and
+                  min(ys) >= y0 + inner and max(ys) <= y0 + size - inner)
+        if not inside or new[2] < ROI_SHRINK * size:
+            self.roi = new
+            self.reset_tracking()
+
+    def process(self, rgb):
+        """
+        Extract 2D pose keypoints from one RGB frame.
 
         Returns:
-            list: A list of keypoints per frame, where each frame is represented as
-                [x1, y1, v1, x2, y2, v2, ..., x33, y33, v33].
-                If no keypoints detected in a frame, returns [-1]*99.
+            list: [x1, y1, v1, ..., x33, y33, v33] in full-frame normalized coordinates,
+                or [-1]*99 if no pose was detected.
         """
-        keypoints = []
-        for frame in frames:
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.pose.process(rgb)
-            if results.pose_landmarks:
-                pts = [val for lm in results.pose_landmarks.landmark for val in (lm.x, lm.y, lm.visibility)]
-            else:
-                pts = [-1] * (33 * 3)
-            keypoints.append(pts)
-        return keypoints
+        if not self.use_roi:
+            return self._landmarks(self.backend.process(rgb)) or [-1] * (33 * 3)
+
+        pts = None
+        if self.roi is not None and self.frames_since_detect < ROI_REDETECT_EVERY:
+            x0, y0, size = self.roi
+            crop = np.ascontiguousarray(rgb[y0:y0 + size, x0:x0 + size])
+            pts = self._landmarks(self.backend.process(crop), self.roi, rgb.shape)
+            self.frames_since_detect += 1
+            if pts is not None:
+                visibility = [v for v in pts[2::3] if v != -1]
+                if not visibility or np.mean(visibility) < ROI_MIN_VISIBILITY:
+                    pts = None  # Lost inside the crop (or no landmark reported a visibility)
+        if pts is None:
+            pts = self._detect(rgb)  # Re-detect on the full frame
+        if pts is None:
+            return [-1] * (33 * 3)
+
+        self._update_roi(pts, rgb.shape)
+        return pts
+
+    def process_batch(self, frames):
+        """Keypoints of a list of RGB frames in one backend call (no ROI tracking); see process()."""
+        return [self._landmarks(pts) or [-1] * (33 * 3) for pts in self.backend.process_batch(frames)]
 
 
 class KeypointSaver:
-    """Saves extracted keypoints to CSV with appropriate headers."""
-    
-    LANDMARK_NAMES = [
-        "nose", "left_eye_inner", "left_eye", "left_eye_outer", "right_eye_inner", "right_eye", "right_eye_outer",
-        "left_ear", "right_ear", "mouth_left", "mouth_right",
-        "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
-        "left_wrist", "right_wrist", "left_pinky", "right_pinky",
-        "left_index", "right_index", "left_thumb", "right_thumb",
-        "left_hip", "right_hip", "left_knee", "right_knee",
-        "left_ankle", "right_ankle", "left_heel", "right_heel",
-        "left_foot_index", "right_foot_index"
-    ]
+    """Saves extracted keypoints to the binary keypoint store."""
+
+    LANDMARK_NAMES = POSE_LANDMARKS
     """List[str]: The 33 human body landmarks used by Google MediaPipe Pose."""
 
     @staticmethod
-    def save_csv(keypoints, output_path):
-        columns = ['frame'] + [f'{name}_{axis}' for name in KeypointSaver.LANDMARK_NAMES for axis in ('x', 'y', 'v')]
-        df = pd.DataFrame([[i] + kp for i, kp in enumerate(keypoints)], columns=columns)
-        df.to_csv(output_path, index=False)
-        print(f"✅ Saved keypoints: {output_path}")
+    def to_array(keypoints):
+        """Per-frame [x1, y1, v1, ...] lists (-1 = no pose) as a (frames, 33, 3) float32 array with NaN."""
+        data = np.asarray(keypoints, dtype=np.float32).reshape(len(keypoints), len(POSE_LANDMARKS), 3)
+        data[data == -1] = np.nan
+        return data
+
+    @staticmethod
+    def save(keypoints, output_base, meta=None, interpolated=None):
+        """Save keypoints and, row-aligned with them, a bool per frame marking interpolated rows."""
+        if interpolated is None:
+            interpolated = np.zeros(len(keypoints), dtype=bool)
+        path = save_keypoints(output_base, KeypointSaver.to_array(keypoints), meta)
+        save_interpolated(output_base, interpolated)
+        print(f"✅ Saved keypoints: {path}")
+
+# ========================================
+# Adaptive Stride
+# ========================================
+def keyframe_schedule(energy, n_frames, fps):
+    """
+    Frames that get pose inference: every frame in active stretches, keyframes elsewhere.
+
+    Args:
+        energy (np.ndarray): Motion-energy curve of the clip (utils/motion_energy.py).
+        n_frames (int): Frames in the view.
+        fps (float): View FPS.
+
+    Returns:
+        np.ndarray: Bool per frame, True where pose runs.
+    """
+    run = np.zeros(n_frames, dtype=bool)
+    if n_frames == 0:
+        return run  # Empty or unreadable view
+    run[::KEYFRAME_STRIDE] = True
+    run[-1] = True  # Interpolation needs a keyframe at both ends
+
+    energy = np.asarray(energy[:n_frames], dtype=np.float64)
+    if len(energy):
+        baseline, peak = np.median(energy), energy.max()
+        active = energy > baseline + ACTIVE_FRACTION * (peak - baseline) if peak > baseline else np.zeros(len(energy), bool)
+        pad = max(1, int(round(ACTIVE_PAD_S * (fps if fps > 0 else 30))))
+        active = np.convolve(active, np.ones(2 * pad + 1))[pad:pad + len(active)] > 0  # Widen by pad frames
+        run[:len(active)] |= active
+    return run
+
+
+def wrist_speed(prev, cur, fps):
+    """Fastest wrist speed (normalized units / s) between two processed frames (frame, pts)."""
+    (n0, p0), (n1, p1) = prev, cur
+    speeds = []
+    for i in WRIST_INDICES:
+        x0, y0, x1, y1 = p0[3 * i], p0[3 * i + 1], p1[3 * i], p1[3 * i + 1]
+        if -1 not in (x0, y0, x1, y1):
+            speeds.append(np.hypot(x1 - x0, y1 - y0) * fps / (n1 - n0))
+    return max(speeds, default=0.0)
+
+
+def fill_skipped(keypoints):
+    """Linearly interpolate skipped frames (None) between processed frames; -1 where a neighbour has no value."""
+    done = [n for n, kp in enumerate(keypoints) if kp is not None]
+    filled = list(keypoints)
+    for a, b in zip(done, done[1:]):
+        if b - a < 2:
+            continue
+        ka, kb = np.asarray(keypoints[a]), np.asarray(keypoints[b])
+        missing = (ka == -1) | (kb == -1)
+        for n in range(a + 1, b):
+            t = (n - a) / (b - a)
+            filled[n] = np.where(missing, -1, (1 - t) * ka + t * kb).tolist()
+    return [kp if kp is not None else [-1] * (33 * 3) for kp in filled]
+
+# ========================================
+# Worker Process
+# ========================================
+_extractors = {}  # One warm PoseExtractor per view, per worker process
+
+
+def clip_length(left_source, right_source):
+    """Frames shared by both views of a clip (the CSVs of a clip must line up row for row)."""
+    with open_side(left_source) as left, open_side(right_source) as right:
+        return min(len(left), len(right))
+
+
+def extract_view(stem, view_name, source, n_frames, decode_workers):
+    """
+    Extract keypoints for one view of one clip (runs in a worker process).
+
+    Args:
+        stem (str): Clip name.
+        view_name (str): "left" or "right"; selects this worker's warm extractor for the view.
+        source (tuple): (path, half) from stereo_clips().
+        n_frames (int): Frames to process.
+        decode_workers (int): Decode threads for this job.
+
+    Returns:
+        tuple[str, str, list, list, dict, float]: (stem, view_name, keypoints per frame,
+            interpolated flag per frame, store metadata, seconds).
+    """
+    start_time = time.perf_counter()
+    extractor = _extractors.get(view_name)
+    if extractor is None:
+        extractor = _extractors[view_name] = PoseExtractor()
+    else:
+        extractor.reset()
+
+    with open_side(source, frame_cache_dir).time_range(0, n_frames) as view:
+        fps = view.fps
+        meta = {
+            "fps": fps, "width": view.width, "height": view.height,
+            "source": Path(source[0]).name, "half": source[1], "source_hash": source_hash(source[0]),
+            "model": {**extractor.config, "adaptive_stride": ADAPTIVE_STRIDE,
+                      "keyframe_stride": KEYFRAME_STRIDE if ADAPTIVE_STRIDE else 1},
+        }
+        schedule = None
+        if ADAPTIVE_STRIDE:
+            schedule = keyframe_schedule(load_motion_energy(source[0], workers=decode_workers), n_frames, fps)
+
+        frames = stream_rgb(view.iter_frames(workers=decode_workers))
+        if extractor.batched:
+            keypoints = extract_batched(extractor, frames, schedule)
+        else:
+            keypoints = extract_sequential(extractor, frames, schedule, fps)
+
+    interpolated = [kp is None for kp in keypoints]
+    return stem, view_name, fill_skipped(keypoints), interpolated, meta, time.perf_counter() - start_time
+
+
+def extract_sequential(extractor, frames, schedule, fps):
+    """Per-frame inference; with a schedule, quiet frames are skipped (None) unless the wrists move fast."""
+    keypoints, last, fast = [], None, False
+    for n, rgb in enumerate(frames):
+        if schedule is not None and not (schedule[n] or fast):
+            keypoints.append(None)  # Filled in between keyframes by fill_skipped()
+            continue
+        pts = extractor.process(rgb)
+        if last is not None and schedule is not None:
+            fast = wrist_speed(last, (n, pts), fps) > WRIST_SPEED_ACTIVE  # Full rate while the wrists move
+        last = (n, pts)
+        keypoints.append(pts)
+    return keypoints
+
+
+def extract_batched(extractor, frames, schedule):
+    """
+    Batched inference over the scheduled frames (all frames without a schedule).
+
+    The wrist-speed switch needs each result before the next frame, so batches follow the
+    motion-energy schedule only.
+    """
+    keypoints, batch, batch_idx = [], [], []
+
+    def flush():
+        for n, pts in zip(batch_idx, extractor.process_batch(batch)):
+            keypoints[n] = pts
+        batch.clear()
+        batch_idx.clear()
+
+    for n, rgb in enumerate(frames):
+        keypoints.append(None)
+        if schedule is not None and not schedule[n]:
+            continue
+        batch.append(rgb)
+        batch_idx.append(n)
+        if len(batch) == extractor.backend.batch_size:
+            flush()
+    flush()
+    return keypoints
 
 # ========================================
 # Main Pipeline
 # ========================================
 if __name__ == "__main__":
-    for video_path in sorted(input_video_dir.glob("*.avi")):
-        print(f"Processing {video_path.name}...")
-
-        # Load and split video frames
-        processor = VideoProcessor(video_path)
-        left_frames, right_frames = processor.split_frames()
-
-        # Extract keypoints for both views
-        extractor = PoseExtractor()
-        left_kps = extractor.extract(left_frames)
-        right_kps = extractor.extract(right_frames)
-
-        # Save to CSV
-        left_csv = output_keypoints_dir / f"{video_path.stem}_left.csv"
-        right_csv = output_keypoints_dir / f"{video_path.stem}_right.csv"
-        KeypointSaver.save_csv(left_kps, left_csv)
-        KeypointSaver.save_csv(right_kps, right_csv)
+    jobs, skipped = [], []
+    unusable = unusable_clips(session_dir)  # Marked by check_clip_quality.py
+    for stem, left_source, right_source in stereo_clips(raw_left_dir, raw_right_dir, input_video_dir):
+        if stem in unusable:
+            skipped.append(stem)
+            continue
+        n_frames = clip_length(left_source, right_source)
+        jobs += [(stem, "left", left_source, n_frames), (stem, "right", right_source, n_frames)]
+    report_skipped(session_dir, skipped, "2D keypoint extraction", estimate_saved=True)
+    print(f"Processing {len(jobs)} (clip, view) jobs on {POSE_WORKERS} workers...")
+
+    # Split decode threads between the workers so the pool does not oversubscribe the CPU
+    decode_workers = max(1, (DECODE_WORKERS or DEFAULT_DECODE_WORKERS) // POSE_WORKERS)
+    total_frames, start_time = 0, time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=POSE_WORKERS) as pool:
+        futures = [pool.submit(extract_view, *job, decode_workers) for job in jobs]
+        for future in as_completed(futures):
+            stem, view_name, keypoints, interpolated, meta, seconds = future.result()
+            fps = len(keypoints) / seconds if seconds > 0 else 0
+            print(f"[INFO] {stem} {view_name}: {len(keypoints)} frames in {seconds:.1f}s ({fps:.1f} frames/s, "
+                  f"{len(keypoints) - sum(interpolated)} inferred)")
+            KeypointSaver.save(keypoints, output_keypoints_dir / f"{stem}_{view_name}", meta, interpolated)
+            total_frames += len(keypoints)
+
+    elapsed = time.perf_counter() - start_time
+    if elapsed > 0:
+        print(f"✅ {total_frames} frames in {elapsed:.1f}s ({total_frames / elapsed:.1f} frames/s overall)")
@@ -1,11 +1,20 @@
 
 
-import pandas as pd
+import sys
+import time
 import numpy as np
 import cv2
 from pathlib import Path
 import yaml
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.keypoint_store import load_any, part_base, save_keypoints, to_pixels
+from utils.session_manifest import unusable_clips, report_skipped
+from utils.stereo import (calibration_path, load_calibration, undistort_pixels, epipolar_filter, reason_counts,
+                          triangulate_dlt)
+from utils.time_base import measured_offsets
+from utils.keypoint_sync import estimate_keypoint_offset, resample_view
+
 # ========================================
 # Config
 # ========================================
@@ -17,6 +26,12 @@ with open(config_path, "r") as f:
 ATHLETE = cfg["athlete"]
 SESSION = cfg["session"]
 
+EPIPOLAR_MAX_PX = cfg.get("epipolar_max_px", 8.0)           # Pairs farther from each other's epipolar lines are dropped
+EPIPOLAR_MIN_VISIBILITY = cfg.get("epipolar_min_visibility", 0.3)
+KEYPOINT_SYNC_MAX_OFFSET_S = cfg.get("keypoint_sync_max_offset_s", 0.5)   # Search range when the LED flash was missed
+KEYPOINT_SYNC_MIN_CORR = cfg.get("keypoint_sync_min_corr", 0.5)           # Weaker keypoint sync is not applied
+TIME_LEGACY = cfg.get("triangulation_time_legacy", False)                 # Also run the per-point loop and compare
+
 # ======================================== 
 # Paths 
 # ========================================
@@ -25,11 +40,10 @@ base_dir = script_dir.parents[2]  # Go up to project root
 session_dir = base_dir / "data" / ATHLETE / SESSION
 
 # Calibration path
-calib_path = session_dir / "calibration" / "stereo_calib.npz"
+calib_path = calibration_path(session_dir)
 
-# Input 2D keypoint CSVs
-left_dir = session_dir / "videos" / "player_tracking" / "processed" / "left"
-right_dir = session_dir / "videos" / "player_tracking" / "processed" / "right"
+# Input 2D keypoints (utils/keypoint_store.py; legacy CSVs are read when no store exists)
+keypoints_dir = session_dir / "metrics" / "2d_keypoints"
 
 # Output directory
 output_dir = session_dir / "02_process_data" / "triangulated"
@@ -38,73 +52,107 @@ output_dir.mkdir(parents=True, exist_ok=True)
 # ======================================== 
 # Load Calibration Parameters
 # ========================================
-calib = np.load(calib_path)
-K1, D1 = calib["mtxL"], calib["distL"]
-K2, D2 = calib["mtxR"], calib["distR"]
+calib = load_calibration(calib_path)  # Accepts K1/dist1/... and the older mtxL/distL/... keys
+K1, D1 = calib["K1"], calib["D1"]
+K2, D2 = calib["K2"], calib["D2"]
 R, T = calib["R"], calib["T"]
-P1 = K1 @ np.hstack((np.eye(3), np.zeros((3, 1))))
-P2 = K2 @ np.hstack((R, T))
-
-# ========================================
-# MediaPipe landmark names
-# ========================================
-landmark_names = [
-    "nose", "left_eye_inner", "left_eye", "left_eye_outer", "right_eye_inner", "right_eye", "right_eye_outer",
-    "left_ear", "right_ear", "mouth_left", "mouth_right",
-    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
-    "left_wrist", "right_wrist", "left_pinky", "right_pinky",
-    "left_index", "right_index", "left_thumb", "right_thumb",
-    "left_hip", "right_hip", "left_knee", "right_knee",
-    "left_ankle", "right_ankle", "left_heel", "right_heel",
-    "left_foot_index", "right_foot_index"
-]
+P1, P2 = calib["P1"], calib["P2"]
 
 # ========================================
 # Triangulation Function
 # ========================================
-def triangulate_clip(left_csv, right_csv, output_path):
-    df_left = pd.read_csv(left_csv)
-    df_right = pd.read_csv(right_csv)
-    triangulated_data = []
-
-    for idx in range(len(df_left)):
-        frame_data = [idx]
-        for name in landmark_names:
-            lx, ly = df_left.loc[idx, f"{name}_x"], df_left.loc[idx, f"{name}_y"]
-            rx, ry = df_right.loc[idx, f"{name}_x"], df_right.loc[idx, f"{name}_y"]
-
-            if -1 in (lx, ly, rx, ry):
-                frame_data.extend([-1, -1, -1])
+def load_pixels(keypoints_base):
+    """(frames, 33, 2) pixel coordinates, (frames, 33) visibility and the metadata of a 2D keypoint store."""
+    keypoints, meta = load_any(keypoints_base)
+    meta.setdefault("width", cfg["crop_size"][0])   # Legacy CSVs carry no frame size
+    meta.setdefault("height", cfg["crop_size"][1])
+    return to_pixels(keypoints, meta), np.asarray(keypoints[..., 2]), meta
+
+
+def right_offset_frames(clip, left_px, right_px, fps):
+    """
+    Offset of the right view in frames (left frame n = right frame n + offset): the LED flash offset
+    from detect_flashes.py, else an estimate from wrist/elbow motion (utils/keypoint_sync.py).
+    """
+    flash = measured_offsets(session_dir, clip).get("right")
+    if flash is not None:
+        return flash * fps
+    offset, corr, joints = estimate_keypoint_offset(left_px, right_px, fps, KEYPOINT_SYNC_MAX_OFFSET_S)
+    if not corr >= KEYPOINT_SYNC_MIN_CORR:
+        print(f"[WARNING] {clip}: no flash offset and keypoint sync is unreliable (corr {corr:.2f}); assuming frames align")
+        return 0.0
+    print(f"[INFO] {clip}: no flash offset; keypoint sync puts the right view {offset:+.2f} frames "
+          f"({offset / fps * 1000:+.1f} ms) from the left (corr {corr:.2f}, {len(joints)} joints)")
+    return offset
+
+
+def triangulate_legacy(left_px, right_px, valid):
+    """Original per-point loop (one cv2 undistort/triangulate call per pair), kept as the timing baseline."""
+    points = np.full(valid.shape + (3,), np.nan)
+    for idx in range(len(valid)):
+        for j in range(valid.shape[1]):
+            if not valid[idx, j]:
                 continue
-
+            (lx, ly), (rx, ry) = left_px[idx, j], right_px[idx, j]
             pt_left = np.array([[[lx, ly]]], dtype=np.float32)
             pt_right = np.array([[[rx, ry]]], dtype=np.float32)
             undist_left = cv2.undistortPoints(pt_left, K1, D1, P=K1).reshape(2, 1)
             undist_right = cv2.undistortPoints(pt_right, K2, D2, P=K2).reshape(2, 1)
             point_4d = cv2.triangulatePoints(P1, P2, undist_left, undist_right)
-            point_3d = point_4d[:3] / point_4d[3]
-            frame_data.extend(point_3d.flatten())
-
-        triangulated_data.append(frame_data)
-
-    # Save output
-    columns = ["frame"]
-    for name in landmark_names:
-        columns += [f"{name}_x", f"{name}_y", f"{name}_z"]
-    df_out = pd.DataFrame(triangulated_data, columns=columns)
-    df_out.to_csv(output_path, index=False)
-    print(f"✅ Saved 3D keypoints to: {output_path.name}")
+            points[idx, j] = (point_4d[:3] / point_4d[3]).flatten()
+    return points
+
+
+def triangulate_clip(clip, left_base, right_base, output_base):
+    left_px, left_vis, left_meta = load_pixels(left_base)
+    right_px, right_vis, _ = load_pixels(right_base)
+
+    # Put the right view on the left view's frames (sub-frame offsets are interpolated)
+    fps = left_meta.get("fps") or cfg["player_tracking_fps"]
+    offset = right_offset_frames(clip, left_px, right_px, fps)
+    if offset != 0:
+        right = resample_view(np.concatenate([right_px, right_vis[..., None]], axis=-1), offset, len(left_px))
+        right_px, right_vis = right[..., :2], right[..., 2]
+    n = min(len(left_px), len(right_px))
+    left_px, right_px, left_vis, right_vis = left_px[:n], right_px[:n], left_vis[:n], right_vis[:n]
+
+    # One undistortion per view for the whole clip, then every consistent pair solved at once
+    start = time.perf_counter()
+    left_u, right_u = undistort_pixels(left_px, K1, D1), undistort_pixels(right_px, K2, D2)
+    valid, reason, _ = epipolar_filter(left_u, right_u, calib["F"], left_vis, right_vis,
+                                       EPIPOLAR_MAX_PX, EPIPOLAR_MIN_VISIBILITY)
+    points = triangulate_dlt(left_u, right_u, P1, P2, valid)
+    elapsed = time.perf_counter() - start
+
+    counts = reason_counts(reason)
+    save_keypoints(output_base, points, {
+        "fps": fps, "channels": ["x", "y", "z"], "units": "calibration",
+        "source": [Path(left_base).name, Path(right_base).name], "calibration": calib_path.name,
+        "right_offset_frames": float(offset), "epipolar_max_px": EPIPOLAR_MAX_PX,
+        "epipolar_min_visibility": EPIPOLAR_MIN_VISIBILITY, "reasons": counts,
+    })
+    np.save(part_base(output_base, "reasons").with_suffix(".npy"), reason)  # utils.stereo.REASONS codes
+    print(f"[INFO] {clip}: {counts}")
+    print(f"✅ Saved 3D keypoints to: {Path(output_base).name}.npy "
+          f"({int(valid.sum())} points in {elapsed * 1000:.1f} ms)")
+
+    if TIME_LEGACY:
+        start = time.perf_counter()
+        legacy = triangulate_legacy(left_px, right_px, valid)
+        legacy_s = time.perf_counter() - start
+        diff = np.nanmax(np.abs(legacy - points)) if valid.any() else 0.0
+        print(f"[INFO] {clip}: per-point loop {legacy_s * 1000:.1f} ms, batched {elapsed * 1000:.1f} ms "
+              f"({legacy_s / max(elapsed, 1e-9):.0f}x), max difference {diff:.2e}")
 
 # ========================================
-# Batch Process All CSVs
+# Batch Process All Clips
 # ========================================
-for left_file in sorted(left_dir.glob("*_left_2d.csv")):
-    clip_base = left_file.stem.replace("_left_2d", "")
-    right_file = right_dir / f"{clip_base}_right_2d.csv"
-
-    if not right_file.exists():
-        print(f"⚠️ Skipping {clip_base}: right file not found.")
-        continue
-
-    output_csv = output_dir / f"{clip_base}_3d.csv"
-    triangulate_clip(left_file, right_file, output_csv)
+clip_bases = sorted({p.stem[:-len("_left")] for p in keypoints_dir.glob("*_left.*") if p.suffix in (".npy", ".csv")})
+unusable = unusable_clips(session_dir)  # Marked by check_clip_quality.py
+report_skipped(session_dir, [c for c in clip_bases if c in unusable], "triangulation")
+for clip_base in (c for c in clip_bases if c not in unusable):
+    try:
+        output_base = output_dir / f"{clip_base}_3d"
+        triangulate_clip(clip_base, keypoints_dir / f"{clip_base}_left", keypoints_dir / f"{clip_base}_right", output_base)
+    except FileNotFoundError:
+        print(f"⚠️ Skipping {clip_base}: right keypoints not found.")
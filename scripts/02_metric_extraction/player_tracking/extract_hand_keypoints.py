@@ -0,0 +1,202 @@
+"""
+Title: extract_hand_keypoints.py
+
+Description:
+    Optional hand-landmark pass for the release. Pose only approximates the hand (left_index,
+    right_thumb, ...), while the wrist flick and finger release are what separate makes from misses.
+    For every clip/view with 2D pose keypoints, this finds the release frame from the shooting arm,
+    then runs MediaPipe Hands only on the frames in a short window around it, on a small crop
+    around the shooting wrist. That is a few dozen small-ROI inferences per shot instead of a
+    full-frame hand pass over the whole clip. The hand model is the mediapipe_hands backend
+    (utils/pose_backends.py), served warm by utils/pose_service.py when it runs.
+
+    Hand landmarks are merged into the keypoint store as the "hand" part of the clip/view
+    (<clip>_<view>_hand.npy, NaN outside the window), and the pose metadata records the release
+    frame and window.
+
+Inputs:
+    - 2D keypoint stores from extract_2d_keypoints.py (metrics/2d_keypoints/<clip>_<view>.npy)
+    - Raw left/right player tracking videos (or synchronized videos), as in extract_2d_keypoints.py
+    - shooting_hand from project_config.yaml
+
+Usage:
+    - Run after extract_2d_keypoints.py:
+        python extract_hand_keypoints.py
+
+Outputs:
+    - metrics/2d_keypoints/<clip>_<view>_hand.npy / .json: float32 (frames, 21, [x, y, handedness_score])
+      in full-frame normalized coordinates; handedness_score is MediaPipe's left/right classification
+      score for the hand, the same for all 21 landmarks of a frame (Hands reports no detection
+      confidence or per-landmark visibility)
+"""
+
+import sys
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+import yaml
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.frame_cache import session_cache_dir
+from utils.video_views import stereo_clips, open_side
+from utils.keypoint_store import (HAND_LANDMARKS, POSE_LANDMARKS, exists, load_keypoints, part_base,
+                                  save_keypoints, update_metadata)
+from utils.pose_service import connect_backend
+from utils.session_manifest import unusable_clips, report_skipped
+
+# ========================================
+# Config
+# ========================================
+
+config_path = Path(__file__).resolve().parents[3] / "project_config.yaml"
+with open(config_path, "r") as f:
+    cfg = yaml.safe_load(f)
+
+ATHLETE = cfg["athlete"]
+SESSION = cfg["session"]
+
+SHOOTING_HAND = cfg.get("shooting_hand", "right")
+HAND_WINDOW_BEFORE_S = 0.25     # Window starts this long before the release frame
+HAND_WINDOW_AFTER_S = 0.25      # ... and ends this long after it
+HAND_CROP_SCALE = 1.6           # Crop side as a multiple of the forearm length
+HAND_MIN_CROP = 96              # Smallest crop side in pixels
+HAND_MIN_CONFIDENCE = 0.5       # MediaPipe Hands detection confidence
+
+# ========================================
+# Paths and Directories
+# ========================================
+base_dir = Path(__file__).resolve().parents[3]
+session_dir = base_dir / "data" / ATHLETE / SESSION
+
+raw_left_dir = session_dir / "videos" / "player_tracking" / "raw" / "left"
+raw_right_dir = session_dir / "videos" / "player_tracking" / "raw" / "right"
+input_video_dir = session_dir / "videos" / "player_tracking" / "synchronized"
+keypoints_dir = session_dir / "metrics" / "2d_keypoints"
+frame_cache_dir = session_cache_dir(session_dir)  # Filled by utils/frame_cache.py (optional)
+
+# ========================================
+# Release Window
+# ========================================
+def arm_indices(hand=SHOOTING_HAND):
+    """(shoulder, elbow, wrist) pose landmark indices of the shooting arm."""
+    return tuple(POSE_LANDMARKS.index(f"{hand}_{joint}") for joint in ("shoulder", "elbow", "wrist"))
+
+
+def detect_release_frame(pose_px, hand=SHOOTING_HAND):
+    """
+    Release frame from 2D pose: the most extended shooting elbow while the wrist is above the
+    shoulder, up to the wrist's highest point. (The hanging arm is extended too, hence the wrist
+    condition.)
+
+    Args:
+        pose_px (np.ndarray): (frames, 33, 2) pixel coordinates (NaN = missing).
+        hand (str): "right" or "left".
+
+    Returns:
+        int | None: Release frame, or None if the shooting arm is never fully tracked.
+    """
+    shoulder, elbow, wrist = (pose_px[:, i] for i in arm_indices(hand))
+    ba, bc = shoulder - elbow, wrist - elbow
+    cos = (ba * bc).sum(axis=1) / (np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1) + 1e-6)
+    angle = np.degrees(np.arccos(np.clip(cos, -1, 1)))
+    if np.isnan(angle).all():
+        return None
+
+    # Image y grows downwards: the wrist peaks at the smallest y, just after the ball leaves the hand
+    peak = int(np.nanargmin(np.where(np.isnan(angle), np.nan, wrist[:, 1])))
+    raised = np.where(wrist[:, 1] < shoulder[:, 1], angle, np.nan)[:peak + 1]
+    return int(np.nanargmax(raised)) if not np.isnan(raised).all() else peak
+
+
+def hand_crop(elbow, wrist, frame_shape):
+    """Square crop (x0, y0, size) centred past the wrist along the forearm, clamped to the frame."""
+    h, w = frame_shape[:2]
+    forearm = wrist - elbow
+    size = int(min(max(HAND_CROP_SCALE * np.linalg.norm(forearm), HAND_MIN_CROP), w, h))
+    cx, cy = wrist + 0.4 * forearm  # The hand extends beyond the wrist
+    x0 = int(min(max(cx - size / 2, 0), w - size))
+    y0 = int(min(max(cy - size / 2, 0), h - size))
+    return x0, y0, size
+
+# ========================================
+# Hand Extraction
+# ========================================
+def extract_hand(hands, view, pose_px, release, fps, hand=SHOOTING_HAND):
+    """
+    Hand landmarks for the frames in the release window of one view.
+
+    Returns:
+        tuple[np.ndarray, tuple[int, int], int]: (frames, 21, 3) normalized [x, y, handedness_score]
+            (NaN outside the window or where no hand was found), the (start, stop) window and
+            inferences run.
+    """
+    n_frames = len(pose_px)
+    start = max(0, release - int(round(HAND_WINDOW_BEFORE_S * fps)))
+    stop = min(n_frames, release + int(round(HAND_WINDOW_AFTER_S * fps)) + 1)
+    _, elbow_i, wrist_i = arm_indices(hand)
+
+    out = np.full((n_frames, len(HAND_LANDMARKS), 3), np.nan, dtype=np.float32)
+    runs = 0
+    for n, frame in enumerate(view.iter_frames(start, stop), start):
+        elbow, wrist = pose_px[n, elbow_i], pose_px[n, wrist_i]
+        if np.isnan(elbow).any() or np.isnan(wrist).any():
+            continue
+        x0, y0, size = hand_crop(elbow, wrist, frame.shape)
+        crop = cv2.cvtColor(frame[y0:y0 + size, x0:x0 + size], cv2.COLOR_BGR2RGB)
+        pts = hands.process(crop)
+        runs += 1
+        if pts is None:
+            continue
+        h, w = frame.shape[:2]
+        out[n, :, 0] = (x0 + pts[:, 0] * size) / w
+        out[n, :, 1] = (y0 + pts[:, 1] * size) / h
+        out[n, :, 2] = pts[:, 2]
+    return out, (start, stop), runs
+
+# ========================================
+# Main Pipeline
+# ========================================
+if __name__ == "__main__":
+    # The crop moves with the wrist every frame, so each crop is detected on its own
+    hands = connect_backend(cfg, spec={"name": "mediapipe_hands",
+                                       "options": {"static_image_mode": True,
+                                                   "min_detection_confidence": HAND_MIN_CONFIDENCE}})
+    unusable, skipped = unusable_clips(session_dir), []
+    total_runs, start_time = 0, time.perf_counter()
+
+    for stem, left_source, right_source in stereo_clips(raw_left_dir, raw_right_dir, input_video_dir):
+        if stem in unusable:
+            skipped.append(stem)
+            continue
+        for view_name, source in (("left", left_source), ("right", right_source)):
+            base = keypoints_dir / f"{stem}_{view_name}"
+            if not exists(base):
+                print(f"❌ Missing keypoints for {stem} {view_name}. Skipping.")
+                continue
+
+            pose, meta = load_keypoints(base)
+            with open_side(source, frame_cache_dir) as view:
+                pose_px = pose[..., :2] * np.array([view.width, view.height], dtype=np.float32)
+                release = detect_release_frame(pose_px)
+                if release is None:
+                    print(f"[WARNING] {stem} {view_name}: shooting arm not tracked, no release frame")
+                    continue
+                hand, window, runs = extract_hand(hands, view, pose_px, release, view.fps)
+
+            found = int((~np.isnan(hand[:, 0, 0])).sum())
+            save_keypoints(part_base(base, "hand"), hand, {
+                "fps": meta.get("fps"), "width": meta.get("width"), "height": meta.get("height"),
+                "source": meta.get("source"), "source_hash": meta.get("source_hash"),
+                "channels": ["x", "y", "handedness_score"], "hand": SHOOTING_HAND,
+                "release_frame": release, "window": list(window),
+                "model": {**hands.config, "crop_scale": HAND_CROP_SCALE},
+            })
+            update_metadata(base, parts=sorted(set(meta.get("parts", [])) | {"hand"}), release_frame=release)
+            total_runs += runs
+            print(f"✅ {stem} {view_name}: release at frame {release}, hand in {found}/{runs} window frames")
+
+    hands.close()
+    report_skipped(session_dir, skipped, "hand extraction")
+    elapsed = time.perf_counter() - start_time
+    print(f"[INFO] {total_runs} hand inferences in {elapsed:.1f}s")
@@ -3,11 +3,11 @@ Title: Visualize 2D Keypoints on Player Tracking Videos
 
 Description:
     This script visualizes 2D keypoints on synchronized player tracking videos using previously
-    extracted CSV keypoint data. It draws skeletal landmarks and saves the annotated stitched video.
+    extracted keypoints (utils/keypoint_store.py). It draws skeletal landmarks and saves the annotated stitched video.
 
 Inputs:
-    - Original synchronized video (left + right views combined, 1280x640)
-    - Two CSV files containing 2D keypoints for left and right views
+    - Raw left/right player videos read as a stereo pair (or the synchronized 1280x640 video when no raw pair exists)
+    - 2D keypoint stores for the left and right views (legacy CSVs are read when no store exists)
 
 Usage: 
     - Running the script produces the visualizations 
@@ -16,11 +16,18 @@ Outputs:
     - Annotated video with drawn skeletons for both views side by side
 """
 
+import sys
 import cv2
-import pandas as pd
+import numpy as np
 from pathlib import Path
 import yaml
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.frame_cache import session_cache_dir
+from utils.video_views import stereo_views, iter_stereo
+from utils.keypoint_store import load_any
+from utils.session_manifest import unusable_clips, report_skipped
+
 # ========================================
 # Config
 # ========================================
@@ -47,17 +54,6 @@ COLORS = {
     "joint": (0, 0, 255)      # Red points
 }
 
-LANDMARK_NAMES = [
-    "nose", "left_eye_inner", "left_eye", "left_eye_outer", "right_eye_inner", "right_eye", "right_eye_outer",
-    "left_ear", "right_ear", "mouth_left", "mouth_right",
-    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
-    "left_wrist", "right_wrist", "left_pinky", "right_pinky",
-    "left_index", "right_index", "left_thumb", "right_thumb",
-    "left_hip", "right_hip", "left_knee", "right_knee",
-    "left_ankle", "right_ankle", "left_heel", "right_heel",
-    "left_foot_index", "right_foot_index"
-]
-
 # ========================================
 # Paths and Parameters
 # ========================================
@@ -66,9 +62,12 @@ base_dir = Path(__file__).resolve().parents[3]
 session_dir = base_dir / "data" / "kenny" / "session_test"
 
 videos_dir = session_dir / "videos/player_tracking/synchronized"
+raw_left_dir = session_dir / "videos/player_tracking/raw/left"
+raw_right_dir = session_dir / "videos/player_tracking/raw/right"
 keypoints_dir = session_dir / "metrics/2d_keypoints"
 output_dir = session_dir / "videos/player_tracking/2d"
 output_dir.mkdir(parents=True, exist_ok=True)
+frame_cache_dir = session_cache_dir(session_dir)  # Filled by utils/frame_cache.py (optional)
 
 # ========================================
 # Keypoint Visualizer Class
@@ -80,20 +79,14 @@ class KeypointVisualizer:
         self.point_radius = point_radius
         self.line_thickness = line_thickness
 
-    def load_keypoints(self, csv_path):
-        return pd.read_csv(csv_path)
+    def load_keypoints(self, keypoints_base):
+        keypoints, _ = load_any(keypoints_base)
+        return keypoints
 
-    def draw_skeleton(self, frame, keypoints_row):
+    def draw_skeleton(self, frame, keypoints):
+        """Draw one frame's (33, channels) normalized keypoints; NaN landmarks are skipped."""
         h, w, _ = frame.shape
-        points = []
-
-        for name in LANDMARK_NAMES:
-            x = keypoints_row[f"{name}_x"]
-            y = keypoints_row[f"{name}_y"]
-            if x != -1 and y != -1:
-                points.append((int(x * w), int(y * h)))
-            else:
-                points.append(None)
+        points = [None if np.isnan(x) or np.isnan(y) else (int(x * w), int(y * h)) for x, y in keypoints[:, :2]]
 
         # Draw lines
         for start, end in self.pose_connections:
@@ -107,37 +100,27 @@ class KeypointVisualizer:
 
         return frame
 
-    def visualize_from_csv(self, video_path, left_csv, right_csv, output_path):
-        cap = cv2.VideoCapture(str(video_path))
-        left_df = self.load_keypoints(left_csv)
-        right_df = self.load_keypoints(right_csv)
+    def visualize(self, left_view, right_view, left_kp, right_kp, output_path):
 
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = left_view.fps
+        width = left_view.width + right_view.width
+        height = left_view.height
         out = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
 
-        frame_idx = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+        for frame_idx, (left_frame, right_frame) in enumerate(iter_stereo(left_view, right_view)):
 
-            # Split frame into left and right
-            mid = width // 2
-            left_frame = frame[:, :mid].copy()
-            right_frame = frame[:, mid:].copy()
+            # Copy the left and right views before drawing on them
+            left_frame = left_frame.copy()
+            right_frame = right_frame.copy()
 
-            if frame_idx < len(left_df):
-                left_frame = self.draw_skeleton(left_frame, left_df.iloc[frame_idx])
-            if frame_idx < len(right_df):
-                right_frame = self.draw_skeleton(right_frame, right_df.iloc[frame_idx])
+            if frame_idx < len(left_kp):
+                left_frame = self.draw_skeleton(left_frame, left_kp[frame_idx])
+            if frame_idx < len(right_kp):
+                right_frame = self.draw_skeleton(right_frame, right_kp[frame_idx])
 
             stitched_frame = cv2.hconcat([left_frame, right_frame])
             out.write(stitched_frame)
-            frame_idx += 1
 
-        cap.release()
         out.release()
         print(f"✅ Saved annotated video to {output_path}")
 
@@ -147,15 +130,27 @@ class KeypointVisualizer:
 # ========================================
 if __name__ == "__main__":
     visualizer = KeypointVisualizer()
-
-    for video_path in sorted(videos_dir.glob("*.avi")):
-        stem = video_path.stem  # e.g., freethrow1
-        left_csv = keypoints_dir / f"{stem}_left.csv"
-        right_csv = keypoints_dir / f"{stem}_right.csv"
+    unusable, skipped = unusable_clips(session_dir), []
+
+    for stem, left_view, right_view in stereo_views(raw_left_dir, raw_right_dir, videos_dir, frame_cache_dir):
+        if stem in unusable:
+            skipped.append(stem)
+            left_view.close()
+            right_view.close()
+            continue
+        left_base = keypoints_dir / f"{stem}_left"
+        right_base = keypoints_dir / f"{stem}_right"
         output_path = output_dir / f"{stem}_2d.avi"
 
-        if left_csv.exists() and right_csv.exists():
-            print(f"Processing {video_path.name}...")
-            visualizer.visualize_from_csv(video_path, left_csv, right_csv, output_path)
+        try:
+            left_kp = visualizer.load_keypoints(left_base)
+            right_kp = visualizer.load_keypoints(right_base)
+        except FileNotFoundError:
+            print(f"❌ Missing keypoints for {stem}. Skipping.")
         else:
-            print(f"❌ Missing CSV files for {stem}. Skipping.")
\ No newline at end of file
+            print(f"Processing {stem}...")
+            visualizer.visualize(left_view, right_view, left_kp, right_kp, output_path)
+        left_view.close()
+        right_view.close()
+
+    report_skipped(session_dir, skipped, "2D visualization")
@@ -1,4 +1,4 @@
-import pandas as pd
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
@@ -6,6 +6,9 @@ from mpl_toolkits.mplot3d import Axes3D
 from pathlib import Path
 import yaml
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.keypoint_store import load_keypoints
+
 # ========================================
 # Config
 # ========================================
@@ -23,8 +26,8 @@ CLIP_NAME = "freethrow1_sync"
 # ========================================
 
 base_dir = Path(__file__).resolve().parents[3]
-session_dir = base_dir / ATHLETE / SESSION
-csv_path = session_dir / "02_process_data" / "triangulated" / f"{CLIP_NAME}_3d.csv"
+session_dir = base_dir / "data" / ATHLETE / SESSION
+keypoints_base = session_dir / "02_process_data" / "triangulated" / f"{CLIP_NAME}_3d"
 
 # ========================================
 # MediaPipe-style POSE_CONNECTIONS
@@ -45,8 +48,7 @@ POSE_CONNECTIONS = [
 # Load data
 # ========================================
 
-df = pd.read_csv(csv_path)
-frames = df.drop(columns=["frame"]).values.reshape(len(df), 33, 3)  # shape: (num_frames, 33, 3)
+frames, _ = load_keypoints(keypoints_base)  # shape: (num_frames, 33, 3), NaN = not triangulated
 
 # ========================================
 # Setup Plot
@@ -77,7 +79,7 @@ def update(frame_idx):
     keypoints = frames[frame_idx]
 
     # Mask invalid points
-    mask = ~(keypoints == -1).any(axis=1)
+    mask = ~np.isnan(keypoints).any(axis=1)
     visible_pts = keypoints[mask]
 
     if visible_pts.size == 0:
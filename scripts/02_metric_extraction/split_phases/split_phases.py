@@ -9,15 +9,23 @@ Purpose:
 Prerequisites:
     - Folder of .mot files from OpenCap
     - Each .mot file contains joint angle data with at least: time, elbow_flex_r, arm_flex_r
+    - Optional: <clip>.timing.csv next to the left camera clip (utils/frame_timing.py); velocities then
+      use true capture times instead of assuming a constant FPS. The .mot rows start at the clip's
+      trim start (videos/trims.csv from trim_freethrows.py); without a trim row the frame origin is
+      unknown and a constant FPS is used.
 
 Output:
     - A CSV summarizing frame indices per phase for each file: windup_start, release_frame, followthrough_end
 """
 
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))  # project root, for utils/
+from utils.frame_timing import load_timing, velocity
+
 
 # ========================================
 # Parameters
@@ -37,6 +45,8 @@ session_dir = base_dir / "data" / ATHLETE / SESSION
 
 mot_folder = session_dir / "player_tracking_1" / "01_record_data" / "mot_files"
 output_csv = session_dir / "player_tracking_1" / "02_process_data" / "time_series" / "freethrow_phases.csv"
+timing_dir = session_dir / "videos" / "player_tracking" / "raw" / "left"  # Timing maps of the source clips
+trims_manifest_path = session_dir / "videos" / "trims.csv"                # Raw frame range of each trimmed clip
 
 # ======================================== 
 # Functions 
@@ -51,15 +61,43 @@ def load_mot_file(filepath):
             break
     return pd.read_csv(filepath, sep=r'\s+', skiprows=start_idx)
 
-def compute_velocity(df, column_name, dt):
-    return df[column_name].diff() / dt
-
-def detect_throw_phases(df, FPS, threshold=10, window=3):
-    dt = 1.0 / FPS
+def trim_origin(name):
+    """
+    Raw clip and first raw left-camera frame of a trimmed clip, matched by clip or trimmed output name.
+
+    Returns:
+        tuple[str, int | None]: (raw clip stem, start frame); the start is None if the clip has no trim row.
+    """
+    if not trims_manifest_path.exists():
+        return name, None
+    trims = pd.read_csv(trims_manifest_path)
+    rows = trims[(trims["camera"] == "left")
+                 & ((trims["clip"] == name) | (trims["output"].map(lambda output: Path(output).stem) == name))]
+    if not len(rows):
+        return name, None
+    return rows["clip"].iloc[0], int(rows["start_frame"].iloc[0])
+
+def frame_times(df, FPS, timing=None, start=None):
+    """
+    Per-frame capture times: the timing map from raw frame `start` on if it covers every row,
+    else constant FPS (also when the frame origin of the rows is unknown).
+    """
+    if timing is not None and start is not None and start + len(df) <= len(timing):
+        return timing['capture_time_s'].to_numpy()[start:start + len(df)]
+    if timing is not None:
+        reason = "unknown frame origin" if start is None else f"timing map ends before row {len(df)} (start {start})"
+        print(f"[WARNING] Timing map not used ({reason}); assuming {FPS} FPS")
+    return np.arange(len(df)) / FPS
+
+def compute_velocity(df, column_name, times):
+    return pd.Series(velocity(df[column_name], times), index=df.index)
+
+def detect_throw_phases(df, FPS, threshold=10, window=3, timing=None, start=None):
+    times = frame_times(df, FPS, timing, start)
     
-    # Compute velocities
-    df['elbow_vel'] = compute_velocity(df, 'elbow_flex_r', dt).abs()
-    df['shoulder_vel'] = compute_velocity(df, 'arm_flex_r', dt).abs()
+    # Compute velocities (repeated frames are skipped rather than read as a stop)
+    df['elbow_vel'] = compute_velocity(df, 'elbow_flex_r', times).abs()
+    df['shoulder_vel'] = compute_velocity(df, 'arm_flex_r', times).abs()
     df['avg_arm_vel'] = df[['elbow_vel', 'shoulder_vel']].mean(axis=1)
 
     # Find release frame (min elbow angle)
@@ -101,7 +139,9 @@ print(f"Found files: {list(mot_folder.glob('*.mot'))}")
 
 for mot_file in sorted(mot_folder.glob("*.mot"), key=extract_shot_number):
     df = load_mot_file(mot_file)
-    phases = detect_throw_phases(df, FPS)
+    clip, start = trim_origin(mot_file.stem)
+    timing = load_timing(timing_dir / f"{clip}.avi")
+    phases = detect_throw_phases(df, FPS, timing=timing, start=start)
     phases['file'] = mot_file.name
     results.append(phases)
 
@@ -0,0 +1,260 @@
+"""
+Title: archive_session.py
+
+Description:
+    Transcodes a finished session's raw MJPG recordings to a compact archival format (H.265 in MKV)
+    on a background process pool, then verifies that every archived clip has exactly as many frames
+    as the original. Frames are passed through one to one (no dropped or duplicated frames), so frame
+    N of the archive is frame N of the raw clip and the sidecars keyed by clip name (timing maps,
+    proxies, motion curves, sync offsets, trims manifest) stay valid. The archive keeps the raw clip's
+    modification time, so proxies and motion curves built from the raw clip are not seen as stale.
+
+    Each archive gets a frame-times sidecar (presentation time of every frame, from ffprobe).
+    utils/avi_reader.open_reader() uses it for the exact frame count and exact seeks, which
+    VideoCapture's own frame count and frame seeks do not give on H.265.
+
+    The recorder starts this job when a recording session ends if archive_after_recording is
+    enabled (off by default); otherwise run it by hand or with make archive_session.
+
+    The archive is written next to the raw clip (freethrow3.avi -> freethrow3.mkv). Raw clips are only
+    deleted when archive_delete_raw is set in project_config.yaml and the frame counts match; stages
+    that list clips with list_clips() / resolve_clip() then read the archived copy instead.
+
+Inputs:
+    - Raw clips (videos/player_tracking/raw/left|right, videos/ball_tracking/raw)
+    - ffmpeg and ffprobe on the PATH (ffmpeg >= 5.1 uses -fps_mode; older versions fall back to -vsync)
+
+Usage:
+    - Archive the session in project_config.yaml:
+        python utils/archive_session.py
+
+Outputs:
+    - <clip dir>/<clip>.mkv and <clip>.mkv.frames.npy (per-frame times in seconds)
+    - videos/archive_manifest.csv (source, archive, frames, sizes, verified, raw_deleted)
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.avi_reader import AviIndex, IndexedCaptureReader, open_reader
+
+# =========================
+# Constants
+# =========================
+
+ARCHIVE_SUFFIX = ".mkv"
+RAW_SUFFIXES = (".avi", ".mp4")
+ARCHIVE_CRF = 23            # x265 quality (lower = larger files, higher quality)
+ARCHIVE_PRESET = "medium"
+
+# =========================
+# Clip Lookup
+# =========================
+
+def archive_path(video_path):
+    return Path(video_path).with_suffix(ARCHIVE_SUFFIX)
+
+
+def resolve_clip(video_path):
+    """Return the raw clip if it exists, else its archived copy (or the raw path if neither exists)."""
+    video_path = Path(video_path)
+    if not video_path.exists() and archive_path(video_path).exists():
+        return archive_path(video_path)
+    return video_path
+
+
+def list_clips(directory, pattern="*"):
+    """
+    Clips in a directory, one per name: the raw recording when present, else the archived copy.
+
+    Args:
+        directory (str | Path): Clip directory.
+        pattern (str): Glob pattern for the clip stem (e.g. "freethrow*").
+
+    Returns:
+        list[Path]: Clip paths sorted by name.
+    """
+    clips = {}
+    for path in Path(directory).glob(pattern):
+        if path.suffix in RAW_SUFFIXES + (ARCHIVE_SUFFIX,) and not path.stem.endswith(".tmp"):
+            if path.stem not in clips or path.suffix != ARCHIVE_SUFFIX:
+                clips[path.stem] = path
+    return [clips[stem] for stem in sorted(clips)]
+
+# =========================
+# Transcode and Verify
+# =========================
+
+def probe_frame_times(video_path):
+    """
+    Presentation time of every video frame of a file, from ffprobe's packet list.
+
+    Returns:
+        np.ndarray: Seconds from the first frame, in display order (one entry per frame).
+    """
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "packet=pts_time", "-of", "csv=p=0", str(video_path)],
+        capture_output=True, text=True, check=True,
+    )
+    pts = [float(line.split(",")[0]) for line in result.stdout.split() if line.split(",")[0] not in ("", "N/A")]
+    pts = np.sort(np.array(pts, dtype=np.float64))  # Packets are in decode order
+    return pts - pts[0] if len(pts) else pts
+
+
+@lru_cache(maxsize=1)
+def passthrough_args():
+    """Frame-rate passthrough option: -fps_mode on ffmpeg >= 5.1, -vsync on older versions."""
+    result = subprocess.run(["ffmpeg", "-hide_banner", "-h", "full"], capture_output=True, text=True)
+    return ["-fps_mode", "passthrough"] if "-fps_mode" in result.stdout else ["-vsync", "passthrough"]
+
+
+def archive_clip(video_path, crf=ARCHIVE_CRF, threads=1, delete_raw=False):
+    """
+    Transcode one clip to H.265, verify the frame count and optionally delete the raw clip.
+
+    Args:
+        video_path (Path): Raw clip.
+        crf (int): x265 constant rate factor.
+        threads (int): ffmpeg threads for this clip.
+        delete_raw (bool): Delete the raw clip (and its frame index) once verified.
+
+    Returns:
+        dict: Manifest row for the clip.
+    """
+    video_path = Path(video_path)
+    output_path = archive_path(video_path)
+    tmp_path = output_path.with_name(f"{output_path.stem}.tmp{ARCHIVE_SUFFIX}")
+
+    with open_reader(video_path) as reader:
+        frames, fps = len(reader), reader.fps
+
+    # Passthrough writes every input frame with its own timestamp
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(video_path),
+         "-map", "0:v:0", "-c:v", "libx265", "-crf", str(crf), "-preset", ARCHIVE_PRESET,
+         "-x265-params", "log-level=error", "-pix_fmt", "yuv420p", *passthrough_args(),
+         "-threads", str(threads), str(tmp_path)],
+        check=True,
+    )
+
+    frame_times = probe_frame_times(tmp_path)
+    archived_frames = len(frame_times)
+    verified = archived_frames == frames
+    if verified:
+        os.replace(tmp_path, output_path)
+        # Same modification time as the raw clip, so sidecars built from it stay up to date
+        stat = video_path.stat()
+        os.utime(output_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        np.save(IndexedCaptureReader.times_path(output_path), frame_times)
+    else:
+        tmp_path.unlink(missing_ok=True)
+
+    raw_bytes = video_path.stat().st_size
+    raw_deleted = False
+    if verified and delete_raw:
+        video_path.unlink()
+        AviIndex.cache_path(video_path).unlink(missing_ok=True)
+        raw_deleted = True
+
+    return {
+        "source": str(video_path), "archive": str(output_path) if verified else "",
+        "frames": frames, "archived_frames": archived_frames, "fps": fps,
+        "raw_bytes": raw_bytes, "archive_bytes": output_path.stat().st_size if verified else 0,
+        "verified": verified, "raw_deleted": raw_deleted,
+    }
+
+# =========================
+# Background Job
+# =========================
+
+def _lower_priority():
+    if hasattr(os, "nice"):
+        os.nice(10)  # Archiving can run while the next session is being recorded
+
+
+def archive_session(video_paths, workers=2, crf=ARCHIVE_CRF, delete_raw=False):
+    """
+    Archive clips on a low-priority process pool.
+
+    Args:
+        video_paths (list[Path]): Raw clips to archive.
+        workers (int): Clips transcoded at once; CPU threads are split between them.
+        crf (int): x265 constant rate factor.
+        delete_raw (bool): Delete each raw clip once its archive is verified.
+
+    Returns:
+        list[dict]: Manifest rows, in completion order.
+    """
+    threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_lower_priority) as pool:
+        futures = {pool.submit(archive_clip, path, crf, threads, delete_raw): path for path in video_paths}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except (subprocess.CalledProcessError, OSError, ValueError) as e:
+                print(f"❌ Failed to archive {futures[future].name}: {e}")
+                continue
+            status = "✅" if row["verified"] else "❌ frame count mismatch"
+            ratio = row["raw_bytes"] / row["archive_bytes"] if row["archive_bytes"] else 0
+            print(f"{status} {Path(row['source']).name}: {row['archived_frames']}/{row['frames']} frames, "
+                  f"{ratio:.1f}x smaller{' (raw deleted)' if row['raw_deleted'] else ''}")
+            rows.append(row)
+    return rows
+
+def start_archive_job():
+    """
+    Archive the session in project_config.yaml in a detached low-priority process, e.g. when
+    the recorder closes. Returns the process, or None if ffmpeg/ffprobe are not installed.
+    """
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        print("[WARNING] ffmpeg/ffprobe not found; session not archived")
+        return None
+    return subprocess.Popen([sys.executable, str(Path(__file__).resolve())], start_new_session=True)
+
+# =========================
+# Main
+# =========================
+
+if __name__ == "__main__":
+    import yaml
+
+    config_path = Path(__file__).resolve().parents[1] / "project_config.yaml"
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        sys.exit("❌ ffmpeg and ffprobe are required to archive a session")
+
+    session_dir = Path(__file__).resolve().parents[1] / "data" / cfg["athlete"] / cfg["session"]
+    raw_dirs = [
+        session_dir / "videos" / "player_tracking" / "raw" / "left",
+        session_dir / "videos" / "player_tracking" / "raw" / "right",
+        session_dir / "videos" / "ball_tracking" / "raw",
+    ]
+    video_paths = [p for d in raw_dirs for p in sorted(d.glob("*.avi")) if not archive_path(p).exists()]
+    print(f"[INFO] Archiving {len(video_paths)} clips...")
+
+    rows = archive_session(
+        video_paths,
+        workers=cfg.get("archive_workers", 2),
+        crf=cfg.get("archive_crf", ARCHIVE_CRF),
+        delete_raw=cfg.get("archive_delete_raw", False),
+    )
+
+    manifest_path = session_dir / "videos" / "archive_manifest.csv"
+    manifest = pd.DataFrame(rows)
+    if manifest_path.exists():
+        old = pd.read_csv(manifest_path)
+        manifest = pd.concat([old[~old["source"].isin(manifest.get("source", []))], manifest], ignore_index=True)
+    manifest.to_csv(manifest_path, index=False)
+    print(f"✅ Saved archive manifest: {manifest_path}")
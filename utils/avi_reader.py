@@ -0,0 +1,634 @@
+"""
+Title: avi_reader.py
+
+Description:
+    Shared frame reader for the MJPG AVI files written by record_freethrows.py.
+    cv2.CAP_PROP_POS_FRAMES seeking and CAP_PROP_FRAME_COUNT are slow or unreliable on these files,
+    so this module builds an index of the byte offset and size of every video frame instead.
+    The index is parsed from the OpenDML (indx/ix##) or legacy (idx1) AVI index when present,
+    or built by a single scan of the 'movi' lists otherwise, and is cached next to the video.
+    With the index, frame N is fetched by reading its JPEG bytes directly and decoding them.
+
+Inputs:
+    - AVI video files (MJPG)
+
+Usage:
+    from utils.avi_reader import open_reader
+
+    with open_reader(video_path) as reader:
+        print(len(reader), reader.fps, reader.width, reader.height)
+        frame = reader.read(120)
+
+        for frame in reader.iter_frames(workers=4):  # Decoded on a thread pool, yielded in order
+            ...
+
+        preview = reader.read(120, scale=4, gray=True)  # 1/4 size grayscale, scaled while decoding
+
+Outputs:
+    - <video>.avi.idx.npz sidecar cache holding the frame offset index
+"""
+
+import os
+import cv2
+import mmap
+import struct
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+# =========================
+# Constants
+# =========================
+
+INDEX_VERSION = 1                   # Bump when the cache layout changes
+INDEX_SUFFIX = ".idx.npz"           # Sidecar cache: freethrow1.avi -> freethrow1.avi.idx.npz
+FRAME_TIMES_SUFFIX = ".frames.npy"  # Per-frame times of an archived clip: freethrow1.mkv -> freethrow1.mkv.frames.npy
+SEEK_LEADS_S = (0.0, 1.0, 4.0)      # How far before a frame IndexedCaptureReader seeks before retrying from the start
+
+AVI_INDEX_OF_INDEXES = 0x00         # OpenDML super index ('indx' in the stream header)
+AVI_INDEX_OF_CHUNKS = 0x01          # OpenDML standard index ('ix##' chunks)
+ODML_SIZE_MASK = 0x7FFFFFFF         # High bit of an ix## size marks a non-keyframe
+
+MJPG_FOURCCS = {b"MJPG", b"mjpg", b"AVRn", b"LJPG", b"JPGL", b"dmb1"}
+
+DEFAULT_DECODE_WORKERS = min(8, os.cpu_count() or 1)
+
+# libjpeg can scale by 1/2, 1/4 and 1/8 in the DCT domain while decoding
+DECODE_FLAGS = {
+    (1, False): cv2.IMREAD_COLOR,         (1, True): cv2.IMREAD_GRAYSCALE,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2, (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4, (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8, (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+IDX1_DTYPE = np.dtype([("ckid", "S4"), ("flags", "<u4"), ("offset", "<u4"), ("size", "<u4")])
+
+# =========================
+# AVI Index
+# =========================
+
+class AviIndex:
+    """Byte offsets and sizes of every video frame in an AVI file, plus basic stream info."""
+
+    def __init__(self, offsets, sizes, fps, width, height, codec):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self.fps = float(fps)
+        self.width = int(width)
+        self.height = int(height)
+        self.codec = codec
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def is_mjpg(self):
+        return self.codec in MJPG_FOURCCS
+
+    # -------------------------
+    # Cache
+    # -------------------------
+
+    @staticmethod
+    def cache_path(video_path):
+        video_path = Path(video_path)
+        return video_path.with_name(video_path.name + INDEX_SUFFIX)
+
+    @staticmethod
+    def _signature(video_path):
+        stat = Path(video_path).stat()
+        return np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    @classmethod
+    def load(cls, video_path, use_cache=True):
+        """
+        Load the frame index for an AVI file, using the sidecar cache when it is still valid.
+
+        Args:
+            video_path (str | Path): Path to the AVI file.
+            use_cache (bool): If True, read and write the <video>.avi.idx.npz sidecar.
+
+        Returns:
+            AviIndex: Index of every video frame in the file.
+        """
+        video_path = Path(video_path)
+        cache_path = cls.cache_path(video_path)
+        signature = cls._signature(video_path)
+
+        if use_cache and cache_path.exists():
+            try:
+                with np.load(cache_path) as cached:
+                    if np.array_equal(cached["signature"], signature):
+                        return cls(
+                            cached["offsets"], cached["sizes"], float(cached["fps"]),
+                            int(cached["width"]), int(cached["height"]), bytes(cached["codec"]),
+                        )
+            except (OSError, KeyError, ValueError):
+                pass  # Corrupt or outdated cache, rebuild below
+
+        index = cls.build(video_path)
+
+        if use_cache:
+            try:
+                with open(cache_path, "wb") as f:
+                    np.savez(
+                        f, signature=signature, offsets=index.offsets, sizes=index.sizes,
+                        fps=index.fps, width=index.width, height=index.height, codec=np.bytes_(index.codec),
+                    )
+            except OSError:
+                pass  # Read-only folders still work, just without the cache
+        return index
+
+    # -------------------------
+    # Parsing
+    # -------------------------
+
+    @classmethod
+    def build(cls, video_path):
+        """
+        Parse an AVI file and build its frame index.
+
+        Uses the OpenDML super index when present, then the legacy idx1 index, and
+        falls back to scanning the 'movi' lists chunk by chunk.
+
+        Args:
+            video_path (str | Path): Path to the AVI file.
+
+        Returns:
+            AviIndex: Index of every video frame in the file.
+
+        Raises:
+            ValueError: If the file is not a RIFF AVI or has no video stream.
+        """
+        with open(video_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if len(mm) < 12 or mm[0:4] != b"RIFF" or mm[8:12] != b"AVI ":
+                raise ValueError(f"Not a RIFF AVI file: {video_path}")
+
+            info = _parse_headers(mm)
+            if info["stream"] is None:
+                raise ValueError(f"No video stream found in {video_path}")
+
+            chunk_ids = {b"%02ddc" % info["stream"], b"%02ddb" % info["stream"]}
+
+            offsets = sizes = None
+            if info["indx"] is not None:
+                offsets, sizes = _read_odml_index(mm, info["indx"])
+            if offsets is None and info["idx1"] is not None and len(info["movi"]) == 1:
+                offsets, sizes = _read_idx1(mm, info["idx1"], info["movi"][0], chunk_ids)
+            if offsets is None:
+                offsets, sizes = _scan_movi(mm, info["movi"], chunk_ids)
+
+        offsets, sizes = _fill_dropped_frames(offsets, sizes)
+        return cls(offsets, sizes, info["fps"], info["width"], info["height"], info["codec"])
+
+
+def _iter_chunks(mm, start, end):
+    """Yield (fourcc, position, size) for each RIFF chunk between start and end."""
+    pos = start
+    while pos + 8 <= end:
+        fourcc, size = struct.unpack_from("<4sI", mm, pos)
+        yield fourcc, pos, size
+        pos += 8 + size + (size & 1)  # Chunks are padded to an even size
+
+
+def _parse_headers(mm):
+    """Collect stream info and index locations from every RIFF segment of the file."""
+    info = {
+        "stream": None, "fps": 0.0, "width": 0, "height": 0, "codec": b"",
+        "indx": None, "idx1": None, "movi": [],
+    }
+
+    for fourcc, riff_pos, riff_size in _iter_chunks(mm, 0, len(mm)):
+        if fourcc != b"RIFF":
+            break
+        riff_end = min(riff_pos + 8 + riff_size, len(mm))
+
+        for ck, pos, size in _iter_chunks(mm, riff_pos + 12, riff_end):
+            if ck == b"LIST":
+                list_type = mm[pos + 8:pos + 12]
+                if list_type == b"hdrl":
+                    _parse_hdrl(mm, pos + 12, pos + 8 + size, info)
+                elif list_type == b"movi":
+                    info["movi"].append((pos + 8, pos + 8 + size))  # 'movi' fourcc .. end of list
+            elif ck == b"idx1" and info["idx1"] is None:
+                info["idx1"] = (pos + 8, size)
+
+    return info
+
+
+def _parse_hdrl(mm, start, end, info):
+    stream_number = 0
+    for ck, pos, size in _iter_chunks(mm, start, end):
+        if ck == b"avih":
+            micro_sec_per_frame = struct.unpack_from("<I", mm, pos + 8)[0]
+            width, height = struct.unpack_from("<II", mm, pos + 8 + 32)
+            if micro_sec_per_frame and not info["fps"]:
+                info["fps"] = 1e6 / micro_sec_per_frame
+            info["width"] = info["width"] or width
+            info["height"] = info["height"] or height
+
+        elif ck == b"LIST" and mm[pos + 8:pos + 12] == b"strl":
+            strl = {c: (p, s) for c, p, s in _iter_chunks(mm, pos + 12, pos + 8 + size)}
+            if b"strh" in strl and info["stream"] is None:
+                p, _ = strl[b"strh"]
+                fcc_type, fcc_handler = struct.unpack_from("<4s4s", mm, p + 8)
+                if fcc_type == b"vids":
+                    info["stream"] = stream_number
+                    scale, rate = struct.unpack_from("<II", mm, p + 8 + 20)
+                    if scale and rate:
+                        info["fps"] = rate / scale
+                    info["codec"] = fcc_handler
+                    if b"strf" in strl:
+                        p, _ = strl[b"strf"]
+                        width, height = struct.unpack_from("<ii", mm, p + 8 + 4)
+                        compression = mm[p + 8 + 16:p + 8 + 20]
+                        info["width"], info["height"] = width, abs(height)
+                        if compression.strip(b"\x00"):
+                            info["codec"] = compression
+                    if b"indx" in strl:
+                        info["indx"] = strl[b"indx"][0]
+            stream_number += 1
+
+
+def _read_odml_index(mm, indx_pos):
+    """Read the OpenDML super index and the ix## standard indexes it points to."""
+    _, index_type, n_entries = struct.unpack_from("<xxBBI", mm, indx_pos + 8)
+    if index_type != AVI_INDEX_OF_INDEXES or n_entries == 0:
+        return None, None
+
+    offsets, sizes = [], []
+    for i in range(n_entries):
+        ix_pos = struct.unpack_from("<Q", mm, indx_pos + 8 + 24 + i * 16)[0]
+        if ix_pos + 32 > len(mm):
+            return None, None
+        _, ix_type, n = struct.unpack_from("<xxBBI", mm, ix_pos + 8)
+        if ix_type != AVI_INDEX_OF_CHUNKS:
+            return None, None
+        base = struct.unpack_from("<Q", mm, ix_pos + 8 + 12)[0]
+        entries = np.frombuffer(mm, dtype="<u4", count=2 * n, offset=ix_pos + 32).reshape(-1, 2)
+        offsets.append(base + entries[:, 0].astype(np.int64))
+        sizes.append((entries[:, 1] & ODML_SIZE_MASK).astype(np.int64))
+        del entries  # Release the buffer export so the mmap can close
+
+    return np.concatenate(offsets), np.concatenate(sizes)
+
+
+def _read_idx1(mm, idx1, movi, chunk_ids):
+    """Read the legacy idx1 index. Offsets are relative to the 'movi' fourcc or absolute."""
+    idx1_pos, idx1_size = idx1
+    count = idx1_size // IDX1_DTYPE.itemsize
+    entries = np.frombuffer(mm, dtype=IDX1_DTYPE, count=count, offset=idx1_pos).copy()
+    entries = entries[np.isin(entries["ckid"], list(chunk_ids))]
+    if len(entries) == 0:
+        return None, None
+
+    first_ckid, first_offset = entries["ckid"][0], int(entries["offset"][0])
+    movi_pos = movi[0]
+    if mm[movi_pos + first_offset:movi_pos + first_offset + 4] == first_ckid:
+        base = movi_pos
+    elif mm[first_offset:first_offset + 4] == first_ckid:
+        base = 0
+    else:
+        return None, None
+
+    offsets = base + entries["offset"].astype(np.int64) + 8  # Skip the chunk header
+    return offsets, entries["size"].astype(np.int64)
+
+
+def _scan_movi(mm, movi_lists, chunk_ids):
+    """Build the index by walking every 'movi' list (including nested 'rec ' lists)."""
+    offsets, sizes = [], []
+
+    def walk(start, end):
+        for ck, pos, size in _iter_chunks(mm, start, end):
+            if ck in chunk_ids:
+                offsets.append(pos + 8)
+                sizes.append(size)
+            elif ck == b"LIST" and mm[pos + 8:pos + 12] == b"rec ":
+                walk(pos + 12, pos + 8 + size)
+
+    for movi_start, movi_end in movi_lists:
+        walk(movi_start + 4, min(movi_end, len(mm)))
+
+    return np.array(offsets, dtype=np.int64), np.array(sizes, dtype=np.int64)
+
+
+def _fill_dropped_frames(offsets, sizes):
+    """Zero-size chunks mark dropped frames; they repeat the previous frame."""
+    offsets = np.asarray(offsets, dtype=np.int64).copy()
+    sizes = np.asarray(sizes, dtype=np.int64).copy()
+    empty = sizes == 0
+    if empty.any() and not empty.all():
+        source = np.where(empty, 0, np.arange(len(sizes)))
+        source = np.maximum.accumulate(source)
+        offsets, sizes = offsets[source], sizes[source]
+    return offsets, sizes
+
+# =========================
+# Readers
+# =========================
+
+class AviReader:
+    """Random-access frame reader for MJPG AVI files backed by an AviIndex."""
+
+    def __init__(self, video_path, use_cache=True):
+        self.path = Path(video_path)
+        self.index = AviIndex.load(self.path, use_cache=use_cache)
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def frame_count(self):
+        return len(self.index)
+
+    @property
+    def fps(self):
+        return self.index.fps
+
+    @property
+    def width(self):
+        return self.index.width
+
+    @property
+    def height(self):
+        return self.index.height
+
+    def _check(self, n):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(f"Frame {n} out of range for {self.path.name} ({len(self)} frames)")
+        return n
+
+    def read_bytes(self, n):
+        """Return the compressed JPEG bytes of frame n."""
+        n = self._check(n)
+        offset = self.index.offsets[n]
+        return self._mm[offset:offset + self.index.sizes[n]]
+
+    def read(self, n, scale=1, gray=False):
+        """
+        Decode frame n.
+
+        Args:
+            n (int): Frame index (negative values count from the end).
+            scale (int): Downscale factor 1, 2, 4 or 8. Scaling happens inside the JPEG
+                decoder (DCT domain), so reduced frames decode several times faster.
+            gray (bool): If True, decode only the luma channel.
+
+        Returns:
+            np.ndarray: Decoded BGR (or grayscale) frame.
+        """
+        frame = cv2.imdecode(np.frombuffer(self.read_bytes(n), dtype=np.uint8), DECODE_FLAGS[scale, gray])
+        if frame is None:
+            raise ValueError(f"Could not decode frame {n} of {self.path.name}")
+        return frame
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None, scale=1, gray=False):
+        """
+        Decode a range of frames on a thread pool and yield them in order.
+
+        MJPG frames are intra-coded, so each one can be decoded independently.
+        cv2.imdecode releases the GIL, letting the decodes run on several cores
+        while at most 2 * workers frames are held in memory.
+
+        Args:
+            start (int): First frame index.
+            stop (int | None): Stop before this frame index (default: end of video).
+            step (int): Frame step.
+            workers (int | None): Decode threads (default: DEFAULT_DECODE_WORKERS).
+            scale (int): Downscale factor 1, 2, 4 or 8 (see read).
+            gray (bool): If True, decode only the luma channel.
+
+        Yields:
+            np.ndarray: Decoded frames in index order.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        indices = iter(range(start, stop, step))
+        workers = workers or DEFAULT_DECODE_WORKERS
+
+        if workers == 1:
+            for n in indices:
+                yield self.read(n, scale, gray)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque(pool.submit(self.read, n, scale, gray) for n in islice(indices, 2 * workers))
+            try:
+                while pending:
+                    frame = pending.popleft().result()
+                    for n in islice(indices, 1):
+                        pending.append(pool.submit(self.read, n, scale, gray))
+                    yield frame
+            finally:
+                for future in pending:
+                    future.cancel()  # Consumer stopped early
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+
+class CaptureReader:
+    """Fallback reader with the same interface as AviReader, backed by cv2.VideoCapture."""
+
+    def __init__(self, video_path):
+        self.path = Path(video_path)
+        self.cap = cv2.VideoCapture(str(self.path))
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video: {self.path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self._next = 0
+
+    def __len__(self):
+        return self.frame_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, n, scale=1, gray=False):
+        if n < 0:
+            n += len(self)
+        if n != self._next:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, n)  # Only seek when not reading sequentially
+        ret, frame = self.cap.read()
+        if not ret:
+            raise IndexError(f"Frame {n} out of range for {self.path.name}")
+        self._next = n + 1
+        return reduce_frame(frame, scale, gray)
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None, scale=1, gray=False):
+        """Sequentially decode a range of frames (workers is ignored; VideoCapture is single-threaded)."""
+        if start < 0:
+            start += len(self)
+        if start != self._next:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)  # Also rewinds to 0 after earlier reads
+        self._next = n = start
+        while stop is None or n < stop:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            n += 1
+            self._next = n  # Kept current so a consumer that stops early leaves the position right
+            if (n - 1 - start) % step == 0:
+                yield reduce_frame(frame, scale, gray)
+
+    def close(self):
+        self.cap.release()
+
+
+class IndexedCaptureReader(CaptureReader):
+    """
+    VideoCapture reader for archived (e.g. H.265) clips with a frame-times sidecar (written by
+    utils/archive_session.py). Frame count comes from the sidecar, and seeks land on the exact frame:
+    after a time seek, frames are read forward until the decoded timestamp matches, and the seek is
+    repeated from further back when it overshoots (CAP_PROP_POS_FRAMES alone is unreliable on
+    inter-frame codecs).
+    """
+
+    def __init__(self, video_path, frame_times):
+        super().__init__(video_path)
+        self.frame_times = np.asarray(frame_times, dtype=np.float64)  # Seconds from the first frame
+        self.frame_count = len(self.frame_times)
+        gaps = np.diff(self.frame_times)
+        gaps = gaps[gaps > 0]
+        self._tolerance = 0.5 * (gaps.min() if len(gaps) else 1.0 / (self.fps or 30))
+
+    @staticmethod
+    def times_path(video_path):
+        video_path = Path(video_path)
+        return video_path.with_name(video_path.name + FRAME_TIMES_SUFFIX)
+
+    def _position(self):
+        return self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000  # Timestamp of the frame just decoded
+
+    def _seek(self, n):
+        """Decode frame n exactly, leaving the capture positioned at frame n + 1."""
+        target = self.frame_times[n]
+        for lead in SEEK_LEADS_S + (None,):
+            if lead is None:
+                self.cap.release()  # Last resort: decode from the first frame
+                self.cap = cv2.VideoCapture(str(self.path))
+            else:
+                self.cap.set(cv2.CAP_PROP_POS_MSEC, max(0.0, target - lead) * 1000)
+            while True:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                t = self._position()
+                if abs(t - target) <= self._tolerance:
+                    return frame
+                if t > target:
+                    break  # Overshot: seek again from further back
+        raise IndexError(f"Frame {n} not found in {self.path.name}")
+
+    def read(self, n, scale=1, gray=False):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(f"Frame {n} out of range for {self.path.name} ({len(self)} frames)")
+        if n == self._next:
+            ret, frame = self.cap.read()
+            if not ret:
+                raise IndexError(f"Frame {n} out of range for {self.path.name}")
+        else:
+            frame = self._seek(n)
+        self._next = n + 1
+        return reduce_frame(frame, scale, gray)
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None, scale=1, gray=False):
+        """Sequentially decode a range of frames from an exact seek to `start`."""
+        if start < 0:
+            start += len(self)
+        stop = len(self) if stop is None else min(stop, len(self))
+        for n in range(start, stop):
+            try:
+                frame = self.read(n) if (n - start) % step == 0 else self._skip(n)
+            except IndexError:
+                return
+            if frame is not None:
+                yield reduce_frame(frame, scale, gray)
+
+    def _skip(self, n):
+        """Advance past frame n without converting it (sequential reads only)."""
+        if n != self._next:
+            self._seek(n)
+        elif not self.cap.grab():
+            raise IndexError(f"Frame {n} out of range for {self.path.name}")
+        self._next = n + 1
+        return None
+
+
+def reduce_frame(frame, scale=1, gray=False):
+    """Emulate AviReader's reduced decode on an already decoded frame (resize + optional grayscale)."""
+    if gray and frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if scale > 1:
+        h, w = frame.shape[:2]
+        frame = cv2.resize(frame, (-(-w // scale), -(-h // scale)), interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def scale_for_width(width, target_width):
+    """
+    Largest reduced-decode factor (1, 2, 4 or 8) that keeps a frame at least target_width wide.
+
+    Args:
+        width (int): Full frame width in pixels.
+        target_width (int): Width the caller will display or process.
+
+    Returns:
+        int: Scale to pass to read() / iter_frames().
+    """
+    scale = 1
+    while scale < 8 and width / (scale * 2) >= target_width:
+        scale *= 2
+    return scale
+
+
+def open_reader(video_path, use_cache=True):
+    """
+    Open the fastest available reader for a video.
+
+    MJPG AVIs get an index-backed AviReader; archived clips with a frame-times sidecar get an
+    IndexedCaptureReader (exact length and seeks); anything else falls back to cv2.VideoCapture.
+
+    Args:
+        video_path (str | Path): Path to the video file.
+        use_cache (bool): Passed to AviReader for the sidecar index cache.
+
+    Returns:
+        AviReader | CaptureReader: Reader with len(), fps, width, height and read(n).
+    """
+    video_path = Path(video_path)
+    if video_path.suffix.lower() == ".avi":
+        try:
+            reader = AviReader(video_path, use_cache=use_cache)
+            if reader.index.is_mjpg and len(reader) > 0:
+                return reader
+            reader.close()
+        except (ValueError, OSError, struct.error):
+            pass
+    times_path = IndexedCaptureReader.times_path(video_path)
+    if times_path.exists() and times_path.stat().st_mtime >= video_path.stat().st_mtime:
+        return IndexedCaptureReader(video_path, np.load(times_path))
+    return CaptureReader(video_path)
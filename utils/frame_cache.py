@@ -0,0 +1,283 @@
+"""
+Title: frame_cache.py
+
+Description:
+    Decode-once frame cache shared by the pipeline stages. Each clip is decoded a single time
+    at full resolution into a raw uint8 frame store on disk: a small JSON header followed by
+    the frames back to back. Later stages (extract_2d_keypoints, visualize_2d_keypoints,
+    detect_makes, the trimmer) map the store with numpy.memmap and read frames zero-copy instead
+    of decoding the same video again. Least recently used stores are evicted to cap disk use.
+    Every consumer works on full-resolution frames, so stores are not downscaled; a stage that wants
+    smaller frames passes scale to read()/iter_frames().
+
+Inputs:
+    - Video clips readable by utils/avi_reader.py
+
+Usage:
+    - Build caches for the session (optional stage):
+        python utils/frame_cache.py
+    - In a stage, read through the cache when it exists and fall back to decoding otherwise:
+        with open_frames(video_path, session_cache_dir(session_dir)) as frames:
+            for frame in frames.iter_frames():
+                ...
+
+Outputs:
+    - data/<athlete>/<session>/cache/frames/<clip>_<hash>.frames
+"""
+
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.avi_reader import open_reader, reduce_frame
+
+# =========================
+# Constants
+# =========================
+
+CACHE_MAGIC = b"FRMCACHE"
+CACHE_VERSION = 1
+HEADER_SIZE = 4096          # Frames start on a page boundary
+CACHE_SUFFIX = ".frames"
+
+# =========================
+# Paths
+# =========================
+
+def session_cache_dir(session_dir):
+    return Path(session_dir) / "cache" / "frames"
+
+
+def cache_path(video_path, cache_dir):
+    """Cache file for a clip. The path hash keeps left/right clips with the same name apart."""
+    video_path = Path(video_path).resolve()
+    key = hashlib.sha1(str(video_path).encode()).hexdigest()[:8]
+    return Path(cache_dir) / f"{video_path.stem}_{key}{CACHE_SUFFIX}"
+
+
+def _source_signature(video_path):
+    stat = Path(video_path).stat()
+    return {"source": str(Path(video_path).resolve()), "source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+# =========================
+# Frame Store
+# =========================
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if not raw.startswith(CACHE_MAGIC):
+        raise ValueError(f"Not a frame cache: {path}")
+    return json.loads(raw[len(CACHE_MAGIC):].rstrip(b"\0 ").decode())
+
+
+class FrameStore:
+    """
+    Memory-mapped raw frame store with the same read interface as AviReader.
+
+    read() and iter_frames() return read-only views into the map; copy a frame before drawing on it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.header = read_header(self.path)
+        shape = (self.header["frame_count"], self.header["height"], self.header["width"], self.header["channels"])
+        self.frames = np.memmap(self.path, dtype=np.uint8, mode="r", offset=HEADER_SIZE, shape=shape)
+        os.utime(self.path)  # Record the access for LRU eviction
+
+    def __len__(self):
+        return self.header["frame_count"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def frame_count(self):
+        return len(self)
+
+    @property
+    def fps(self):
+        return self.header["fps"]
+
+    @property
+    def width(self):
+        return self.header["width"]
+
+    @property
+    def height(self):
+        return self.header["height"]
+
+    def read(self, n, scale=1, gray=False):
+        """Return frame n (a zero-copy view when scale == 1 and gray is False)."""
+        frame = self.frames[n]
+        return reduce_frame(frame, scale, gray) if scale > 1 or gray else frame
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None, scale=1, gray=False):
+        stop = len(self) if stop is None else min(stop, len(self))
+        for n in range(start, stop, step):
+            yield self.read(n, scale, gray)
+
+    def close(self):
+        self.frames = None  # The map is released once no views into it remain
+
+
+def open_cached(video_path, cache_dir):
+    """
+    Open the frame store for a clip if it exists and still matches the source video.
+
+    Returns:
+        FrameStore | None: The store, or None if the clip is not cached (or the cache is stale).
+    """
+    path = cache_path(video_path, cache_dir)
+    if not path.exists():
+        return None
+    try:
+        header = read_header(path)
+    except (OSError, ValueError):
+        return None
+    signature = _source_signature(video_path)
+    if header.get("version") != CACHE_VERSION or any(header.get(k) != v for k, v in signature.items()):
+        return None
+    return FrameStore(path)
+
+
+def open_frames(video_path, cache_dir=None):
+    """
+    Open a clip through the frame cache when possible, otherwise with the fastest decoder.
+
+    Args:
+        video_path (str | Path): Path to the video.
+        cache_dir (str | Path | None): Frame cache directory (None disables the cache).
+
+    Returns:
+        FrameStore | AviReader | CaptureReader: Reader with len(), fps, width, height, read() and iter_frames().
+    """
+    if cache_dir is not None:
+        store = open_cached(video_path, cache_dir)
+        if store is not None:
+            return store
+    return open_reader(video_path)
+
+
+def build_cache(video_path, cache_dir, workers=None, max_bytes=None):
+    """
+    Decode a clip once into a raw frame store.
+
+    Args:
+        video_path (str | Path): Path to the video.
+        cache_dir (str | Path): Frame cache directory.
+        workers (int | None): Decode threads.
+        max_bytes (int | None): If set, evict least recently used stores above this total size.
+
+    Returns:
+        Path: Path to the frame store.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_path(video_path, cache_dir)
+    if open_cached(video_path, cache_dir) is not None:
+        return path
+
+    tmp_path = path.with_suffix(".tmp")
+    with open_reader(video_path) as reader:
+        first = reader.read(0)
+        height, width = first.shape[:2]
+        channels = first.shape[2] if first.ndim == 3 else 1
+        header = {
+            "version": CACHE_VERSION, "frame_count": len(reader), "height": height, "width": width,
+            "channels": channels, "dtype": "uint8", "fps": reader.fps,
+            **_source_signature(video_path),
+        }
+        raw_header = CACHE_MAGIC + json.dumps(header).encode()
+        if len(raw_header) > HEADER_SIZE:
+            raise ValueError(f"Frame cache header too large for {video_path}")
+
+        with open(tmp_path, "wb") as f:
+            f.write(raw_header.ljust(HEADER_SIZE, b"\0"))
+        frames = np.memmap(tmp_path, dtype=np.uint8, mode="r+", offset=HEADER_SIZE,
+                           shape=(len(reader), height, width, channels))
+        count = 0
+        for frame in reader.iter_frames(workers=workers, stop=len(reader)):
+            frames[count] = frame.reshape(height, width, channels)
+            count += 1
+        frames.flush()
+        del frames
+
+    # CAP_PROP_FRAME_COUNT can overestimate for non-MJPG sources; trim to the frames actually decoded
+    if count != header["frame_count"]:
+        header["frame_count"] = count
+        with open(tmp_path, "r+b") as f:
+            f.write((CACHE_MAGIC + json.dumps(header).encode()).ljust(HEADER_SIZE, b"\0"))
+            f.truncate(HEADER_SIZE + count * height * width * channels)
+
+    os.replace(tmp_path, path)
+    if max_bytes is not None:
+        evict(cache_dir, max_bytes, keep=path)
+    return path
+
+
+def evict(cache_dir, max_bytes, keep=None):
+    """
+    Delete least recently used frame stores until the cache fits in max_bytes.
+
+    Args:
+        cache_dir (str | Path): Frame cache directory.
+        max_bytes (int): Size budget for all stores in the directory.
+        keep (Path | None): Store that must not be evicted (e.g. the one just built).
+
+    Returns:
+        list[Path]: Evicted stores.
+    """
+    stores = sorted(Path(cache_dir).glob(f"*{CACHE_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in stores)
+    evicted = []
+    for store in stores:
+        if total <= max_bytes:
+            break
+        if keep is not None and store.resolve() == Path(keep).resolve():
+            continue
+        size = store.stat().st_size
+        try:
+            store.unlink()
+        except OSError:
+            continue  # Still mapped by another process (Windows); try the next one
+        total -= size
+        evicted.append(store)
+    return evicted
+
+# =========================
+# Main
+# =========================
+
+if __name__ == "__main__":
+    import yaml
+    from utils.archive_session import list_clips
+    from utils.video_views import stereo_clips
+
+    config_path = Path(__file__).resolve().parents[1] / "project_config.yaml"
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    session_dir = Path(__file__).resolve().parents[1] / "data" / cfg["athlete"] / cfg["session"]
+    cache_dir = session_cache_dir(session_dir)
+    max_bytes = int(cfg.get("frame_cache_max_gb", 20) * 1e9)
+
+    # Clips decoded by more than one later stage: the player sources the keypoint stages open
+    # (raw left/right pairs, combined clips only where no raw pair exists) and the ball clips
+    player_dir = session_dir / "videos" / "player_tracking"
+    video_paths = []
+    for _, (left_path, half), (right_path, _) in stereo_clips(player_dir / "raw" / "left", player_dir / "raw" / "right",
+                                                             player_dir / "synchronized"):
+        video_paths += [left_path] if half is not None else [left_path, right_path]
+    video_paths += list_clips(session_dir / "videos" / "ball_tracking" / "synchronized")
+
+    for video_path in video_paths:
+        path = build_cache(video_path, cache_dir, workers=cfg.get("decode_workers"), max_bytes=max_bytes)
+        print(f"[INFO] Cached {video_path.name} -> {path.name}")
@@ -0,0 +1,187 @@
+"""
+Title: frame_timing.py
+
+Description:
+    Finds repeated frames in recordings and writes a per-frame timing map. record_freethrows.py
+    writes the latest captured frame at a fixed rate, so when capture lags the same frame is written
+    again. Those repeats make a clip look like the joint stood still for a frame and then jumped,
+    which breaks velocity estimates. The timing map gives every frame the time its content was
+    actually captured, and velocity() differentiates over new frames only.
+
+    For MJPG AVIs a repeated write encodes to identical JPEG bytes, so repeats are found by comparing
+    the compressed frames without decoding them. Only where that is impossible (clips that are not
+    MJPG AVIs) do repeats fall back to a near-zero mean difference of full-resolution grayscale
+    decodes; sensor noise keeps distinct frames of a still scene above it, where a downscaled
+    comparison would average the noise away. The number of repeats inferred that way is printed.
+    An archived clip (.mkv) keeps the timing map scanned from its AVI, which shares its name.
+
+Inputs:
+    - Recorded clips (videos/player_tracking/raw/left|right, videos/ball_tracking/raw)
+
+Usage:
+    - Scan every raw clip of the session:
+        python utils/frame_timing.py
+    - In a stage:
+        timing = load_timing(video_path)
+        vel = velocity(angles, timing["capture_time_s"])
+
+Outputs:
+    - <clip dir>/<clip>.timing.csv with columns:
+        frame, write_time_s, source_frame, duplicate, capture_time_s
+"""
+
+import sys
+import cv2
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.avi_reader import AviReader, open_reader
+from utils.archive_session import ARCHIVE_SUFFIX, list_clips
+
+# =========================
+# Constants
+# =========================
+
+DUPLICATE_MAX_DIFF = 0.1    # Fallback: mean absolute difference (0-255) of full-resolution grayscale
+                            # decodes below which a frame is a repeat
+
+# =========================
+# Paths
+# =========================
+
+def timing_path(video_path):
+    video_path = Path(video_path)
+    return video_path.with_name(f"{video_path.stem}.timing.csv")
+
+
+def load_timing(video_path):
+    """
+    Load the timing map of a clip.
+
+    Returns:
+        pd.DataFrame | None: The timing map, or None if the clip has not been scanned.
+    """
+    path = timing_path(video_path)
+    return pd.read_csv(path) if path.exists() else None
+
+# =========================
+# Duplicate Scan
+# =========================
+
+def find_repeats(video_path, workers=None):
+    """
+    Flag frames that repeat the previous frame: by comparing JPEG bytes for MJPG AVIs, else by
+    comparing full-resolution grayscale decodes (see DUPLICATE_MAX_DIFF).
+
+    Args:
+        video_path (str | Path): Path to the clip.
+        workers (int | None): Decode threads for the decoded fallback.
+
+    Returns:
+        np.ndarray: Bool per frame, True if the frame is a copy of the one before it.
+    """
+    with open_reader(video_path) as reader:
+        if isinstance(reader, AviReader):
+            sizes = reader.index.sizes
+            repeat = np.zeros(len(reader), dtype=bool)
+            for n in np.flatnonzero(sizes[1:] == sizes[:-1]) + 1:  # Only equal-size chunks can match
+                repeat[n] = reader.read_bytes(n) == reader.read_bytes(n - 1)
+            return repeat
+
+        repeat, prev = [], None
+        for frame in reader.iter_frames(workers=workers, gray=True):
+            repeat.append(prev is not None and cv2.absdiff(frame, prev).mean() < DUPLICATE_MAX_DIFF)
+            prev = frame
+        repeat = np.asarray(repeat, dtype=bool)
+        print(f"[INFO] {Path(video_path).name}: no byte comparison possible; {int(repeat.sum())} repeats "
+              f"inferred from decoded frames (mean difference < {DUPLICATE_MAX_DIFF})")
+        return repeat
+
+
+def build_timing(video_path, fps=None, workers=None):
+    """
+    Build and save the timing map of a clip.
+
+    Frames are written every 1 / fps seconds; a repeated frame shows content captured when its
+    source frame (the first of the run) was written.
+
+    Args:
+        video_path (str | Path): Path to the clip.
+        fps (float | None): Write rate; defaults to the FPS in the file header.
+        workers (int | None): Decode threads for the decoded fallback.
+
+    Returns:
+        pd.DataFrame: The timing map (also written next to the clip).
+    """
+    if fps is None:
+        with open_reader(video_path) as reader:
+            fps = reader.fps
+    repeat = find_repeats(video_path, workers)
+    frames = np.arange(len(repeat))
+    source = np.maximum.accumulate(np.where(repeat, 0, frames))
+    write_time = frames / fps
+
+    timing = pd.DataFrame({
+        "frame": frames,
+        "write_time_s": write_time,
+        "source_frame": source,
+        "duplicate": repeat,
+        "capture_time_s": write_time[source],
+    })
+    timing.to_csv(timing_path(video_path), index=False)
+    return timing
+
+# =========================
+# Velocity
+# =========================
+
+def velocity(values, times):
+    """
+    Time derivative of a per-frame series using true capture times.
+
+    Repeated frames (equal capture time) are skipped when differencing and take the velocity of
+    their source frame, so a repeat no longer shows up as a stop followed by a spike.
+
+    Args:
+        values (array-like): Per-frame values (e.g. a joint angle).
+        times (array-like): Per-frame capture times in seconds (non-decreasing).
+
+    Returns:
+        np.ndarray: Per-frame velocity (units per second); NaN for the first frame, like Series.diff().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    new = np.r_[True, np.diff(times) > 0]
+    vel_new = np.r_[np.nan, np.diff(values[new]) / np.diff(times[new])]
+    return vel_new[np.cumsum(new) - 1]
+
+# =========================
+# Main
+# =========================
+
+if __name__ == "__main__":
+    import yaml
+
+    config_path = Path(__file__).resolve().parents[1] / "project_config.yaml"
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    session_dir = Path(__file__).resolve().parents[1] / "data" / cfg["athlete"] / cfg["session"]
+    raw_dirs = {
+        session_dir / "videos" / "player_tracking" / "raw" / "left": cfg["player_tracking_fps"],
+        session_dir / "videos" / "player_tracking" / "raw" / "right": cfg["player_tracking_fps"],
+        session_dir / "videos" / "ball_tracking" / "raw": cfg["ball_tracking_fps"],
+    }
+
+    for raw_dir, fps in raw_dirs.items():
+        for video_path in list_clips(raw_dir):
+            if video_path.suffix == ARCHIVE_SUFFIX and timing_path(video_path).exists():
+                print(f"[INFO] {raw_dir.name}/{video_path.name}: keeping the timing map scanned from the raw AVI")
+                continue
+            timing = build_timing(video_path, fps, workers=cfg.get("decode_workers"))
+            n_dup = int(timing["duplicate"].sum())
+            unique_fps = (len(timing) - n_dup) / (len(timing) / fps) if len(timing) else 0
+            print(f"[INFO] {raw_dir.name}/{video_path.name}: {n_dup}/{len(timing)} repeated frames "
+                  f"(~{unique_fps:.1f} unique frames/s) -> {timing_path(video_path).name}")
@@ -0,0 +1,266 @@
+"""
+Title: keypoint_store.py
+
+Description:
+    Binary keypoint store shared by the player tracking stages. Each clip/view is a float32 array of
+    shape (frames, landmarks, channels) saved as .npy (memory-mappable) with a small .json metadata
+    sidecar: landmark and channel names, fps, frame size, a hash of the source video and the model
+    configuration that produced it. Missing landmarks are NaN (the old CSVs used -1).
+
+    Loaders return the array and its metadata for every consumer; load_any() also reads the legacy
+    99-column CSVs, so stages keep working on sessions extracted before the store existed.
+
+Inputs:
+    - Keypoints from extract_2d_keypoints.py, or legacy <clip>_<view>.csv files
+
+Usage:
+    - Save:   save_keypoints(keypoints_dir / "freethrow3_left", data, meta)
+    - Load:   data, meta = load_any(keypoints_dir / "freethrow3_left")
+    - Parts:  hand, meta = load_keypoints(part_base(keypoints_dir / "freethrow3_left", "hand"))
+    - Rows:   interpolated = load_interpolated(keypoints_dir / "freethrow3_left")  # bool per frame
+    - Convert every legacy CSV of the session:
+        python utils/keypoint_store.py
+
+Outputs:
+    - <base>.npy and <base>.json (e.g. metrics/2d_keypoints/freethrow3_left.npy / .json)
+    - <base>_<part>.npy / .json for extra landmark sets of the same clip/view (e.g. _hand)
+    - <base>.interpolated.npy: bool per frame, True for rows interpolated between keyframes
+"""
+
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# =========================
+# Constants
+# =========================
+
+STORE_VERSION = 1
+MISSING_CSV = -1            # Missing landmark marker in the legacy CSVs
+
+POSE_LANDMARKS = [
+    "nose", "left_eye_inner", "left_eye", "left_eye_outer", "right_eye_inner", "right_eye", "right_eye_outer",
+    "left_ear", "right_ear", "mouth_left", "mouth_right",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_pinky", "right_pinky",
+    "left_index", "right_index", "left_thumb", "right_thumb",
+    "left_hip", "right_hip", "left_knee", "right_knee",
+    "left_ankle", "right_ankle", "left_heel", "right_heel",
+    "left_foot_index", "right_foot_index"
+]
+"""List[str]: The 33 human body landmarks used by Google MediaPipe Pose."""
+
+POSE_CHANNELS = ["x", "y", "v"]  # Normalized image x, y and visibility
+
+HAND_LANDMARKS = [
+    "wrist",
+    "thumb_cmc", "thumb_mcp", "thumb_ip", "thumb_tip",
+    "index_finger_mcp", "index_finger_pip", "index_finger_dip", "index_finger_tip",
+    "middle_finger_mcp", "middle_finger_pip", "middle_finger_dip", "middle_finger_tip",
+    "ring_finger_mcp", "ring_finger_pip", "ring_finger_dip", "ring_finger_tip",
+    "pinky_mcp", "pinky_pip", "pinky_dip", "pinky_tip"
+]
+"""List[str]: The 21 hand landmarks used by Google MediaPipe Hands."""
+
+# =========================
+# Paths and Hashing
+# =========================
+
+def store_paths(base):
+    """(.npy, .json) paths of a store given its base path without suffix."""
+    base = Path(base)
+    return base.with_name(base.name + ".npy"), base.with_name(base.name + ".json")
+
+
+def exists(base):
+    return all(p.exists() for p in store_paths(base))
+
+
+def interpolated_path(base):
+    """Per-frame interpolated marker of a store (row-aligned with its array)."""
+    base = Path(base)
+    return base.with_name(base.name + ".interpolated.npy")
+
+
+def part_base(base, part):
+    """Base path of an extra landmark set (e.g. "hand") stored alongside a clip/view's pose."""
+    base = Path(base)
+    return base.with_name(f"{base.name}_{part}")
+
+
+def source_hash(video_path, chunk=1 << 20):
+    """Cheap content hash of a video: SHA-1 over its size and first/last MiB."""
+    video_path = Path(video_path)
+    size = video_path.stat().st_size
+    sha = hashlib.sha1(str(size).encode())
+    with open(video_path, "rb") as f:
+        sha.update(f.read(chunk))
+        if size > chunk:
+            f.seek(max(chunk, size - chunk))
+            sha.update(f.read(chunk))
+    return sha.hexdigest()
+
+# =========================
+# Save / Load
+# =========================
+
+def save_keypoints(base, data, meta=None):
+    """
+    Save a keypoint array and its metadata.
+
+    Args:
+        base (str | Path): Store path without suffix (e.g. .../freethrow3_left).
+        data (np.ndarray): Array of shape (frames, landmarks, channels); NaN = missing.
+        meta (dict | None): Extra metadata (fps, width, height, source, source_hash, model, ...).
+
+    Returns:
+        Path: Path to the .npy file.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    if data.ndim != 3:
+        raise ValueError(f"Keypoints must have shape (frames, landmarks, channels), got {data.shape}")
+    meta = {
+        "version": STORE_VERSION,
+        "landmarks": {len(POSE_LANDMARKS): POSE_LANDMARKS, len(HAND_LANDMARKS): HAND_LANDMARKS}.get(data.shape[1]),
+        "channels": POSE_CHANNELS[:data.shape[2]],
+        **(meta or {}),
+        "frames": data.shape[0],
+        "shape": list(data.shape),
+    }
+    npy_path, json_path = store_paths(base)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(npy_path, data)
+    with open(json_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return npy_path
+
+
+def load_keypoints(base, mmap=True):
+    """
+    Load a keypoint store.
+
+    Args:
+        base (str | Path): Store path without suffix.
+        mmap (bool): Memory-map the array (read-only) instead of reading it into memory.
+
+    Returns:
+        tuple[np.ndarray, dict]: (frames, landmarks, channels) float32 array and its metadata.
+    """
+    npy_path, json_path = store_paths(base)
+    with open(json_path) as f:
+        meta = json.load(f)
+    return np.load(npy_path, mmap_mode="r" if mmap else None), meta
+
+
+def save_interpolated(base, interpolated):
+    """Save the per-frame interpolated marker of a store (one bool per row of its array)."""
+    path = interpolated_path(base)
+    np.save(path, np.asarray(interpolated, dtype=bool))
+    return path
+
+
+def load_interpolated(base, meta=None):
+    """
+    Per-frame interpolated marker of a store.
+
+    Args:
+        base (str | Path): Store path without suffix.
+        meta (dict | None): The store's metadata (loaded if not given), for its frame count and for
+            stores that only list interpolated frames (interpolated_frames, e.g. converted CSVs).
+
+    Returns:
+        np.ndarray: Bool per frame; all False when nothing was interpolated.
+    """
+    path = interpolated_path(base)
+    if path.exists():
+        return np.load(path)
+    meta = meta if meta is not None else load_metadata(base)
+    flags = np.zeros(meta["frames"], dtype=bool)
+    flags[meta.get("interpolated_frames", [])] = True
+    return flags
+
+
+def load_metadata(base):
+    with open(store_paths(base)[1]) as f:
+        return json.load(f)
+
+
+def update_metadata(base, **fields):
+    """Add or replace metadata fields of an existing store without touching its array."""
+    meta = {**load_metadata(base), **fields}
+    with open(store_paths(base)[1], "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+# =========================
+# Legacy CSVs
+# =========================
+
+def csv_to_array(csv_path):
+    """
+    Read a legacy 2D keypoint CSV (frame, <name>_x, <name>_y, <name>_v, ...).
+
+    Returns:
+        tuple[np.ndarray, dict]: (frames, 33, 3) float32 array with NaN for -1 entries, and metadata.
+    """
+    df = pd.read_csv(csv_path)
+    columns = [f"{name}_{axis}" for name in POSE_LANDMARKS for axis in POSE_CHANNELS]
+    data = df[columns].to_numpy(dtype=np.float32).reshape(len(df), len(POSE_LANDMARKS), len(POSE_CHANNELS))
+    data[data == MISSING_CSV] = np.nan
+    meta = {"landmarks": POSE_LANDMARKS, "channels": POSE_CHANNELS, "converted_from": Path(csv_path).name}
+    if "interpolated" in df:
+        meta["interpolated_frames"] = np.flatnonzero(df["interpolated"].to_numpy()).tolist()
+    return data, meta
+
+
+def convert_csv(csv_path, base=None, **meta):
+    """Convert a legacy CSV to a store next to it (or at base). Returns the .npy path."""
+    csv_path = Path(csv_path)
+    data, csv_meta = csv_to_array(csv_path)
+    base = base or csv_path.with_suffix("")
+    path = save_keypoints(base, data, {**csv_meta, **meta})
+    if "interpolated_frames" in csv_meta:
+        save_interpolated(base, load_interpolated(base))
+    return path
+
+
+def load_any(base, mmap=True):
+    """
+    Load a store, falling back to the legacy CSV at <base>.csv.
+
+    Returns:
+        tuple[np.ndarray, dict]: As load_keypoints.
+
+    Raises:
+        FileNotFoundError: If neither the store nor the CSV exists.
+    """
+    base = Path(base)
+    if exists(base):
+        return load_keypoints(base, mmap)
+    csv_path = base.with_name(base.name + ".csv")
+    if csv_path.exists():
+        return csv_to_array(csv_path)
+    raise FileNotFoundError(f"No keypoint store or CSV for {base}")
+
+
+def to_pixels(data, meta):
+    """Normalized x, y of a store converted to pixel coordinates (needs width/height in meta)."""
+    return data[..., :2] * np.array([meta["width"], meta["height"]], dtype=np.float32)
+
+# =========================
+# Main
+# =========================
+
+if __name__ == "__main__":
+    import yaml
+
+    config_path = Path(__file__).resolve().parents[1] / "project_config.yaml"
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    keypoints_dir = Path(__file__).resolve().parents[1] / "data" / cfg["athlete"] / cfg["session"] / "metrics" / "2d_keypoints"
+    for csv_path in sorted(keypoints_dir.glob("*.csv")):
+        if not exists(csv_path.with_suffix("")):
+            print(f"[INFO] Converted {csv_path.name} -> {convert_csv(csv_path).name}")
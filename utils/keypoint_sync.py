@@ -0,0 +1,192 @@
+"""
+Title: keypoint_sync.py
+
+Description:
+    Software stereo sync from keypoint motion, for clips where the LED flash was missed
+    (detect_flashes.py found no offset). The shot moves the wrists and elbows up and down in both
+    views at the same moments, so the vertical velocity of those joints in the left and right 2D
+    keypoint series is cross-correlated (FFT, summed over joints) and the correlation peak, refined
+    with a parabolic fit, gives a sub-frame offset. The right view is then resampled onto the left
+    view's frames. Only the stored keypoints are used; no video is decoded.
+
+Inputs:
+    - Left/right 2D keypoint stores (metrics/2d_keypoints/<clip>_left|right.npy)
+    - metrics/sync_offsets.csv from detect_flashes.py (optional, for comparison)
+
+Usage:
+    - Estimate offsets for every clip of the session:
+        python utils/keypoint_sync.py
+    - In a stage:
+        offset, corr = estimate_keypoint_offset(left, right, fps)
+        right_on_left = resample_view(right, offset, len(left))
+
+Outputs:
+    - metrics/keypoint_sync.csv with columns:
+        clip, fps, offset_frames, offset_s, peak_corr, joints, flash_offset_s
+      offset_s follows sync_offsets.csv: a moment t seconds into the left clip is at t + offset_s
+      seconds into the right clip.
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.keypoint_store import POSE_LANDMARKS
+from utils.time_base import measured_offsets
+
+# =========================
+# Constants
+# =========================
+
+SYNC_JOINTS = [POSE_LANDMARKS.index(name) for name in ("left_elbow", "right_elbow", "left_wrist", "right_wrist")]
+MAX_OFFSET_S = 0.5          # Largest offset searched, in seconds either way
+MIN_VALID_FRACTION = 0.5    # A joint needs coordinates in at least this share of frames to be used
+MIN_PEAK_CORR = 0.5         # Offsets with a weaker correlation peak are not trusted
+
+# =========================
+# Signals
+# =========================
+
+def vertical_velocity(keypoints, fps, joints=SYNC_JOINTS):
+    """
+    Standardized vertical velocity of the sync joints.
+
+    Gaps (NaN) are linearly interpolated before differentiating. Joints tracked in fewer than
+    MIN_VALID_FRACTION of the frames are left out.
+
+    Args:
+        keypoints (np.ndarray): (frames, landmarks, channels) normalized keypoints (NaN = missing).
+        fps (float): View FPS.
+        joints (list[int]): Landmark indices to use.
+
+    Returns:
+        tuple[np.ndarray, list[int]]: (frames, used joints) zero-mean unit-variance velocities and
+            the landmark indices used.
+    """
+    y = np.asarray(keypoints[:, joints, 1], dtype=np.float64)
+    frames = np.arange(len(y))
+    signals, used = [], []
+    for col, joint in enumerate(joints):
+        valid = ~np.isnan(y[:, col])
+        if valid.sum() < max(3, MIN_VALID_FRACTION * len(y)):
+            continue
+        filled = np.interp(frames, frames[valid], y[valid, col])
+        vel = np.gradient(filled) * fps
+        vel -= vel.mean()
+        std = vel.std()
+        if std > 0:
+            signals.append(vel / std)
+            used.append(joint)
+    return (np.stack(signals, axis=1) if signals else np.empty((len(y), 0))), used
+
+
+def _parabolic_peak(corr, i):
+    """Sub-sample position of the peak at index i from a parabola through its neighbours."""
+    if 0 < i < len(corr) - 1:
+        a, b, c = corr[i - 1], corr[i], corr[i + 1]
+        denom = a - 2 * b + c
+        if denom != 0:
+            return i + 0.5 * (a - c) / denom
+    return float(i)
+
+# =========================
+# Offset
+# =========================
+
+def estimate_keypoint_offset(left, right, fps, max_offset_s=MAX_OFFSET_S, joints=SYNC_JOINTS):
+    """
+    Sub-frame offset of the right view relative to the left from joint motion.
+
+    Args:
+        left (np.ndarray): (frames, landmarks, channels) left keypoints.
+        right (np.ndarray): (frames, landmarks, channels) right keypoints at the same FPS.
+        fps (float): FPS of both views.
+        max_offset_s (float): Largest offset searched.
+        joints (list[int]): Landmark indices to correlate.
+
+    Returns:
+        tuple[float, float, list[int]]: (offset in frames: left frame n shows the same moment as right
+            frame n + offset; peak correlation in [-1, 1]; joints used). The offset is NaN if no joint
+            is tracked well enough in both views.
+    """
+    a, used_a = vertical_velocity(left, fps, joints)
+    b, used_b = vertical_velocity(right, fps, joints)
+    common = [j for j in used_a if j in used_b]
+    if not common:
+        return np.nan, np.nan, []
+    a = a[:, [used_a.index(j) for j in common]]
+    b = b[:, [used_b.index(j) for j in common]]
+
+    # corr[k] = sum_t b[t + k] a[t], summed over joints; zero padding keeps the lags linear
+    n = len(a) + len(b)
+    spectrum = (np.fft.rfft(b, n, axis=0) * np.conj(np.fft.rfft(a, n, axis=0))).sum(axis=1)
+    corr = np.fft.irfft(spectrum, n) / (len(common) * np.sqrt(len(a) * len(b)))
+
+    max_lag = int(min(max_offset_s * fps, len(a) - 1, len(b) - 1))
+    lags = np.concatenate([corr[-max_lag:], corr[:max_lag + 1]]) if max_lag > 0 else corr[:1]
+    peak = int(np.argmax(lags))
+    return _parabolic_peak(lags, peak) - max_lag, float(lags[peak]), common
+
+
+def resample_view(keypoints, offset_frames, n_frames):
+    """
+    Resample a view onto the reference view's frames: row n is the view at frame n + offset_frames,
+    linearly interpolated between its two neighbouring frames.
+
+    Args:
+        keypoints (np.ndarray): (frames, landmarks, channels) keypoints of the view.
+        offset_frames (float): Offset from estimate_keypoint_offset().
+        n_frames (int): Frames of the reference view.
+
+    Returns:
+        np.ndarray: (n_frames, landmarks, channels) float32; NaN outside the view and wherever a
+            neighbouring frame is missing (gaps are not filled).
+    """
+    keypoints = np.asarray(keypoints, dtype=np.float64)
+    pos = np.round(np.arange(n_frames) + offset_frames, 6)            # A near-zero offset keeps the last frame
+    i0 = np.floor(pos).astype(int)
+    w = (pos - i0)[:, None, None]
+    i0 = np.clip(i0, 0, len(keypoints) - 1)
+    i1 = np.minimum(i0 + 1, len(keypoints) - 1)
+    out = keypoints[i0] + w * (keypoints[i1] - keypoints[i0])
+    out = np.where(w == 0, keypoints[i0], out)                         # Whole frames need no right neighbour
+    out[(pos < 0) | (pos > len(keypoints) - 1)] = np.nan
+    return out.astype(np.float32)
+
+# =========================
+# Main
+# =========================
+
+if __name__ == "__main__":
+    import yaml
+    from utils.keypoint_store import load_any
+
+    config_path = Path(__file__).resolve().parents[1] / "project_config.yaml"
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    session_dir = Path(__file__).resolve().parents[1] / "data" / cfg["athlete"] / cfg["session"]
+    keypoints_dir = session_dir / "metrics" / "2d_keypoints"
+    stems = sorted({p.stem[:-len("_left")] for p in keypoints_dir.glob("*_left.*") if p.suffix in (".npy", ".csv")})
+
+    rows = []
+    for stem in stems:
+        try:
+            (left, left_meta), (right, _) = load_any(keypoints_dir / f"{stem}_left"), load_any(keypoints_dir / f"{stem}_right")
+        except FileNotFoundError:
+            continue
+        fps = left_meta.get("fps") or cfg["player_tracking_fps"]
+        offset, corr, joints = estimate_keypoint_offset(left, right, fps)
+        flash = measured_offsets(session_dir, stem).get("right", np.nan)
+        rows.append({"clip": stem, "fps": fps, "offset_frames": offset, "offset_s": offset / fps, "peak_corr": corr,
+                     "joints": len(joints), "flash_offset_s": flash})
+        trusted = "" if corr >= MIN_PEAK_CORR else " (weak, not trusted)"
+        print(f"[INFO] {stem}: right offset {offset:+.2f} frames ({offset / fps * 1000:+.1f} ms), "
+              f"corr {corr:.2f} over {len(joints)} joints{trusted}; flash {flash * 1000:+.1f} ms")
+
+    output_csv = session_dir / "metrics" / "keypoint_sync.csv"
+    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows).to_csv(output_csv, index=False)
+    print(f"✅ Saved keypoint sync offsets: {output_csv}")
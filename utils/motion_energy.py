@@ -0,0 +1,135 @@
+"""
+Title: motion_energy.py
+
+Description:
+    Per-clip motion-energy curve (mean absolute difference between consecutive 1/8-resolution
+    grayscale frames) and a trim proposal derived from it. The shot is the burst of motion around
+    the curve's peak, so the trimmer can open each clip already positioned at a proposed start and
+    end instead of at frame 0. Curves are cached next to the proxies and built by the same
+    background job (utils/proxies.py).
+
+Inputs:
+    - Recorded clips readable by utils/avi_reader.py
+
+Usage:
+    energy = load_motion_energy(video_path)      # cached; computed on first use
+    start, end = propose_trim(energy, fps)
+
+Outputs:
+    - <clip dir>/proxy/<clip>_motion.npy
+"""
+
+import sys
+import cv2
+import numpy as np
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.avi_reader import open_reader
+
+# =========================
+# Constants
+# =========================
+
+MOTION_DIRNAME = "proxy"    # Stored with the proxies and filmstrips
+MOTION_SCALE = 8            # Frame differences are taken on 1/8 resolution grayscale decodes
+SMOOTH_S = 0.2              # Moving-average window applied before thresholding
+ACTIVE_FRACTION = 0.25      # Active = above baseline + this fraction of (peak - baseline)
+MERGE_GAP_S = 0.5           # Active stretches closer than this are one shot
+PAD_S = 0.5                 # Margin kept before and after the active stretch
+
+# =========================
+# Curve
+# =========================
+
+def motion_path(video_path):
+    video_path = Path(video_path)
+    return video_path.parent / MOTION_DIRNAME / f"{video_path.stem}_motion.npy"
+
+
+def compute_motion_energy(video_path, workers=None):
+    """
+    Mean absolute difference between each frame and the one before it.
+
+    Args:
+        video_path (str | Path): Path to the clip.
+        workers (int | None): Decode threads.
+
+    Returns:
+        np.ndarray: float32 energy per frame (0 for the first frame).
+    """
+    energy, prev = [], None
+    with open_reader(video_path) as reader:
+        for frame in reader.iter_frames(workers=workers, scale=MOTION_SCALE, gray=True):
+            energy.append(0.0 if prev is None else float(cv2.absdiff(frame, prev).mean()))
+            prev = frame
+    return np.asarray(energy, dtype=np.float32)
+
+
+def build_motion_energy(video_path, workers=None):
+    """Compute and cache the motion-energy curve of a clip. Returns the cache path."""
+    path = motion_path(video_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, compute_motion_energy(video_path, workers))
+    return path
+
+
+def load_motion_energy(video_path, compute=True, workers=None):
+    """
+    Cached motion-energy curve of a clip.
+
+    Args:
+        video_path (str | Path): Path to the clip.
+        compute (bool): Build the curve if it is missing or older than the clip.
+        workers (int | None): Decode threads when computing.
+
+    Returns:
+        np.ndarray | None: The curve, or None if it is not cached and compute is False.
+    """
+    path = motion_path(video_path)
+    if path.exists() and path.stat().st_mtime >= Path(video_path).stat().st_mtime:
+        return np.load(path)
+    if not compute:
+        return None
+    build_motion_energy(video_path, workers)
+    return np.load(path)
+
+# =========================
+# Trim Proposal
+# =========================
+
+def propose_trim(energy, fps):
+    """
+    Propose (start, end) frames around the main burst of motion.
+
+    Args:
+        energy (np.ndarray): Motion-energy curve.
+        fps (float): Clip FPS (windows are defined in seconds).
+
+    Returns:
+        tuple[int, int] | None: Inclusive frame range, or None for an empty or motionless clip.
+    """
+    n = len(energy)
+    if n == 0:
+        return None
+    fps = fps if fps > 0 else 30
+
+    window = max(1, int(round(SMOOTH_S * fps)))
+    smooth = np.convolve(energy, np.ones(window) / window, mode="same")
+    baseline, peak = float(np.median(smooth)), float(smooth.max())
+    if peak <= baseline:
+        return None
+
+    active = smooth > baseline + ACTIVE_FRACTION * (peak - baseline)
+
+    # Close short gaps so pauses inside the shot (e.g. the set point) do not split it
+    idx = np.flatnonzero(active)
+    gaps = np.flatnonzero(np.diff(idx) > MERGE_GAP_S * fps)
+    starts = np.r_[idx[0], idx[gaps + 1]]
+    ends = np.r_[idx[gaps], idx[-1]]
+
+    # Keep the stretch containing the peak
+    peak_idx = int(np.argmax(smooth))
+    seg = int(np.searchsorted(starts, peak_idx, side="right")) - 1
+    pad = int(round(PAD_S * fps))
+    return max(0, int(starts[seg]) - pad), min(n - 1, int(ends[seg]) + pad)
@@ -26,12 +26,17 @@ Last Updated: 15 July 2025
 
 import cv2
 import os
+import sys
 import tkinter as tk
 from tkinter import filedialog, Label, Button
 from PIL import Image, ImageTk
 from pathlib import Path
 import yaml
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.avi_reader import open_reader, scale_for_width
+from utils.proxies import open_proxy
+
 # =========================
 # Config
 # =========================
@@ -44,6 +49,8 @@ with open(config_path, "r") as f:
 ATHLETE = cfg["athlete"]
 SESSION = cfg["session"]
 
+PREVIEW_WIDTH = 960  # Larger videos are decoded at 1/2, 1/4 or 1/8 resolution for display
+
 # =========================
 # Paths and Directories 
 # =========================
@@ -61,7 +68,9 @@ class VideoPlayerApp:
 
         self.video_files = []
         self.current_index = 0
-        self.cap = None
+        self.reader = None
+        self.proxy = None  # Low-res proxy used during playback (see utils/proxies.py)
+        self.position = 0  # Index of the next frame to display
         self.playing = False
 
         # UI Elements
@@ -119,18 +128,23 @@ class VideoPlayerApp:
         self.status.set(f"Loaded {len(self.video_files)} videos")
 
     def open_video(self, filepath):
-        if self.cap:
-            self.cap.release()
-        self.cap = cv2.VideoCapture(filepath)
+        if self.reader:
+            self.reader.close()
+        if self.proxy:
+            self.proxy.close()
+        self.reader = open_reader(filepath)
+        self.proxy = open_proxy(filepath)
+        self.preview_scale = scale_for_width(self.reader.width, PREVIEW_WIDTH)
+        self.position = 0
         self.playing = True
         self.show_frame()
 
-        # Calculate video properties
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Video properties come straight from the frame index
+        fps = self.reader.fps
+        total_frames = len(self.reader)
         duration = total_frames / fps if fps > 0 else 0
-        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        width = self.reader.width
+        height = self.reader.height
         filename = os.path.basename(filepath)
 
         # Update video info label 
@@ -139,30 +153,42 @@ class VideoPlayerApp:
             f"Resolution: {width}x{height} | Total Frames: {total_frames} | Duration: {duration:.2f}s | FPS: {fps:.2f}"
         )
 
+    def display_frame(self, index, exact=False):
+        """Decode frame `index` and display it, from the proxy while playing or the original when exact."""
+        if self.proxy and not exact:
+            frame = self.proxy.read(index)
+            h, w = frame.shape[:2]
+            size = (-(-self.reader.width // self.preview_scale), -(-self.reader.height // self.preview_scale))
+            if (w, h) != size:
+                frame = cv2.resize(frame, size)  # Keep the display size stable between proxy and original
+        else:
+            frame = self.reader.read(index, scale=self.preview_scale)
+        self.position = index + 1
+
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        img = ImageTk.PhotoImage(Image.fromarray(frame))
+        self.label.configure(image=img)
+        self.label.image = img
+        self.update_frame_info()
+
     def show_frame(self):
-        if self.cap and self.playing:
-            ret, frame = self.cap.read()
-            if not ret:
+        if self.reader and self.playing:
+            if self.position >= len(self.reader):
                 return
-            
-            # Display the frame 
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = ImageTk.PhotoImage(Image.fromarray(frame))
-            self.label.configure(image=img)
-            self.label.image = img
 
-            # Update frame info
-            self.update_frame_info()
+            # Display the frame 
+            self.display_frame(self.position)
 
             # Schedule next frame
-            delay = int(1000 / self.cap.get(cv2.CAP_PROP_FPS))  # dynamically get video FPS
+            fps = self.reader.fps if self.reader.fps > 0 else 30
+            delay = int(1000 / fps)  # dynamically get video FPS
             self.root.after(delay, self.show_frame)
 
     def update_frame_info(self):
-        if self.cap:
-            current_frame = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-            total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if self.reader:
+            current_frame = self.position
+            total_frames = len(self.reader)
+            fps = self.reader.fps
 
             # Calculate elapsed time
             elapsed_time = current_frame / fps if fps > 0 else 0
@@ -174,15 +200,12 @@ class VideoPlayerApp:
 
 
     def toggle_play(self):
-        if not self.cap:
+        if not self.reader:
             return
 
         # If at the end of the video, restart from beginning
-        current_frame = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-        total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-        if current_frame >= total_frames:  # Video finished
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        if self.position >= len(self.reader):  # Video finished
+            self.position = 0
 
         # Toggle play/pause
         self.playing = not self.playing
@@ -201,26 +224,21 @@ class VideoPlayerApp:
             self.open_video(self.video_files[self.current_index])
 
     def next_frame(self):
-        if self.cap:
+        if self.reader:
             self.playing = False
-            ret, frame = self.cap.read()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = ImageTk.PhotoImage(Image.fromarray(frame))
-                self.label.configure(image=img)
-                self.label.image = img
-                self.update_frame_info()
+            if self.position < len(self.reader):
+                self.display_frame(self.position, exact=True)
 
     def prev_frame(self):
-        if self.cap:
+        if self.reader:
             self.playing = False
-            pos = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, pos - 2))  # Go back two frames
-            self.next_frame()
+            self.display_frame(max(0, self.position - 2), exact=True)  # Position is one past the displayed frame
 
     def on_close(self):
-        if self.cap:
-            self.cap.release()
+        if self.reader:
+            self.reader.close()
+        if self.proxy:
+            self.proxy.close()
         self.root.quit()
 
 
@@ -0,0 +1,336 @@
+"""
+Title: pose_backends.py
+
+Description:
+    CPU pose backends behind one interface, so stages are not hard-wired to MediaPipe. A backend
+    takes RGB frames and returns (33, 3) arrays of [x, y, visibility] in normalized image
+    coordinates, in MediaPipe Pose landmark order (utils/keypoint_store.POSE_LANDMARKS), with NaN
+    for landmarks the model does not provide. Frames without a pose give None.
+
+    - mediapipe: MediaPipe Pose (one frame at a time, tracks the athlete between frames)
+    - onnx:      a lightweight COCO-17 keypoint model (e.g. RTMPose, MoveNet) run with ONNX Runtime
+                 on the CPU; frames are letterboxed to the model input and run in batches. The 17
+                 COCO keypoints fill their MediaPipe slots; the other 16 landmarks are NaN.
+    - mediapipe_hands: MediaPipe Hands for one hand; returns (21, 3) arrays of [x, y, handedness
+                 score] in MediaPipe Hands order (utils/keypoint_store.HAND_LANDMARKS). Hands reports
+                 no per-landmark visibility or detection confidence, so the third channel is the
+                 left/right classification score of the hand.
+
+    onnxruntime is only needed for the onnx backend and is imported when one is created.
+
+Inputs:
+    - RGB frames (np.ndarray, HxWx3 uint8)
+    - An .onnx model for the onnx backend (pose_onnx_model in project_config.yaml)
+
+Usage:
+    backend = backend_from_config(cfg)
+    for pts in backend.process_batch(frames):   # (33, 3) array or None per frame
+        ...
+
+Outputs:
+    - None
+"""
+
+import cv2
+import numpy as np
+from pathlib import Path
+
+# =========================
+# Constants
+# =========================
+
+N_LANDMARKS = 33
+N_HAND_LANDMARKS = 21
+DEFAULT_BACKEND = "mediapipe"
+DEFAULT_BATCH_SIZE = 8
+
+# MediaPipe landmark index of each COCO-17 keypoint
+COCO_TO_MEDIAPIPE = [
+    0,          # nose
+    2, 5,       # left_eye, right_eye
+    7, 8,       # left_ear, right_ear
+    11, 12,     # shoulders
+    13, 14,     # elbows
+    15, 16,     # wrists
+    23, 24,     # hips
+    25, 26,     # knees
+    27, 28,     # ankles
+]
+
+ONNX_MEAN = np.array([123.675, 116.28, 103.53], dtype=np.float32)  # ImageNet RGB mean/std (RTMPose)
+ONNX_STD = np.array([58.395, 57.12, 57.375], dtype=np.float32)
+ONNX_MIN_SCORE = 0.3        # Frames whose best keypoint scores below this have no pose
+
+# =========================
+# Interface
+# =========================
+
+class PoseBackend:
+    """Base class: subclasses implement process() and/or process_batch()."""
+
+    name = "base"
+    n_landmarks = N_LANDMARKS
+    batch_size = 1          # Frames per inference call
+    tracking = False        # True if results depend on previous frames (call reset() between clips)
+
+    def process(self, rgb):
+        """
+        Pose of one RGB frame.
+
+        Returns:
+            np.ndarray | None: (33, 3) float32 [x, y, visibility] (normalized, NaN = not provided),
+                or None if no pose was found.
+        """
+        return self.process_batch([rgb])[0]
+
+    def process_batch(self, frames):
+        """Pose of each RGB frame in a list (see process())."""
+        return [self.process(rgb) for rgb in frames]
+
+    def detector(self):
+        """Backend for single-image (re-)detection; stateless backends return themselves."""
+        return self
+
+    def reset(self):
+        """Forget tracking state before a new clip."""
+
+    def reset_tracking(self):
+        """Forget the previous frame (e.g. when the input crop moved)."""
+
+    def close(self):
+        pass
+
+    @property
+    def config(self):
+        """Model configuration recorded in the keypoint store metadata."""
+        return {"name": self.name, "batch_size": self.batch_size}
+
+# =========================
+# MediaPipe
+# =========================
+
+class MediaPipeBackend(PoseBackend):
+    name = "mediapipe"
+    tracking = True
+
+    def __init__(self, static_image_mode=False, model_complexity=1):
+        import mediapipe as mp
+        self._solution = mp.solutions.pose
+        self.static_image_mode = static_image_mode
+        self.model_complexity = model_complexity
+        self.tracking = not static_image_mode
+        self.pose = self._create()
+
+    def _create(self):
+        return self._solution.Pose(static_image_mode=self.static_image_mode, model_complexity=self.model_complexity)
+
+    def process(self, rgb):
+        results = self.pose.process(rgb)
+        if not results.pose_landmarks:
+            return None
+        return np.array([(lm.x, lm.y, lm.visibility) for lm in results.pose_landmarks.landmark], dtype=np.float32)
+
+    def detector(self):
+        return self if self.static_image_mode else MediaPipeBackend(True, self.model_complexity)
+
+    def reset(self):
+        if hasattr(self.pose, "reset"):
+            self.pose.reset()
+        else:
+            self.pose.close()
+            self.pose = self._create()
+
+    def reset_tracking(self):
+        if hasattr(self.pose, "reset"):
+            self.pose.reset()
+
+    def close(self):
+        self.pose.close()
+
+    @property
+    def config(self):
+        return {**super().config, "model_complexity": self.model_complexity, "static_image_mode": self.static_image_mode}
+
+class MediaPipeHandsBackend(PoseBackend):
+    name = "mediapipe_hands"
+    n_landmarks = N_HAND_LANDMARKS
+
+    def __init__(self, static_image_mode=True, min_detection_confidence=0.5):
+        import mediapipe as mp
+        self._solution = mp.solutions.hands
+        self.static_image_mode = static_image_mode
+        self.min_detection_confidence = min_detection_confidence
+        self.tracking = not static_image_mode
+        self.hands = self._create()
+
+    def _create(self):
+        return self._solution.Hands(static_image_mode=self.static_image_mode, max_num_hands=1,
+                                    min_detection_confidence=self.min_detection_confidence)
+
+    def process(self, rgb):
+        """(21, 3) [x, y, handedness score] of the most prominent hand, or None."""
+        results = self.hands.process(rgb)
+        if not results.multi_hand_landmarks:
+            return None
+        score = results.multi_handedness[0].classification[0].score
+        return np.array([(lm.x, lm.y, score) for lm in results.multi_hand_landmarks[0].landmark], dtype=np.float32)
+
+    def detector(self):
+        return self if self.static_image_mode else MediaPipeHandsBackend(True, self.min_detection_confidence)
+
+    def reset(self):
+        if not self.static_image_mode:
+            self.hands.close()
+            self.hands = self._create()
+
+    def reset_tracking(self):
+        self.reset()
+
+    def close(self):
+        self.hands.close()
+
+    @property
+    def config(self):
+        return {**super().config, "static_image_mode": self.static_image_mode,
+                "min_detection_confidence": self.min_detection_confidence}
+
+# =========================
+# ONNX Runtime
+# =========================
+
+class OnnxPoseBackend(PoseBackend):
+    """
+    COCO-17 keypoint model on ONNX Runtime (CPU).
+
+    The output format is recognized from the model's outputs:
+        - SimCC (RTMPose): two outputs (N, 17, W * k) and (N, 17, H * k)
+        - Heatmaps: one output (N, 17, h, w)
+        - Keypoints (MoveNet): one output (N, 1, 17, 3) or (N, 17, 3) of [y, x, score] in [0, 1]
+    Inputs of shape (N, 3, H, W) are normalized with ONNX_MEAN / ONNX_STD; (N, H, W, 3) inputs get
+    raw 0-255 pixels in the model's input dtype.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path, batch_size=DEFAULT_BATCH_SIZE, threads=None):
+        import onnxruntime as ort
+
+        self.model_path = Path(model_path)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(self.model_path), options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        shape = model_input.shape
+        self.channels_first = shape[1] == 3
+        self.input_h, self.input_w = (shape[2], shape[3]) if self.channels_first else (shape[1], shape[2])
+        self.input_dtype = np.int32 if "int32" in model_input.type else (np.uint8 if "uint8" in model_input.type else np.float32)
+        # Models exported with a fixed batch of 1 are run frame by frame
+        self.batch_size = batch_size if not isinstance(shape[0], int) or shape[0] != 1 else 1
+
+    def _letterbox(self, rgb):
+        """Resize keeping the aspect ratio and pad; returns the image, scale and padding."""
+        h, w = rgb.shape[:2]
+        scale = min(self.input_w / w, self.input_h / h)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (self.input_w - new_w) // 2, (self.input_h - new_h) // 2
+        canvas = np.zeros((self.input_h, self.input_w, 3), dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(rgb, (new_w, new_h), interpolation=cv2.INTER_AREA)
+        return canvas, scale, pad_x, pad_y
+
+    def _decode(self, outputs):
+        """(N, 17, 3) keypoints of [x, y, score] in model input pixels."""
+        if len(outputs) >= 2 and outputs[0].ndim == 3 and outputs[1].ndim == 3:   # SimCC
+            simcc_x, simcc_y = outputs[0], outputs[1]
+            split_x = simcc_x.shape[-1] / self.input_w
+            split_y = simcc_y.shape[-1] / self.input_h
+            x = simcc_x.argmax(-1) / split_x
+            y = simcc_y.argmax(-1) / split_y
+            score = np.minimum(simcc_x.max(-1), simcc_y.max(-1))
+            return np.stack([x, y, score], axis=-1)
+
+        out = outputs[0]
+        if out.ndim == 4 and out.shape[-1] != 3:                                  # Heatmaps
+            n, k, hh, hw = out.shape
+            flat = out.reshape(n, k, -1)
+            idx = flat.argmax(-1)
+            y, x = np.divmod(idx, hw)
+            return np.stack([(x + 0.5) * self.input_w / hw, (y + 0.5) * self.input_h / hh, flat.max(-1)], axis=-1)
+
+        out = out.reshape(out.shape[0], -1, 17, 3)[:, 0]                          # [y, x, score] in [0, 1]
+        return np.stack([out[..., 1] * self.input_w, out[..., 0] * self.input_h, out[..., 2]], axis=-1)
+
+    def _run(self, frames):
+        boxes = [self._letterbox(rgb) for rgb in frames]
+        batch = np.stack([b[0] for b in boxes])
+        if self.channels_first:
+            batch = ((batch.astype(np.float32) - ONNX_MEAN) / ONNX_STD).transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=self.input_dtype)
+        keypoints = self._decode(self.session.run(None, {self.input_name: batch}))
+
+        results = []
+        for rgb, (_, scale, pad_x, pad_y), kp in zip(frames, boxes, keypoints):
+            if kp[:, 2].max() < ONNX_MIN_SCORE:
+                results.append(None)
+                continue
+            h, w = rgb.shape[:2]
+            pts = np.full((N_LANDMARKS, 3), np.nan, dtype=np.float32)
+            pts[COCO_TO_MEDIAPIPE, 0] = (kp[:, 0] - pad_x) / scale / w
+            pts[COCO_TO_MEDIAPIPE, 1] = (kp[:, 1] - pad_y) / scale / h
+            pts[COCO_TO_MEDIAPIPE, 2] = np.clip(kp[:, 2], 0, 1)
+            results.append(pts)
+        return results
+
+    def process_batch(self, frames):
+        results = []
+        for i in range(0, len(frames), self.batch_size):
+            results += self._run(frames[i:i + self.batch_size])
+        return results
+
+    @property
+    def config(self):
+        return {**super().config, "model": self.model_path.name, "input_size": [self.input_w, self.input_h]}
+
+# =========================
+# Factory
+# =========================
+
+def create_backend(name=DEFAULT_BACKEND, **options):
+    """
+    Create a pose backend by name.
+
+    Args:
+        name (str): "mediapipe", "mediapipe_hands" or "onnx".
+        **options: Backend arguments (e.g. model_path and batch_size for onnx).
+
+    Returns:
+        PoseBackend: The backend.
+    """
+    if name == "mediapipe":
+        return MediaPipeBackend(**options)
+    if name == "mediapipe_hands":
+        return MediaPipeHandsBackend(**options)
+    if name == "onnx":
+        if not options.get("model_path"):
+            raise ValueError("The onnx pose backend needs a model (set pose_onnx_model in project_config.yaml)")
+        return OnnxPoseBackend(**options)
+    raise ValueError(f"Unknown pose backend '{name}' (expected 'mediapipe', 'mediapipe_hands' or 'onnx')")
+
+
+def backend_options(cfg, name=None, base_dir=None):
+    """Backend name and options from project_config.yaml (relative model paths are from the project root)."""
+    name = name or cfg.get("pose_backend") or DEFAULT_BACKEND
+    if name != "onnx":
+        return name, {}
+    model_path = cfg.get("pose_onnx_model")
+    if model_path and base_dir is not None and not Path(model_path).is_absolute():
+        model_path = Path(base_dir) / model_path
+    return name, {"model_path": model_path, "batch_size": cfg.get("pose_batch_size") or DEFAULT_BATCH_SIZE}
+
+
+def backend_from_config(cfg, name=None):
+    base_dir = Path(__file__).resolve().parents[1]
+    name, options = backend_options(cfg, name, base_dir)
+    return create_backend(name, **options)
@@ -0,0 +1,462 @@
+"""
+Title: pose_service.py
+
+Description:
+    Long-lived local pose-inference worker. Importing MediaPipe and building its graphs costs
+    seconds per process; the service pays that once and keeps the models warm, so short runs
+    (extract_2d_keypoints.py on one clip, elbow_release_frame.py, live feedback) start inferring
+    immediately.
+
+    The service listens on a Unix socket (a named pipe on Windows) through
+    multiprocessing.connection. Each client connection checks out a warm backend (created on
+    first use, returned to the pool when the client disconnects), so tracking state is never shared
+    between clients. Clients either send RGB frames, or send a clip job (video path under data/ and
+    frame range) that the service decodes itself, so frames never cross the socket.
+
+    Security: every service run generates a random authkey and writes it to a 0600 file in a
+    per-user 0700 runtime directory, which also holds the 0600 socket; only the same user can read
+    the key and pass the connection handshake. Messages are a JSON header plus raw array bytes
+    (never pickle), so a client can send frames and parameters but not code.
+
+    ServiceBackend is a PoseBackend (utils/pose_backends.py), so any stage can use the service in
+    place of a local model; connect_backend() falls back to a local backend when no service runs.
+
+Inputs:
+    - pose_backend / pose_onnx_model / pose_batch_size from project_config.yaml (default backend)
+    - pose_service_address from project_config.yaml (optional)
+
+Usage:
+    - Start the service (keep it running in a terminal):
+        python utils/pose_service.py
+    - In a stage:
+        backend = connect_backend(cfg)      # service if running, else a local backend
+        pts = backend.process(rgb)
+
+Outputs:
+    - <runtime dir>/pose_service.sock and pose_service.key while the service runs
+      ($XDG_RUNTIME_DIR or the temp directory on POSIX, %LOCALAPPDATA%\\freethrow on Windows)
+"""
+
+import os
+import sys
+import json
+import stat
+import secrets
+import tempfile
+import threading
+import numpy as np
+from multiprocessing.connection import AuthenticationError, Listener, Client
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.pose_backends import N_LANDMARKS, PoseBackend, backend_options, create_backend
+
+# =========================
+# Constants
+# =========================
+
+KEY_BYTES = 32
+MAX_HEADER_BYTES = 1 << 20          # JSON header of one message
+MAX_ARRAY_BYTES = 256 << 20         # One frame batch or result array
+ARRAY_DTYPES = {"|u1", "<f4"}       # uint8 frames, float32 keypoints
+CLIP_SUFFIXES = {".avi", ".mp4", ".mov", ".mkv"}
+
+# =========================
+# Address and Key
+# =========================
+
+def runtime_dir():
+    """
+    Per-user directory (mode 0700 on POSIX) holding the service socket and its key.
+
+    Raises:
+        PermissionError: If the directory exists but is owned by another user or open to others.
+    """
+    if sys.platform == "win32":
+        path = Path(os.environ.get("LOCALAPPDATA", tempfile.gettempdir())) / "freethrow"  # Per-user profile ACL
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    path = Path(base) / f"freethrow_pose_service_{os.getuid()}"
+    path.mkdir(mode=0o700, exist_ok=True)
+    info = path.lstat()
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by you with mode 0700")
+    return path
+
+
+def key_path():
+    return runtime_dir() / "pose_service.key"
+
+
+def default_address():
+    """Unix socket in the runtime directory (named pipe on Windows)."""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\freethrow_pose_service_{os.environ.get('USERNAME', 'user')}"
+    return str(runtime_dir() / "pose_service.sock")
+
+
+def service_address(cfg=None):
+    return (cfg or {}).get("pose_service_address") or default_address()
+
+
+def _family(address):
+    return "AF_PIPE" if address.startswith("\\\\") else "AF_UNIX"
+
+
+def write_key():
+    """Generate a fresh random authkey for this service run, readable only by the user."""
+    key = secrets.token_bytes(KEY_BYTES)
+    path = key_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    os.replace(tmp, path)
+    return key
+
+
+def read_key():
+    """Authkey of the running service, or None if no service has written one."""
+    try:
+        return key_path().read_bytes()
+    except (OSError, PermissionError):
+        return None
+
+# =========================
+# Messages
+# =========================
+# A message is a JSON header followed by the raw bytes of the arrays it lists. Nothing is
+# unpickled, so a client can only send data, never code.
+
+def send_message(conn, header, arrays=()):
+    arrays = [np.ascontiguousarray(a) for a in arrays]
+    specs = [{"shape": list(a.shape), "dtype": a.dtype.str} for a in arrays]
+    conn.send_bytes(json.dumps({**header, "arrays": specs}, default=str).encode())
+    for a in arrays:
+        conn.send_bytes(a.reshape(-1).view(np.uint8))  # Flat bytes; send_bytes sizes by the first dimension
+
+
+def recv_message(conn):
+    """
+    Receive one message.
+
+    Returns:
+        tuple[dict, list[np.ndarray]]: Header and arrays.
+
+    Raises:
+        ValueError: If the message is malformed or an array is not an allowed dtype/size.
+    """
+    header = json.loads(conn.recv_bytes(MAX_HEADER_BYTES))
+    if not isinstance(header, dict):
+        raise ValueError("Message header must be a JSON object")
+    specs = header.pop("arrays", [])
+    if not isinstance(specs, list):
+        raise ValueError("Message arrays must be a JSON list")
+    arrays = []
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise ValueError(f"Unsupported array {spec!r}")
+        dtype, shape = spec.get("dtype"), spec.get("shape")
+        if (not isinstance(dtype, str) or dtype not in ARRAY_DTYPES or not isinstance(shape, list)
+                or not all(type(n) is int and n >= 0 for n in shape)):
+            raise ValueError(f"Unsupported array {spec}")
+        data = conn.recv_bytes(MAX_ARRAY_BYTES)
+        if len(data) != int(np.prod(shape)) * np.dtype(dtype).itemsize:
+            raise ValueError(f"Array data does not match {spec}")
+        arrays.append(np.frombuffer(data, dtype=dtype).reshape(shape))
+    return header, arrays
+
+
+def _stack(results, n_landmarks=N_LANDMARKS):
+    """Backend results (array or None per frame) as one (frames, landmarks, 3) float32 array with NaN."""
+    empty = np.full((n_landmarks, 3), np.nan, dtype=np.float32)
+    return np.stack([empty if pts is None else pts for pts in results]).astype(np.float32) if results else np.empty((0, n_landmarks, 3), np.float32)
+
+
+def _unstack(array):
+    """Inverse of _stack: None for frames without a pose."""
+    return [None if np.isnan(pts).all() else pts for pts in array]
+
+# =========================
+# Server
+# =========================
+
+class PoseService:
+    """Pool of warm backends keyed by backend spec, shared by client connections."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.base_dir = Path(__file__).resolve().parents[1]
+        self.data_dir = self.base_dir / "data"   # Clip jobs may only read videos under here
+        self.idle = {}          # spec key -> list of idle backends
+        self.lock = threading.Lock()
+
+    def _spec(self, spec):
+        """Full (name, options) of a client spec; missing fields come from project_config.yaml."""
+        name, options = backend_options(self.cfg, spec.get("name"), self.base_dir)
+        options.update(spec.get("options") or {})
+        return name, options
+
+    def checkout(self, spec):
+        name, options = self._spec(spec)
+        key = json.dumps([name, options], sort_keys=True, default=str)
+        with self.lock:
+            pool = self.idle.setdefault(key, [])
+            backend = pool.pop() if pool else None
+        if backend is None:
+            backend = create_backend(name, **options)
+            print(f"[INFO] Loaded {name} backend {backend.config}")
+        return key, backend
+
+    def checkin(self, key, backend):
+        backend.reset()
+        with self.lock:
+            self.idle[key].append(backend)
+
+    def clip_path(self, path):
+        """Resolve a client's clip path, refusing anything that is not a video under data/."""
+        path = Path(path).resolve()
+        if not path.is_relative_to(self.data_dir.resolve()) or path.suffix.lower() not in CLIP_SUFFIXES:
+            raise PermissionError(f"Clip jobs are limited to videos under {self.data_dir}")
+        return path
+
+    def extract_clip(self, backend, source, start=0, stop=None, workers=None):
+        """Run a backend over a clip (frames decoded here). Returns (frames, landmarks, 3) float32 with NaN."""
+        import cv2
+        from utils.video_views import open_side
+
+        path, half = source
+        results = []
+        with open_side((self.clip_path(path), half)) as view:
+            batch = []
+            for frame in view.iter_frames(start, stop, workers=workers):
+                batch.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                if len(batch) == backend.batch_size:
+                    results += backend.process_batch(batch)
+                    batch = []
+            if batch:
+                results += backend.process_batch(batch)
+        return _stack(results, backend.n_landmarks)
+
+    def handle(self, conn):
+        """Serve one client until it disconnects."""
+        key = backend = None
+        try:
+            header, _ = recv_message(conn)
+            if header.get("op") != "open":
+                send_message(conn, {"status": "error", "error": "first message must open a backend"})
+                return
+            try:
+                spec = header.get("spec") or {}
+                if not isinstance(spec, dict) or not isinstance(spec.get("options") or {}, dict):
+                    raise ValueError(f"Malformed backend spec {spec!r}")
+                key, backend = self.checkout(spec)
+            except (ImportError, ValueError, RuntimeError, TypeError) as e:  # TypeError: unknown backend options
+                send_message(conn, {"status": "error", "error": str(e)})
+                return
+            send_message(conn, {"status": "ok", "config": backend.config, "batch_size": backend.batch_size,
+                                "tracking": backend.tracking, "n_landmarks": backend.n_landmarks})
+
+            while True:
+                header, arrays = recv_message(conn)
+                op = header.get("op")
+                if op == "close":
+                    break
+                try:
+                    if op == "process":
+                        result = [_stack(backend.process_batch(list(arrays)), backend.n_landmarks)]
+                    elif op == "clip":
+                        source = (header["path"], header.get("half"))
+                        result = [self.extract_clip(backend, source, int(header.get("start", 0)),
+                                                    header.get("stop"), header.get("workers"))]
+                    elif op == "reset":
+                        backend.reset()
+                        result = []
+                    elif op == "reset_tracking":
+                        backend.reset_tracking()
+                        result = []
+                    else:
+                        raise ValueError(f"Unknown request '{op}'")
+                except Exception as e:
+                    send_message(conn, {"status": "error", "error": f"{type(e).__name__}: {e}"})
+                    continue
+                send_message(conn, {"status": "ok"}, result)
+        except (EOFError, ConnectionError):
+            pass  # Client went away
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Dropped client after a malformed message: {e}")
+        finally:
+            conn.close()
+            if backend is not None:
+                self.checkin(key, backend)
+
+    def preload(self):
+        """Load the configured backend before the first client connects."""
+        key, backend = self.checkout({})
+        self.checkin(key, backend)
+
+    def serve_forever(self, address):
+        family = _family(address)
+        if family == "AF_UNIX" and Path(address).exists():
+            old_key = read_key()
+            try:
+                if old_key is None:
+                    raise OSError("no key")
+                Client(address, family=family, authkey=old_key).close()
+            except (OSError, EOFError, AuthenticationError):
+                Path(address).unlink()  # Stale socket from a previous run
+            else:
+                raise RuntimeError(f"A pose service is already listening on {address}")
+
+        authkey = write_key()  # Fresh per run; clients read it from the user-only runtime directory
+        with Listener(address, family=family, authkey=authkey) as listener:
+            if family == "AF_UNIX":
+                os.chmod(address, 0o600)
+            print(f"✅ Pose service listening on {address}")
+            try:
+                while True:
+                    try:
+                        conn = listener.accept()
+                    except (OSError, EOFError, AuthenticationError) as e:   # Failed handshake; keep serving
+                        print(f"[WARNING] Rejected connection: {e}")
+                        continue
+                    threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+            finally:
+                key_path().unlink(missing_ok=True)  # The listener removes its own socket on close
+
+# =========================
+# Client
+# =========================
+
+def service_available(address):
+    """True if a service has published its key (and, for a Unix socket, the socket exists)."""
+    if read_key() is None:
+        return False
+    if _family(address) == "AF_UNIX":
+        return Path(address).exists()
+    return True
+
+
+class ServiceBackend(PoseBackend):
+    """A PoseBackend whose model runs in the pose service."""
+
+    name = "service"
+
+    def __init__(self, address=None, spec=None):
+        self.address = address or default_address()
+        self.spec = dict(spec or {})
+        authkey = read_key()
+        if authkey is None:
+            raise ConnectionError("No pose service key found")
+        self.conn = Client(self.address, family=_family(self.address), authkey=authkey)
+        info = self._call("open", spec=self.spec)
+        self.remote_config = info["config"]
+        self.batch_size = info["batch_size"]
+        self.tracking = info["tracking"]
+        self.n_landmarks = info["n_landmarks"]
+
+    def _call(self, op, arrays=(), **fields):
+        """Send a request; returns the reply header, with its arrays under "arrays"."""
+        send_message(self.conn, {"op": op, **fields}, arrays)
+        header, reply_arrays = recv_message(self.conn)
+        if header.get("status") != "ok":
+            raise RuntimeError(f"Pose service: {header.get('error')}")
+        return {**header, "arrays": reply_arrays}
+
+    def process(self, rgb):
+        return self.process_batch([rgb])[0]
+
+    def process_batch(self, frames):
+        frames = [np.asarray(frame, dtype=np.uint8) for frame in frames]
+        return _unstack(self._call("process", frames)["arrays"][0])
+
+    def extract_clip(self, source, start=0, stop=None, workers=None):
+        """
+        Keypoints of a clip decoded by the service.
+
+        Args:
+            source (tuple): (path, half) as yielded by utils.video_views.stereo_clips().
+            start (int): First frame.
+            stop (int | None): Stop before this frame.
+            workers (int | None): Decode threads in the service.
+
+        Returns:
+            np.ndarray: (frames, landmarks, 3) float32 as from process(), NaN where nothing was found.
+        """
+        path, half = source
+        reply = self._call("clip", path=str(Path(path).resolve()), half=half, start=start, stop=stop, workers=workers)
+        return reply["arrays"][0]
+
+    def detector(self):
+        if self.spec.get("options", {}).get("static_image_mode") or not self.tracking:
+            return self
+        return ServiceBackend(self.address, {**self.spec, "options": {**self.spec.get("options", {}), "static_image_mode": True}})
+
+    def reset(self):
+        self._call("reset")
+
+    def reset_tracking(self):
+        self._call("reset_tracking")
+
+    def close(self):
+        try:
+            send_message(self.conn, {"op": "close"})
+        except (OSError, EOFError):
+            pass
+        self.conn.close()
+
+    @property
+    def config(self):
+        return {**self.remote_config, "service": True}
+
+
+def connect_backend(cfg, spec=None, use_service=None):
+    """
+    Pose backend for a stage: the warm service when it is running, else a local backend.
+
+    Args:
+        cfg (dict): Parsed project_config.yaml.
+        spec (dict | None): {"name": ..., "options": {...}} overriding the configured backend.
+        use_service (bool | None): Try the service (default: pose_service in the config, True if unset).
+
+    Returns:
+        PoseBackend: ServiceBackend or a local backend.
+    """
+    spec = spec or {}
+    if use_service is None:
+        use_service = cfg.get("pose_service", True)
+    address = service_address(cfg)
+    if use_service and service_available(address):
+        try:
+            return ServiceBackend(address, spec)
+        except (OSError, EOFError, RuntimeError, ValueError) as e:
+            print(f"[WARNING] Pose service unavailable ({e}); loading the model locally")
+
+    name, options = backend_options(cfg, spec.get("name"), Path(__file__).resolve().parents[1])
+    options.update(spec.get("options") or {})
+    return create_backend(name, **options)
+
+# =========================
+# Main
+# =========================
+
+if __name__ == "__main__":
+    import signal
+    import yaml
+
+    config_path = Path(__file__).resolve().parents[1] / "project_config.yaml"
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    service = PoseService(cfg)
+    service.preload()
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # Remove the key and socket on kill too
+    try:
+        service.serve_forever(service_address(cfg))
+    except KeyboardInterrupt:
+        print("\n[INFO] Pose service stopped")
+    except RuntimeError as e:
+        sys.exit(f"❌ {e}")
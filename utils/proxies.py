@@ -0,0 +1,224 @@
+"""
+Title: proxies.py
+
+Description:
+    Builds small proxy videos and thumbnail filmstrips for recorded clips so the GUI tools
+    (trim_freethrows.py, play_avi_videos.py) can scrub without decoding full-resolution originals.
+    Proxies keep every frame of the original, so proxy frame N is original frame N; the GUIs
+    only go back to the original for the exact frame being marked.
+
+Inputs:
+    - Recorded AVI clips (e.g. videos/player_tracking/raw/left/freethrow1.avi)
+
+Usage:
+    - record_freethrows.py submits each finished recording with start_background_job()
+    - Run directly to (re)build previews for every raw clip in the session:
+        python utils/proxies.py
+
+Outputs:
+    - <clip dir>/proxy/<clip>.avi              (MJPG proxy, same frame count and FPS)
+    - <clip dir>/proxy/<clip>_filmstrip.jpg    (evenly spaced thumbnails with frame numbers)
+    - <clip dir>/proxy/<clip>_motion.npy       (motion-energy curve, see utils/motion_energy.py)
+"""
+
+import os
+import sys
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.avi_reader import open_reader, scale_for_width
+from utils.motion_energy import motion_path, build_motion_energy
+
+# =========================
+# Constants
+# =========================
+
+PROXY_DIRNAME = "proxy"
+PROXY_WIDTH = 320           # Proxies are decoded at the largest 1/2^k scale at least this wide
+FILMSTRIP_THUMBS = 12       # Thumbnails per filmstrip
+FILMSTRIP_HEIGHT = 90       # Thumbnail height in pixels
+
+# =========================
+# Paths
+# =========================
+
+def proxy_path(video_path):
+    video_path = Path(video_path)
+    return video_path.parent / PROXY_DIRNAME / f"{video_path.stem}.avi"  # Also for archived .mkv clips
+
+
+def filmstrip_path(video_path):
+    video_path = Path(video_path)
+    return video_path.parent / PROXY_DIRNAME / f"{video_path.stem}_filmstrip.jpg"
+
+
+def filmstrip_indices(frame_count, n_thumbs=FILMSTRIP_THUMBS):
+    """Frame index shown by each filmstrip thumbnail (evenly spaced over the clip)."""
+    n_thumbs = max(1, min(n_thumbs, frame_count))
+    return np.linspace(0, frame_count - 1, n_thumbs).round().astype(int)
+
+
+def is_up_to_date(output_path, video_path):
+    output_path = Path(output_path)
+    return output_path.exists() and output_path.stat().st_mtime >= Path(video_path).stat().st_mtime
+
+
+def open_proxy(video_path):
+    """
+    Open the proxy for a clip if one exists and matches the original's frame count.
+
+    Args:
+        video_path (str | Path): Path to the original clip.
+
+    Returns:
+        AviReader | CaptureReader | None: Proxy reader, or None if no usable proxy exists.
+    """
+    path = proxy_path(video_path)
+    if not is_up_to_date(path, video_path):
+        return None
+    try:
+        proxy = open_reader(path)
+        with open_reader(video_path) as original:
+            if len(proxy) == len(original):
+                return proxy
+        proxy.close()
+    except (ValueError, OSError):
+        pass
+    return None
+
+# =========================
+# Builders
+# =========================
+
+def build_proxy(video_path, target_width=PROXY_WIDTH, workers=None):
+    """
+    Write a reduced-resolution MJPG copy of a clip with identical frame numbering.
+
+    Args:
+        video_path (str | Path): Path to the original clip.
+        target_width (int): Minimum proxy width; the proxy uses the DCT-domain scale closest above it.
+        workers (int | None): Decode threads.
+
+    Returns:
+        Path: Path to the proxy video.
+    """
+    output_path = proxy_path(video_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f"{output_path.stem}.tmp.avi")  # GUIs never see a partial proxy
+
+    with open_reader(video_path) as reader:
+        scale = scale_for_width(reader.width, target_width)
+        size = (-(-reader.width // scale), -(-reader.height // scale))
+        fps = reader.fps if reader.fps > 0 else 30
+        out = cv2.VideoWriter(str(tmp_path), cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+        for frame in reader.iter_frames(workers=workers, scale=scale):
+            out.write(frame)
+        out.release()
+
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def build_filmstrip(video_path, n_thumbs=FILMSTRIP_THUMBS, thumb_height=FILMSTRIP_HEIGHT):
+    """
+    Save a single JPEG strip of evenly spaced thumbnails, each labelled with its frame number.
+
+    Args:
+        video_path (str | Path): Path to the original clip.
+        n_thumbs (int): Number of thumbnails.
+        thumb_height (int): Height of each thumbnail in pixels.
+
+    Returns:
+        Path: Path to the filmstrip image.
+    """
+    output_path = filmstrip_path(video_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open_reader(video_path) as reader:
+        scale = scale_for_width(reader.height, thumb_height)  # Smallest decode still taller than a thumbnail
+        thumbs = []
+        for idx in filmstrip_indices(len(reader), n_thumbs):
+            frame = reader.read(int(idx), scale=scale)
+            h, w = frame.shape[:2]
+            thumb = cv2.resize(frame, (max(1, round(w * thumb_height / h)), thumb_height), interpolation=cv2.INTER_AREA)
+            cv2.putText(thumb, str(idx), (4, thumb_height - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+            thumbs.append(thumb)
+
+    cv2.imwrite(str(output_path), np.hstack(thumbs))
+    return output_path
+
+
+def build_previews(video_path, force=False):
+    """Build the proxy, filmstrip and motion curve for one clip, skipping outputs newer than the clip."""
+    video_path = Path(video_path)
+    if force or not is_up_to_date(proxy_path(video_path), video_path):
+        build_proxy(video_path)
+    if force or not is_up_to_date(filmstrip_path(video_path), video_path):
+        build_filmstrip(video_path)
+    if force or not is_up_to_date(motion_path(video_path), video_path):
+        build_motion_energy(video_path)
+    print(f"[INFO] Previews ready: {video_path.name}")
+    return video_path
+
+# =========================
+# Background Job
+# =========================
+
+_pool = None
+
+
+def _lower_priority():
+    if hasattr(os, "nice"):
+        os.nice(10)  # Stay out of the way of live capture threads
+
+
+def start_background_job(video_paths):
+    """
+    Build previews for finished recordings in a background process.
+
+    The single worker process runs at low priority so live capture is not starved.
+
+    Args:
+        video_paths (list[Path]): Clips that just finished recording.
+
+    Returns:
+        list[Future]: One future per clip.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=1, initializer=_lower_priority)
+    return [_pool.submit(build_previews, path) for path in video_paths]
+
+
+def wait_for_background_jobs():
+    """Block until every submitted preview job has finished."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+# =========================
+# Main
+# =========================
+
+if __name__ == "__main__":
+    import yaml
+    from utils.archive_session import list_clips
+
+    config_path = Path(__file__).resolve().parents[1] / "project_config.yaml"
+    with open(config_path, "r") as f:
+        cfg = yaml.safe_load(f)
+
+    session_dir = Path(__file__).resolve().parents[1] / "data" / cfg["athlete"] / cfg["session"]
+    raw_dirs = [
+        session_dir / "videos" / "player_tracking" / "raw" / "left",
+        session_dir / "videos" / "player_tracking" / "raw" / "right",
+        session_dir / "videos" / "ball_tracking" / "raw",
+    ]
+
+    for raw_dir in raw_dirs:
+        for video_path in list_clips(raw_dir):
+            build_previews(video_path)
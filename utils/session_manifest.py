@@ -0,0 +1,100 @@
+"""
+Title: session_manifest.py
+
+Description:
+    Per-session clip manifest (metrics/session_manifest.csv): one row per clip recording whether it
+    is usable and why not. check_clip_quality.py fills it from a fast sparse-sample pose pass; later
+    stages (2D/3D keypoints, visualization) skip clips marked unusable instead of running full
+    extraction on clips where the athlete is lost.
+
+    A clip missing from the manifest counts as usable, so stages behave as before until the quality
+    pass has run. Set usable back to True in the CSV to force a clip through.
+
+Inputs:
+    - metrics/session_manifest.csv (optional)
+
+Usage:
+    skip = unusable_clips(session_dir)
+    jobs = [stem for stem in stems if stem not in skip]
+    report_skipped(session_dir, skipped, "2D keypoint extraction", estimate_saved=True)
+
+Outputs:
+    - metrics/session_manifest.csv with columns:
+        clip, usable, reason, detection_rate, mean_visibility, sampled_frames, frames, check_s, est_extract_s
+"""
+
+import pandas as pd
+from pathlib import Path
+
+# =========================
+# Paths
+# =========================
+
+def manifest_path(session_dir):
+    return Path(session_dir) / "metrics" / "session_manifest.csv"
+
+# =========================
+# Read / Write
+# =========================
+
+def load_manifest(session_dir):
+    """
+    Load the session manifest.
+
+    Returns:
+        pd.DataFrame | None: One row per clip, or None if the quality pass has not run.
+    """
+    path = manifest_path(session_dir)
+    return pd.read_csv(path) if path.exists() else None
+
+
+def update_manifest(session_dir, rows):
+    """
+    Insert or replace manifest rows by clip name.
+
+    Args:
+        session_dir (Path): Session directory.
+        rows (list[dict]): Rows with at least "clip" and "usable".
+
+    Returns:
+        pd.DataFrame: The updated manifest (also written to disk).
+    """
+    new = pd.DataFrame(rows)
+    old = load_manifest(session_dir)
+    if old is not None and len(new):
+        new = pd.concat([old[~old["clip"].isin(new["clip"])], new], ignore_index=True)
+    elif old is not None:
+        new = old
+    new = new.sort_values("clip").reset_index(drop=True)
+    path = manifest_path(session_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new.to_csv(path, index=False)
+    return new
+
+# =========================
+# Queries
+# =========================
+
+def unusable_clips(session_dir):
+    """Set of clip stems marked unusable (empty if there is no manifest)."""
+    manifest = load_manifest(session_dir)
+    if manifest is None:
+        return set()
+    return set(manifest.loc[~manifest["usable"].astype(bool), "clip"])
+
+
+def is_usable(session_dir, clip):
+    return clip not in unusable_clips(session_dir)
+
+
+def report_skipped(session_dir, clips, stage, estimate_saved=False):
+    """Print the clips a stage skips and, for pose extraction, the time the manifest estimates was saved."""
+    clips = sorted(clips)
+    if not clips:
+        return
+    print(f"[INFO] Skipping {len(clips)} unusable clips in {stage}: {', '.join(clips)}")
+    manifest = load_manifest(session_dir)
+    rows = manifest[manifest["clip"].isin(clips)]
+    saved = rows["est_extract_s"].sum() if "est_extract_s" in rows else 0
+    if estimate_saved and saved > 0:
+        print(f"[INFO] Estimated pose extraction time saved: {saved:.0f}s")
@@ -0,0 +1,229 @@
+"""
+Title: stereo.py
+
+Description:
+    Stereo geometry shared by the 3D stages: loading the calibration written by
+    calibrate_stereo.py, batched undistortion of 2D keypoints, an epipolar consistency filter and
+    a batched linear (DLT) triangulation.
+
+    A left/right detection of the same landmark must lie on each other's epipolar lines. The filter
+    computes the symmetric epipolar distance for every (frame, landmark) pair at once from the
+    fundamental matrix and masks pairs that disagree, so obviously wrong matches (a swapped wrist,
+    a detection on the background) never become 3D points. Every masked pair keeps a reason code.
+
+Inputs:
+    - calibration/stereo_calibration/stereo_calib.npz (K1, dist1, K2, dist2, R, T, F, ...), or the
+      older layout with mtxL, distL, mtxR, distR, R, T
+    - Left/right 2D keypoints in pixels, shape (frames, landmarks, 2), NaN = missing
+
+Usage:
+    calib = load_calibration(calibration_path(session_dir))
+    left_u, right_u = undistort_pixels(left_px, calib["K1"], calib["D1"]), undistort_pixels(...)
+    valid, reason, dist = epipolar_filter(left_u, right_u, calib["F"], left_vis, right_vis)
+    points_3d = triangulate_dlt(left_u, right_u, calib["P1"], calib["P2"], valid)
+
+Outputs:
+    - None
+"""
+
+import cv2
+import numpy as np
+from pathlib import Path
+
+# =========================
+# Constants
+# =========================
+
+EPIPOLAR_MAX_PX = 8.0       # Largest symmetric epipolar distance (pixels) for a consistent pair
+MIN_VISIBILITY = 0.3        # Pairs where either view is less visible than this are masked
+
+# Reason codes of epipolar_filter()
+OK = 0
+MISSING_LEFT = 1
+MISSING_RIGHT = 2
+LOW_VISIBILITY = 3
+EPIPOLAR = 4
+
+REASONS = {
+    OK: "ok",
+    MISSING_LEFT: "missing_left",
+    MISSING_RIGHT: "missing_right",
+    LOW_VISIBILITY: "low_visibility",
+    EPIPOLAR: "epipolar",
+}
+
+# =========================
+# Calibration
+# =========================
+
+def calibration_path(session_dir):
+    """stereo_calib.npz of a session (calibrate_stereo.py layout first, then the older flat layout)."""
+    calib_dir = Path(session_dir) / "calibration"
+    path = calib_dir / "stereo_calibration" / "stereo_calib.npz"
+    return path if path.exists() else calib_dir / "stereo_calib.npz"
+
+
+def fundamental_from(K1, K2, R, T):
+    """F = K2^-T [T]x R K1^-1 for a right camera at x_r = R x_l + T."""
+    tx = np.array([[0, -T[2], T[1]], [T[2], 0, -T[0]], [-T[1], T[0], 0]], dtype=np.float64)
+    F = np.linalg.inv(K2).T @ tx @ R @ np.linalg.inv(K1)
+    return F / F[2, 2] if abs(F[2, 2]) > 1e-12 else F
+
+
+def load_calibration(path):
+    """
+    Load a stereo calibration, accepting both key layouts.
+
+    Args:
+        path (str | Path): stereo_calib.npz.
+
+    Returns:
+        dict: K1, D1, K2, D2, R, T (3,), P1, P2 (3x4, pixels) and F (3x3).
+    """
+    calib = np.load(path)
+    keys = set(calib.files)
+    if {"K1", "dist1", "K2", "dist2"} <= keys:
+        K1, D1, K2, D2 = calib["K1"], calib["dist1"], calib["K2"], calib["dist2"]
+    elif {"mtxL", "distL", "mtxR", "distR"} <= keys:
+        K1, D1, K2, D2 = calib["mtxL"], calib["distL"], calib["mtxR"], calib["distR"]
+    else:
+        raise KeyError(f"{path} has no intrinsics (expected K1/dist1/K2/dist2 or mtxL/distL/mtxR/distR)")
+
+    R = calib["R"].astype(np.float64)
+    T = calib["T"].astype(np.float64).reshape(3)
+    K1, K2 = K1.astype(np.float64), K2.astype(np.float64)
+    return {
+        "K1": K1, "D1": D1.astype(np.float64), "K2": K2, "D2": D2.astype(np.float64), "R": R, "T": T,
+        "P1": K1 @ np.hstack((np.eye(3), np.zeros((3, 1)))),
+        "P2": K2 @ np.hstack((R, T.reshape(3, 1))),
+        "F": calib["F"].astype(np.float64) if "F" in keys else fundamental_from(K1, K2, R, T),
+    }
+
+# =========================
+# Undistortion
+# =========================
+
+def undistort_pixels(points, K, D):
+    """
+    Undistort pixel coordinates of any shape (..., 2) in one cv2 call; NaN points stay NaN.
+
+    Returns:
+        np.ndarray: Undistorted pixel coordinates (same camera matrix K), float64.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    flat = points.reshape(-1, 2)
+    out = np.full_like(flat, np.nan)
+    valid = ~np.isnan(flat).any(axis=1)
+    if valid.any():
+        out[valid] = cv2.undistortPoints(flat[valid].reshape(-1, 1, 2), K, D, P=K).reshape(-1, 2)
+    return out.reshape(points.shape)
+
+# =========================
+# Epipolar Filter
+# =========================
+
+def epipolar_distance(left, right, F):
+    """
+    Symmetric epipolar distance (pixels) for every left/right point pair.
+
+    Args:
+        left (np.ndarray): (..., 2) undistorted left pixel coordinates.
+        right (np.ndarray): (..., 2) undistorted right pixel coordinates (same shape).
+        F (np.ndarray): 3x3 fundamental matrix with x_r^T F x_l = 0.
+
+    Returns:
+        np.ndarray: (...) the larger of the two point-to-epipolar-line distances; NaN if a point is missing.
+    """
+    xl = np.concatenate([left, np.ones(left.shape[:-1] + (1,))], axis=-1)
+    xr = np.concatenate([right, np.ones(right.shape[:-1] + (1,))], axis=-1)
+    line_r = xl @ F.T           # Epipolar lines in the right image: F x_l
+    line_l = xr @ F             # Epipolar lines in the left image: F^T x_r
+    algebraic = np.abs((xr * line_r).sum(axis=-1))
+    d_right = algebraic / np.hypot(line_r[..., 0], line_r[..., 1])
+    d_left = algebraic / np.hypot(line_l[..., 0], line_l[..., 1])
+    return np.maximum(d_left, d_right)
+
+
+def epipolar_filter(left, right, F, left_vis=None, right_vis=None,
+                    max_px=EPIPOLAR_MAX_PX, min_visibility=MIN_VISIBILITY):
+    """
+    Mask left/right keypoint pairs that cannot be the same 3D point.
+
+    Args:
+        left (np.ndarray): (frames, landmarks, 2) undistorted left pixels (NaN = missing).
+        right (np.ndarray): (frames, landmarks, 2) undistorted right pixels.
+        F (np.ndarray): Fundamental matrix.
+        left_vis (np.ndarray | None): (frames, landmarks) left visibility.
+        right_vis (np.ndarray | None): (frames, landmarks) right visibility.
+        max_px (float): Largest accepted symmetric epipolar distance in pixels.
+        min_visibility (float): Smallest accepted visibility in either view.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (valid bool, reason uint8 (see REASONS),
+            epipolar distance float) arrays of shape (frames, landmarks).
+    """
+    dist = epipolar_distance(left, right, F)
+    reason = np.full(dist.shape, OK, dtype=np.uint8)
+
+    # Later checks only apply where earlier ones passed, so each pair keeps its first failure
+    reason[np.isnan(left).any(axis=-1)] = MISSING_LEFT
+    reason[(reason == OK) & np.isnan(right).any(axis=-1)] = MISSING_RIGHT
+    if left_vis is not None and right_vis is not None:
+        with np.errstate(invalid="ignore"):
+            low = (left_vis < min_visibility) | (right_vis < min_visibility)
+        reason[(reason == OK) & low] = LOW_VISIBILITY
+    with np.errstate(invalid="ignore"):
+        reason[(reason == OK) & (dist > max_px)] = EPIPOLAR
+    return reason == OK, reason, dist
+
+
+def reason_counts(reason):
+    """{reason name: count} of a reason-code array."""
+    codes, counts = np.unique(reason, return_counts=True)
+    return {REASONS[int(c)]: int(n) for c, n in zip(codes, counts)}
+
+# =========================
+# Triangulation
+# =========================
+
+def triangulate_dlt(left, right, P1, P2, valid=None):
+    """
+    Linear (DLT) triangulation of every left/right pair at once.
+
+    Each pair gives the 4x4 system A [X, 1] = 0 that cv2.triangulatePoints solves per point. With the
+    homogeneous coordinate fixed to 1 it becomes a 4x3 least-squares problem, so all pairs are solved
+    through their 3x3 normal equations in one batched np.linalg.solve (several times faster than a
+    batched SVD; the same answer up to noise for points in front of the cameras).
+
+    Args:
+        left (np.ndarray): (..., 2) undistorted left pixel coordinates.
+        right (np.ndarray): (..., 2) undistorted right pixel coordinates (same shape).
+        P1 (np.ndarray): 3x4 left projection matrix (pixels).
+        P2 (np.ndarray): 3x4 right projection matrix (pixels).
+        valid (np.ndarray | None): (...) bool mask of pairs to solve (default: pairs without NaN).
+
+    Returns:
+        np.ndarray: (..., 3) points in calibration units; NaN where masked out.
+    """
+    left = np.asarray(left, dtype=np.float64)
+    right = np.asarray(right, dtype=np.float64)
+    ok = ~(np.isnan(left).any(axis=-1) | np.isnan(right).any(axis=-1))
+    if valid is not None:
+        ok &= valid
+    out = np.full(left.shape[:-1] + (3,), np.nan)
+    if not ok.any():
+        return out
+
+    xl, xr = left[ok], right[ok]                                        # (N, 2)
+    A = np.stack([
+        xl[:, :1] * P1[2] - P1[0],
+        xl[:, 1:] * P1[2] - P1[1],
+        xr[:, :1] * P2[2] - P2[0],
+        xr[:, 1:] * P2[2] - P2[1],
+    ], axis=1)                                                          # (N, 4, 4)
+    A /= np.linalg.norm(A, axis=2, keepdims=True)                       # Equal weight per image row
+    M, b = A[..., :3], -A[..., 3]
+    MtM = np.einsum("nki,nkj->nij", M, M)
+    Mtb = np.einsum("nki,nk->ni", M, b)
+    out[ok] = np.linalg.solve(MtM, Mtb[..., None])[..., 0]
+    return out
@@ -0,0 +1,224 @@
+"""
+Title: time_base.py
+
+Description:
+    Shared clock for the three cameras of a clip. The player cameras record at player_tracking_fps
+    (60) and the ball camera at ball_tracking_fps (30), and each clip starts at a slightly different
+    moment on each camera. A TimeBase maps frame indices of any camera to seconds on the reference
+    (left camera) clock and back, so joins between the player and ball pipelines are vectorized
+    np.interp lookups instead of assuming frame N means the same moment everywhere.
+
+Inputs:
+    - metrics/sync_offsets.csv from detect_flashes.py (per-clip camera offsets), optional
+    - <clip>.timing.csv timing maps next to the raw clips from frame_timing.py (true frame times), optional
+    - player_tracking_fps / ball_tracking_fps from project_config.yaml
+
+Usage:
+    tb = load_time_base(session_dir, "freethrow3", cfg)
+    ball_idx = tb.map_frames(release_frame, "left", "ball")       # fractional ball-camera frame
+    ball_xy_at_player = tb.interpolate(ball_xy, "ball", np.arange(n_player), "left")
+
+Outputs:
+    - None
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.frame_timing import load_timing
+
+# =========================
+# Constants
+# =========================
+
+REFERENCE_CAMERA = "left"
+PLAYER_CAMERAS = ("left", "right")
+BALL_CAMERA = "ball"
+
+RAW_VIDEO_DIRS = {
+    "left": Path("videos") / "player_tracking" / "raw" / "left",
+    "right": Path("videos") / "player_tracking" / "raw" / "right",
+    "ball": Path("videos") / "ball_tracking" / "raw",
+}
+
+# =========================
+# Time Base
+# =========================
+
+class TimeBase:
+    """
+    Frame <-> time conversion for every camera of one clip.
+
+    A moment t seconds into the reference clip is at t + offsets[camera] seconds into that
+    camera's clip. Frame n of a camera is at n / fps on its own clock, unless per-frame
+    timestamps (seconds, non-decreasing; repeated frames share their source frame's time) are given.
+    """
+
+    def __init__(self, fps, offsets=None, timestamps=None):
+        """
+        Args:
+            fps (dict[str, float]): Nominal FPS per camera.
+            offsets (dict[str, float] | None): Clock offset per camera in seconds (missing -> 0).
+            timestamps (dict[str, np.ndarray] | None): Per-frame times on a camera's own clock.
+        """
+        self.fps = dict(fps)
+        self.offsets = {camera: 0.0 for camera in self.fps}
+        self.offsets.update({k: float(v) for k, v in (offsets or {}).items() if pd.notna(v)})
+        self.timestamps = {k: np.asarray(v, dtype=np.float64) for k, v in (timestamps or {}).items()}
+
+    @property
+    def cameras(self):
+        return list(self.fps)
+
+    def _check(self, camera):
+        if camera not in self.fps:
+            raise KeyError(f"Unknown camera '{camera}' (have {self.cameras})")
+
+    # -------------------------
+    # Own clock <-> frames
+    # -------------------------
+
+    def _frame_to_local(self, camera, frames):
+        frames = np.asarray(frames, dtype=np.float64)
+        stamps = self.timestamps.get(camera)
+        if stamps is None or len(stamps) < 2:
+            return frames / self.fps[camera]
+        # Linear extrapolation at nominal FPS beyond the recorded frames
+        n = np.arange(len(stamps))
+        t = np.interp(frames, n, stamps)
+        t = np.where(frames < 0, stamps[0] + frames / self.fps[camera], t)
+        return np.where(frames > n[-1], stamps[-1] + (frames - n[-1]) / self.fps[camera], t)
+
+    def _local_to_frame(self, camera, times):
+        times = np.asarray(times, dtype=np.float64)
+        stamps = self.timestamps.get(camera)
+        if stamps is None or len(stamps) < 2:
+            return times * self.fps[camera]
+        n = np.flatnonzero(np.r_[True, np.diff(stamps) > 0])  # A repeated frame maps back to its source
+        stamps = stamps[n]
+        f = np.interp(times, stamps, n)
+        f = np.where(times < stamps[0], (times - stamps[0]) * self.fps[camera], f)
+        return np.where(times > stamps[-1], n[-1] + (times - stamps[-1]) * self.fps[camera], f)
+
+    # -------------------------
+    # Reference clock
+    # -------------------------
+
+    def to_time(self, camera, frames):
+        """Reference-clock seconds of (fractional) frame indices of a camera."""
+        self._check(camera)
+        return self._frame_to_local(camera, frames) - self.offsets[camera]
+
+    def to_frame(self, camera, times):
+        """Fractional frame index of a camera at reference-clock seconds."""
+        self._check(camera)
+        return self._local_to_frame(camera, np.asarray(times, dtype=np.float64) + self.offsets[camera])
+
+    def map_frames(self, frames, src, dst):
+        """
+        Fractional frame index in camera `dst` showing the same moment as `frames` of camera `src`.
+
+        Args:
+            frames (int | array-like): Frame indices of the source camera.
+            src (str): Source camera ("left", "right" or "ball").
+            dst (str): Destination camera.
+
+        Returns:
+            float | np.ndarray: Fractional destination frame indices (scalar in, scalar out).
+        """
+        mapped = self.to_frame(dst, self.to_time(src, frames))
+        return float(mapped) if np.ndim(mapped) == 0 else mapped
+
+    def nearest_frames(self, frames, src, dst, n_frames=None):
+        """Like map_frames, rounded to the nearest existing destination frame."""
+        mapped = np.rint(self.map_frames(frames, src, dst)).astype(int)
+        if n_frames is not None:
+            mapped = np.clip(mapped, 0, n_frames - 1)
+        return int(mapped) if np.ndim(mapped) == 0 else mapped
+
+    def interpolate(self, values, src, frames, dst):
+        """
+        Sample a per-frame series of camera `src` at frames of camera `dst`.
+
+        Args:
+            values (np.ndarray): Shape (N, ...) values, one row per source frame (NaN = missing).
+            src (str): Camera the values were measured on.
+            frames (array-like): Destination camera frame indices to sample at.
+            dst (str): Destination camera.
+
+        Returns:
+            np.ndarray: Shape (len(frames), ...) linearly interpolated values; NaN outside the source clip.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        flat = values.reshape(len(values), -1)
+        pos = np.atleast_1d(self.map_frames(frames, dst, src))
+        src_idx = np.arange(len(values))
+
+        out = np.full((len(pos), flat.shape[1]), np.nan)
+        inside = (pos >= 0) & (pos <= len(values) - 1)
+        for col in range(flat.shape[1]):
+            valid = ~np.isnan(flat[:, col])
+            if valid.sum() >= 2:
+                out[inside, col] = np.interp(pos[inside], src_idx[valid], flat[valid, col], left=np.nan, right=np.nan)
+        return out.reshape((len(pos),) + values.shape[1:])
+
+# =========================
+# Loading
+# =========================
+
+def config_fps(cfg):
+    """Nominal FPS per camera from project_config.yaml."""
+    fps = {camera: cfg["player_tracking_fps"] for camera in PLAYER_CAMERAS}
+    fps[BALL_CAMERA] = cfg["ball_tracking_fps"]
+    return fps
+
+
+def sync_offsets_path(session_dir):
+    return Path(session_dir) / "metrics" / "sync_offsets.csv"
+
+
+def measured_offsets(session_dir, clip):
+    """{camera: offset_s} of a clip from the sync offsets CSV, leaving out cameras whose flash was missed."""
+    path = sync_offsets_path(session_dir)
+    if not path.exists():
+        return {}
+    rows = pd.read_csv(path)
+    rows = rows[(rows["clip"] == clip) & rows["offset_s"].notna()]
+    return dict(zip(rows["camera"], rows["offset_s"].astype(float)))
+
+
+def load_time_base(session_dir, clip, cfg):
+    """
+    Time base for one clip from the sync offsets CSV, falling back to config FPS and zero offsets.
+    Cameras whose raw clip has a timing map use its capture times instead of n / fps.
+
+    Args:
+        session_dir (Path): Session directory (data/<athlete>/<session>).
+        clip (str): Clip stem (e.g. "freethrow3").
+        cfg (dict): Parsed project_config.yaml.
+
+    Returns:
+        TimeBase: Time base for the clip.
+    """
+    fps = config_fps(cfg)
+    offsets = {}
+    path = sync_offsets_path(session_dir)
+    if path.exists():
+        rows = pd.read_csv(path)
+        rows = rows[rows["clip"] == clip]
+        for row in rows.itertuples():
+            if row.fps > 0:
+                fps[row.camera] = row.fps
+            offsets[row.camera] = row.offset_s
+    if not offsets:
+        print(f"[WARNING] No sync offsets for {clip}; assuming all cameras start together")
+
+    timestamps = {}
+    for camera, video_dir in RAW_VIDEO_DIRS.items():
+        timing = load_timing(Path(session_dir) / video_dir / f"{clip}.avi")
+        if timing is not None:
+            timestamps[camera] = timing["capture_time_s"].to_numpy()
+    return TimeBase(fps, offsets, timestamps)
@@ -0,0 +1,388 @@
+"""
+Title: video_views.py
+
+Description:
+    Lazy, composable views over video files. Operations that only move pixels around
+    (crop, side-by-side stacking, splitting a stereo frame, dropping frames, cutting a time range)
+    are recorded on the view and applied when a frame is read, so no intermediate video is written.
+    For example, the left/right player feeds can be read as a stereo pair straight from the raw
+    recordings instead of from the hstacked copy written by combine_player_feeds.py.
+
+Inputs:
+    - Video clips readable by utils/frame_cache.py / utils/avi_reader.py
+
+Usage:
+    left, right = open_view(raw_left), open_view(raw_right)
+    stereo = left.hstack(right)                 # 1280x640, never written to disk
+    l, r = stereo.split()                       # back to two 640x640 views
+    clip = l.time_range(120, 300).decimate(2)   # frames 120..299 at half the FPS
+    for frame in clip.iter_frames():
+        ...
+
+Outputs:
+    - None (views are read-only)
+"""
+
+import sys
+import numpy as np
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))  # project root, for utils/
+from utils.frame_cache import open_frames
+from utils.archive_session import list_clips, resolve_clip
+
+# =========================
+# Base View
+# =========================
+
+class VideoView(ABC):
+    """
+    A sequence of frames with fps, width and height.
+
+    Subclasses implement __len__, read(n) and the fps/width/height properties (a subclass missing
+    one fails when constructed); iter_frames can be overridden to stream from the parent instead of
+    reading frame by frame.
+    """
+
+    @abstractmethod
+    def __len__(self):
+        ...
+
+    @abstractmethod
+    def read(self, n):
+        ...
+
+    @property
+    @abstractmethod
+    def fps(self):
+        ...
+
+    @property
+    @abstractmethod
+    def width(self):
+        ...
+
+    @property
+    @abstractmethod
+    def height(self):
+        ...
+
+    def __getitem__(self, n):
+        return self.read(n)
+
+    def _normalize(self, n):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(f"Frame {n} out of range ({len(self)} frames)")
+        return n
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        for n in range(start, stop, step):
+            yield self.read(n)
+
+    # -------------------------
+    # Composition
+    # -------------------------
+
+    def crop(self, x, y, width, height):
+        return CropView(self, x, y, width, height)
+
+    def hstack(self, *others):
+        return HStackView([self, *others])
+
+    def split(self):
+        """Split a side-by-side stereo view into (left, right) halves."""
+        mid = self.width // 2
+        return self.crop(0, 0, mid, self.height), self.crop(mid, 0, self.width - mid, self.height)
+
+    def decimate(self, factor):
+        return DecimateView(self, factor)
+
+    def time_range(self, start, stop=None):
+        return RangeView(self, start, stop)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# =========================
+# Views
+# =========================
+
+class SourceView(VideoView):
+    """View of a whole video, read through the frame cache or the indexed reader."""
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return len(self.reader)
+
+    @property
+    def fps(self):
+        return self.reader.fps
+
+    @property
+    def width(self):
+        return self.reader.width
+
+    @property
+    def height(self):
+        return self.reader.height
+
+    def read(self, n):
+        return self.reader.read(n)
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None):
+        return self.reader.iter_frames(start, stop, step, workers=workers)
+
+    def close(self):
+        self.reader.close()
+
+
+class CropView(VideoView):
+    """Rectangular region of every frame (a zero-copy numpy slice)."""
+
+    def __init__(self, parent, x, y, width, height):
+        if x < 0 or y < 0 or x + width > parent.width or y + height > parent.height:
+            raise ValueError(f"Crop {width}x{height}+{x}+{y} outside {parent.width}x{parent.height} frame")
+        self.parent = parent
+        self.x, self.y = x, y
+        self._width, self._height = width, height
+
+    def __len__(self):
+        return len(self.parent)
+
+    @property
+    def fps(self):
+        return self.parent.fps
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    def _crop(self, frame):
+        return frame[self.y:self.y + self._height, self.x:self.x + self._width]
+
+    def read(self, n):
+        return self._crop(self.parent.read(n))
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None):
+        for frame in self.parent.iter_frames(start, stop, step, workers=workers):
+            yield self._crop(frame)
+
+    def close(self):
+        self.parent.close()
+
+
+class HStackView(VideoView):
+    """Frames of several views placed side by side (all views must share a height)."""
+
+    def __init__(self, views):
+        heights = {v.height for v in views}
+        if len(heights) != 1:
+            raise ValueError(f"Cannot hstack views with different heights: {sorted(heights)}")
+        self.views = views
+
+    def __len__(self):
+        return min(len(v) for v in self.views)  # Stop at the shortest feed, like the combining loop did
+
+    @property
+    def fps(self):
+        return self.views[0].fps
+
+    @property
+    def width(self):
+        return sum(v.width for v in self.views)
+
+    @property
+    def height(self):
+        return self.views[0].height
+
+    def read(self, n):
+        n = self._normalize(n)
+        return np.hstack([v.read(n) for v in self.views])
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        streams = [v.iter_frames(start, stop, step, workers=workers) for v in self.views]
+        for frames in zip(*streams):
+            yield np.hstack(frames)
+
+    def split(self):
+        if len(self.views) == 2:
+            n = len(self)
+            return tuple(v.time_range(0, n) for v in self.views)  # Skip the stack/unstack round trip
+        return super().split()
+
+    def close(self):
+        for v in self.views:
+            v.close()
+
+
+class DecimateView(VideoView):
+    """Every `factor`-th frame of the parent, at parent FPS / factor."""
+
+    def __init__(self, parent, factor):
+        if factor < 1:
+            raise ValueError("Decimation factor must be >= 1")
+        self.parent = parent
+        self.factor = int(factor)
+
+    def __len__(self):
+        return -(-len(self.parent) // self.factor)
+
+    @property
+    def fps(self):
+        return self.parent.fps / self.factor
+
+    @property
+    def width(self):
+        return self.parent.width
+
+    @property
+    def height(self):
+        return self.parent.height
+
+    def read(self, n):
+        return self.parent.read(self._normalize(n) * self.factor)
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        return self.parent.iter_frames(start * self.factor, stop * self.factor, step * self.factor, workers=workers)
+
+    def close(self):
+        self.parent.close()
+
+
+class RangeView(VideoView):
+    """Frames [start, stop) of the parent, renumbered from 0."""
+
+    def __init__(self, parent, start, stop=None):
+        n = len(parent)
+        stop = n if stop is None else min(stop, n)
+        if not 0 <= start <= stop:
+            raise ValueError(f"Invalid frame range [{start}, {stop}) for {n} frames")
+        self.parent = parent
+        self.start, self.stop = start, stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def fps(self):
+        return self.parent.fps
+
+    @property
+    def width(self):
+        return self.parent.width
+
+    @property
+    def height(self):
+        return self.parent.height
+
+    def read(self, n):
+        return self.parent.read(self.start + self._normalize(n))
+
+    def iter_frames(self, start=0, stop=None, step=1, workers=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        return self.parent.iter_frames(self.start + start, self.start + stop, step, workers=workers)
+
+    def close(self):
+        self.parent.close()
+
+# =========================
+# Helpers
+# =========================
+
+def open_view(video_path, cache_dir=None):
+    """Open a video as a lazy view (through the frame cache when it has the clip)."""
+    return SourceView(open_frames(video_path, cache_dir))
+
+
+def iter_stereo(left, right, workers=None):
+    """
+    Yield (left_frame, right_frame) pairs from two equal-rate views.
+
+    When both views are crops of the same video (a split combined clip), that video is
+    decoded once and both halves are cut from each frame.
+    """
+    if isinstance(left, CropView) and isinstance(right, CropView) and left.parent is right.parent:
+        for frame in left.parent.iter_frames(workers=workers):
+            yield left._crop(frame), right._crop(frame)
+    else:
+        n = min(len(left), len(right))
+        yield from zip(left.iter_frames(0, n, workers=workers), right.iter_frames(0, n, workers=workers))
+
+
+def stereo_clips(left_dir, right_dir, combined_dir=None):
+    """
+    Yield (stem, left_source, right_source) for every stereo clip in a session.
+
+    A source is (path, half): half is None for a whole clip, or 0 / 1 for the left / right half of a
+    combined 1280x640 clip. Sources are plain paths, so they can be sent to worker processes and
+    opened there with open_side().
+
+    Raw left/right recordings are used as a pair (archived copies stand in for deleted raw clips).
+    Combined videos in combined_dir are only used (split in half) for clips without a raw pair.
+
+    Args:
+        left_dir (Path): Directory of left camera clips (freethrowN.avi).
+        right_dir (Path): Directory of right camera clips with matching names.
+        combined_dir (Path | None): Directory of hstacked clips written by combine_player_feeds.py.
+
+    Yields:
+        tuple[str, tuple[Path, int | None], tuple[Path, int | None]]: Clip stem and left/right sources.
+    """
+    seen = set()
+    for left_path in list_clips(left_dir, "freethrow*"):
+        right_path = resolve_clip(Path(right_dir) / f"{left_path.stem}.avi")
+        if not right_path.exists():
+            continue
+        seen.add(left_path.stem)
+        yield left_path.stem, (left_path, None), (right_path, None)
+
+    if combined_dir is not None:
+        for video_path in list_clips(combined_dir):
+            if video_path.stem not in seen:
+                yield video_path.stem, (video_path, 0), (video_path, 1)
+
+
+def open_side(source, cache_dir=None):
+    """Open one side of a stereo clip from a source yielded by stereo_clips()."""
+    path, half = source
+    view = open_view(path, cache_dir)
+    return view if half is None else view.split()[half]
+
+
+def stereo_views(left_dir, right_dir, combined_dir=None, cache_dir=None):
+    """
+    Yield (stem, left_view, right_view) for every stereo clip in a session (see stereo_clips).
+
+    Args:
+        left_dir (Path): Directory of left camera clips (freethrowN.avi).
+        right_dir (Path): Directory of right camera clips with matching names.
+        combined_dir (Path | None): Directory of hstacked clips written by combine_player_feeds.py.
+        cache_dir (Path | None): Frame cache directory.
+
+    Yields:
+        tuple[str, VideoView, VideoView]: Clip stem and equal-length left/right views.
+    """
+    for stem, (left_path, half), (right_path, _) in stereo_clips(left_dir, right_dir, combined_dir):
+        if half is None:
+            left, right = open_view(left_path, cache_dir).hstack(open_view(right_path, cache_dir)).split()
+        else:
+            left, right = open_view(left_path, cache_dir).split()  # Both halves share one decode
+        yield stem, left, right